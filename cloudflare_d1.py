@@ -2,7 +2,12 @@
 Backend Django personnalisé pour Cloudflare D1
 """
 import json
+import random
+import time
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
 from django.db.backends.sqlite3.creation import DatabaseCreation as SQLiteCreation
 from django.db.backends.sqlite3.introspection import DatabaseIntrospection as SQLiteIntrospection
@@ -30,37 +35,160 @@ class CloudflareD1SchemaEditor(SQLiteSchemaEditor):
     """Éditeur de schéma pour Cloudflare D1"""
     pass
 
+class CloudflareD1Error(Exception):
+    """Erreur renvoyée par l'API Cloudflare D1"""
+
+    def __init__(self, message, status_code=None, erreurs=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.erreurs = erreurs or []
+
+
 class CloudflareD1Client:
-    """Client pour interagir avec l'API Cloudflare D1"""
-    
-    def __init__(self, account_id, database_id, api_token):
+    """
+    Client pour interagir avec l'API Cloudflare D1.
+
+    Les requêtes passent par une `requests.Session` unique : les connexions
+    HTTPS sont gardées ouvertes (keep-alive) et réutilisées d'une requête à
+    l'autre. Les erreurs transitoires (coupure réseau, 429, 5xx) sont
+    réessayées avec un délai exponentiel, en respectant `Retry-After`.
+    `execute_batch` envoie plusieurs requêtes en un seul appel, exécutées
+    par D1 dans une même transaction.
+
+    Une écriture n'est réessayée que si elle n'a pas pu atteindre D1
+    (connexion refusée ou non établie, 429, 503 avec `Retry-After`) : après
+    un délai dépassé ou une 502, D1 a pu valider le lot, et le renvoyer
+    dupliquerait les lignes. Seules les lectures (SELECT, PRAGMA, EXPLAIN)
+    sont réessayées sur toutes les erreurs transitoires.
+    """
+
+    API_URL = "https://api.cloudflare.com/client/v4"
+    STATUTS_A_REESSAYER = frozenset({429, 500, 502, 503, 504})
+    REQUETES_LECTURE = ('SELECT', 'PRAGMA', 'EXPLAIN')
+    TENTATIVES_MAX = 5
+    DELAI_INITIAL = 0.5
+    DELAI_MAX = 8.0
+    TIMEOUT = 30
+
+    def __init__(self, account_id, database_id, api_token, base_url=None, session=None,
+                 tentatives_max=None, taille_pool=10, attendre=time.sleep):
         self.account_id = account_id
         self.database_id = database_id
         self.api_token = api_token
-        self.base_url = f"https://api.cloudflare.com/client/v4/accounts/{account_id}/d1/database/{database_id}"
+        self.base_url = base_url or f"{self.API_URL}/accounts/{account_id}/d1/database/{database_id}"
         self.headers = {
             'Authorization': f'Bearer {api_token}',
             'Content-Type': 'application/json'
         }
-    
-    def execute_query(self, sql, params=None):
-        """Exécute une requête SQL sur Cloudflare D1"""
+        self.tentatives_max = tentatives_max or self.TENTATIVES_MAX
+        self.attendre = attendre
+        self.session = session or self._creer_session(taille_pool)
+        self.session.headers.update(self.headers)
+
+    @staticmethod
+    def _creer_session(taille_pool):
+        session = requests.Session()
+        # Les nouvelles tentatives sont gérées par _post, pas par urllib3
+        adaptateur = HTTPAdapter(pool_connections=1, pool_maxsize=taille_pool, max_retries=0)
+        session.mount('https://', adaptateur)
+        session.mount('http://', adaptateur)
+        return session
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _delai(self, tentative, response=None):
+        """Délai avant la tentative suivante : Retry-After s'il est fourni, sinon exponentiel avec gigue"""
+        if response is not None:
+            try:
+                return min(float(response.headers['Retry-After']), self.DELAI_MAX)
+            except (KeyError, ValueError):
+                pass
+        return min(self.DELAI_MAX, self.DELAI_INITIAL * 2 ** tentative) * random.uniform(0.5, 1)
+
+    @classmethod
+    def est_lecture(cls, sql):
+        """Vrai si la requête ne modifie pas la base et peut être rejouée sans risque"""
+        return sql.lstrip().upper().startswith(cls.REQUETES_LECTURE)
+
+    @staticmethod
+    def _non_envoyee(erreur):
+        """Vrai si l'erreur réseau est survenue avant l'envoi de la requête à D1"""
+        if isinstance(erreur, requests.ConnectTimeout):
+            return True
+        raison = erreur.args[0] if erreur.args else None
+        return isinstance(getattr(raison, 'reason', raison), NewConnectionError)
+
+    def _a_reessayer(self, response, idempotent):
+        """Vrai si la réponse d'erreur autorise une nouvelle tentative"""
+        if idempotent:
+            return response.status_code in self.STATUTS_A_REESSAYER
+        # Requête refusée sans être exécutée
+        return response.status_code == 429 or (response.status_code == 503 and 'Retry-After' in response.headers)
+
+    def _post(self, chemin, data, idempotent=True):
+        """
+        Envoie une requête à l'API et retourne sa réponse JSON, avec nouvelles
+        tentatives ; sans `idempotent`, seulement si D1 n'a pas pu l'exécuter
+        """
+        for tentative in range(self.tentatives_max):
+            derniere = tentative == self.tentatives_max - 1
+            try:
+                response = self.session.post(f"{self.base_url}/{chemin}", json=data, timeout=self.TIMEOUT)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if derniere or not (idempotent or self._non_envoyee(e)):
+                    raise CloudflareD1Error(f"Erreur D1: {e}") from e
+                self.attendre(self._delai(tentative))
+                continue
+
+            if not derniere and self._a_reessayer(response, idempotent):
+                self.attendre(self._delai(tentative, response))
+                continue
+
+            try:
+                resultat = response.json()
+            except ValueError:
+                resultat = {}
+            if response.status_code != 200 or not resultat.get('success', False):
+                raise CloudflareD1Error(f"Erreur D1: {response.text}", response.status_code, resultat.get('errors'))
+            return resultat
+
+    def execute_query(self, sql, params=None, idempotent=None):
+        """
+        Exécute une requête SQL sur Cloudflare D1. `idempotent` indique si elle
+        peut être rejouée après une erreur ambiguë (par défaut : si c'est une lecture).
+        """
         data = {
             'sql': sql
         }
         if params:
             data['params'] = params
-            
-        response = requests.post(
-            f"{self.base_url}/query",
-            headers=self.headers,
-            json=data
-        )
-        
-        if response.status_code != 200:
-            raise Exception(f"Erreur D1: {response.text}")
-            
-        return response.json()
+        if idempotent is None:
+            idempotent = self.est_lecture(sql)
+        return self._post('query', data, idempotent)
+
+    def execute_batch(self, requetes, idempotent=None):
+        """
+        Exécute plusieurs requêtes en un seul appel, dans une même transaction
+        D1. `requetes` contient des chaînes SQL ou des couples (sql, params).
+        Retourne la liste des résultats, dans l'ordre des requêtes. Le lot est
+        idempotent par défaut s'il ne contient que des lectures.
+        """
+        batch = []
+        for requete in requetes:
+            sql, params = (requete, None) if isinstance(requete, str) else requete
+            batch.append({'sql': sql, 'params': list(params)} if params else {'sql': sql})
+        if not batch:
+            return []
+        if idempotent is None:
+            idempotent = all(self.est_lecture(requete['sql']) for requete in batch)
+        return self._post('query', {'batch': batch}, idempotent)['result']
 
 class DatabaseWrapper(SQLiteDatabaseWrapper):
     """Wrapper de base de données pour Cloudflare D1"""
@@ -1,6 +1,41 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.http import HttpResponse
+from django.utils import timezone
 from django.utils.html import format_html
 from .models import Eleve, Professeur, Classe, Creneau, Paiement, ParametreSite
+from .regeneration_identifiants import ecrire_fiche_csv, fiche_pdf, regenerer_mots_de_passe
+
+
+def _regenerer_identifiants(modeladmin, request, queryset, format_fiche):
+    """Régénère les mots de passe de la sélection et renvoie la fiche des identifiants"""
+    lignes = regenerer_mots_de_passe(queryset.select_related('user').prefetch_related('classes'))
+    if not lignes:
+        modeladmin.message_user(request, "Aucun compte utilisateur dans la sélection.", messages.WARNING)
+        return None
+    nom_fichier = f"identifiants-{timezone.now().strftime('%Y%m%d-%H%M')}.{format_fiche}"
+    if format_fiche == 'csv':
+        reponse = HttpResponse(content_type='text/csv; charset=utf-8')
+        reponse.write('\ufeff')  # BOM pour l'ouverture directe dans Excel
+        ecrire_fiche_csv(lignes, reponse)
+    else:
+        contenu = fiche_pdf(lignes, f"Identifiants de connexion - {modeladmin.model._meta.verbose_name_plural}")
+        if contenu is None:
+            modeladmin.message_user(request, "Mots de passe régénérés, mais la génération du PDF a échoué.",
+                                    messages.ERROR)
+            return None
+        reponse = HttpResponse(contenu, content_type='application/pdf')
+    reponse['Content-Disposition'] = f'attachment; filename="{nom_fichier}"'
+    return reponse
+
+
+@admin.action(description="Régénérer les mots de passe (fiche CSV)")
+def regenerer_identifiants_csv(modeladmin, request, queryset):
+    return _regenerer_identifiants(modeladmin, request, queryset, 'csv')
+
+
+@admin.action(description="Régénérer les mots de passe (fiche PDF)")
+def regenerer_identifiants_pdf(modeladmin, request, queryset):
+    return _regenerer_identifiants(modeladmin, request, queryset, 'pdf')
 
 # Interface d'administration personnalisée
 
@@ -39,6 +74,7 @@ class ProfesseurAdmin(admin.ModelAdmin):
     list_display = ('nom', 'creneaux_list', 'nombre_classes', 'date_creation')
     list_filter = ()
     search_fields = ('nom',)
+    actions = [regenerer_identifiants_csv, regenerer_identifiants_pdf]
 
     def creneaux_list(self, obj):
         return ", ".join([str(c) for c in obj.creneaux.all()])
@@ -72,6 +108,7 @@ class EleveAdmin(admin.ModelAdmin):
     list_display = ('nom_complet', 'classe', 'creneaux_list', 'telephone', 'email', 'date_creation')
     list_filter = ('classe',)
     search_fields = ('nom', 'prenom', 'telephone', 'email')
+    actions = [regenerer_identifiants_csv, regenerer_identifiants_pdf]
     fieldsets = (
         ('Informations personnelles', {
             'fields': ('nom', 'prenom', 'date_naissance', 'telephone', 'email')
@@ -0,0 +1,70 @@
+"""
+Cache des paramètres transverses lus à chaque requête.
+
+Le nom du site (context processor `site_name`), le montant par défaut des
+élèves et le rôle de l'utilisateur connecté (utilisé par
+`ComposanteMiddleware`) sont mémorisés dans le cache Django ; les signaux de
+`signals.py` suppriment les entrées concernées à chaque modification. Le rôle
+est en plus conservé sur l'objet requête pour les lectures répétées au sein
+d'une même requête.
+"""
+from django.core.cache import cache
+
+from .models import Eleve, ParametreSite, Professeur, SiteConfig
+
+# Durée de vie des entrées : borne le décalage entre processus lorsque le cache
+# est local à chaque processus (l'invalidation par signal est immédiate dans
+# le processus qui effectue la modification).
+PARAMETRES_CACHE_TIMEOUT = 5 * 60
+
+CLE_SITE_NAME = 'parametres:site_name'
+CLE_MONTANT_DEFAUT = 'parametres:montant_defaut'
+
+
+def _cle_role(user_id):
+    return f"parametres:role:{user_id}"
+
+
+def get_site_name():
+    """Nom du site, lu en base au plus une fois par durée de cache"""
+    return cache.get_or_set(CLE_SITE_NAME, SiteConfig.get_site_name, PARAMETRES_CACHE_TIMEOUT)
+
+
+def get_montant_defaut():
+    """Montant par défaut des nouveaux élèves (ParametreSite)"""
+    return cache.get_or_set(CLE_MONTANT_DEFAUT, ParametreSite.get_montant_defaut, PARAMETRES_CACHE_TIMEOUT)
+
+
+def invalider_parametres():
+    cache.delete_many([CLE_SITE_NAME, CLE_MONTANT_DEFAUT])
+
+
+def _calculer_role(user_id):
+    professeur = Professeur.objects.filter(user_id=user_id).only('id').first()
+    return {
+        'est_eleve': Eleve.objects.filter(user_id=user_id).exists(),
+        'est_professeur': professeur is not None,
+        # Même ordre que professeur.composantes.first() (ordering de Composante)
+        'composante_ids': list(professeur.composantes.values_list('id', flat=True)) if professeur else [],
+    }
+
+
+def get_role_utilisateur(request):
+    """
+    Retourne le rôle de l'utilisateur connecté : un dictionnaire avec
+    `est_eleve`, `est_professeur` et `composante_ids` (composantes du
+    professeur). Retourne None pour un utilisateur anonyme.
+    """
+    if not request.user.is_authenticated:
+        return None
+    role = getattr(request, '_role_utilisateur', None)
+    if role is None:
+        user_id = request.user.pk
+        role = cache.get_or_set(_cle_role(user_id), lambda: _calculer_role(user_id), PARAMETRES_CACHE_TIMEOUT)
+        request._role_utilisateur = role
+    return role
+
+
+def invalider_roles(*user_ids):
+    """Supprime du cache le rôle des utilisateurs indiqués"""
+    cache.delete_many([_cle_role(user_id) for user_id in user_ids if user_id])
@@ -0,0 +1,119 @@
+"""
+Cache disque des PDF générés avec xhtml2pdf.
+
+Un PDF est identifié par le template utilisé et une empreinte du HTML rendu :
+tant que le contenu ne change pas, le fichier déjà produit est renvoyé sans
+repasser par xhtml2pdf, qui peut occuper un worker plusieurs secondes. Les
+fichiers trop anciens, puis les moins récemment servis au-delà de la taille
+maximale, sont supprimés après chaque nouvelle génération.
+
+La génération peut aussi être lancée en arrière-plan (`planifier`), par
+exemple dès qu'une tentative de quiz est terminée, pour que le premier
+téléchargement soit déjà servi depuis le cache.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.template.loader import get_template
+from xhtml2pdf import pisa
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_DIR = Path(getattr(settings, 'PDF_CACHE_DIR', Path(settings.MEDIA_ROOT) / 'cache_pdf'))
+PDF_CACHE_TAILLE_MAX = getattr(settings, 'PDF_CACHE_TAILLE_MAX', 200 * 1024 * 1024)
+PDF_CACHE_AGE_MAX = getattr(settings, 'PDF_CACHE_AGE_MAX', 30 * 24 * 3600)
+
+# Un seul thread : la génération est surtout du calcul Python, en paralléliser
+# davantage ne ferait que concurrencer les requêtes du même processus
+_executeur = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cache_pdf')
+
+
+def cle_pdf(template_src, html):
+    """Empreinte (template, contenu) identifiant un PDF dans le cache"""
+    empreinte = hashlib.sha256(template_src.encode('utf-8'))
+    empreinte.update(b'\0')
+    empreinte.update(html.encode('utf-8'))
+    return empreinte.hexdigest()
+
+
+def chemin_pdf(cle):
+    return PDF_CACHE_DIR / cle[:2] / f"{cle}.pdf"
+
+
+def generer_pdf(template_src, context_dict=None):
+    """
+    Retourne le chemin du PDF rendu à partir du template et du contexte,
+    en le générant seulement s'il n'est pas déjà en cache. Retourne None si
+    xhtml2pdf échoue.
+    """
+    html = get_template(template_src).render(context_dict or {})
+    chemin = chemin_pdf(cle_pdf(template_src, html))
+    if chemin.exists():
+        # La date de modification sert d'horodatage du dernier accès pour l'éviction
+        os.utime(chemin)
+        return chemin
+
+    resultat = BytesIO()
+    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), resultat)
+    if pdf.err:
+        return None
+
+    # Écriture dans un fichier temporaire puis renommage atomique : un lecteur
+    # concurrent ne voit jamais de PDF partiel
+    chemin.parent.mkdir(parents=True, exist_ok=True)
+    descripteur, temporaire = tempfile.mkstemp(dir=chemin.parent, suffix='.tmp')
+    with os.fdopen(descripteur, 'wb') as fichier:
+        fichier.write(resultat.getvalue())
+    os.replace(temporaire, chemin)
+    evincer()
+    return chemin
+
+
+def evincer(taille_max=None, age_max=None):
+    """Supprime les PDF trop anciens puis les moins récents au-delà de la taille maximale"""
+    taille_max = PDF_CACHE_TAILLE_MAX if taille_max is None else taille_max
+    age_max = PDF_CACHE_AGE_MAX if age_max is None else age_max
+    limite = time.time() - age_max
+
+    fichiers = []
+    for chemin in PDF_CACHE_DIR.glob('*/*.pdf'):
+        try:
+            infos = chemin.stat()
+        except FileNotFoundError:
+            continue
+        if infos.st_mtime < limite:
+            chemin.unlink(missing_ok=True)
+        else:
+            fichiers.append((infos.st_mtime, infos.st_size, chemin))
+
+    total = sum(taille for _, taille, _ in fichiers)
+    for _, taille, chemin in sorted(fichiers):
+        if total <= taille_max:
+            break
+        chemin.unlink(missing_ok=True)
+        total -= taille
+
+
+def _executer(fonction, *args):
+    try:
+        fonction(*args)
+    except Exception:
+        logger.exception("Échec de la génération d'un PDF en arrière-plan")
+    finally:
+        close_old_connections()
+
+
+def planifier(fonction, *args):
+    """
+    Exécute `fonction(*args)` dans le thread de génération des PDF, après
+    la validation de la transaction en cours.
+    """
+    transaction.on_commit(lambda: _executeur.submit(_executer, fonction, *args))
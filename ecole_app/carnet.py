@@ -0,0 +1,273 @@
+"""
+Lecture du carnet pédagogique d'un élève pour un mois donné.
+
+Les séances du mois (écoutes, mémorisations, révisions, répétitions) et les
+évaluations de compétences de l'élève sont chargées en un seul lot de
+prefetch, sans dépendre de la longueur de l'historique. Le catalogue des
+compétences du livre est indexé une fois par id, par leçon et par
+description, et les sourates des séances sont résolues en un seul passage.
+La page du carnet et l'API JSON partagent cette lecture.
+"""
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
+
+from .models import (CarnetPedagogique, CompetenceLivre, EcouteAvantMemo, EvaluationCompetence,
+                     Memorisation, Repetition, Revision)
+from .sourate import SOURATES, get_sourates_for_plages
+
+# Correspondance entre les cases statiques du livre et les descriptions des compétences
+COMPETENCES_MAPPING = {
+    # Leçon 1 et 2
+    '1_1': 'Capacité à reconnaître et lire les lettres fortes ;',
+    '1_2': 'Capacité à identifier la position des lettres dans un mot ;',
+    '1_3': 'Capacité à identifier et lire les lettres qui nécessitent de tirer le bout de la langue ;',
+    '1_4': 'Capacité à lire les lettres mises dans le désordre ;',
+    '1_5': 'Compétences générales en prononciation.',
+    # Leçon 3 à 6
+    '3_1': 'Capacité à reconnaître et lire les lettres fortes ;',
+    '3_2': 'Capacité à identifier la position des lettres dans un mot ;',
+    '3_3': 'Capacité à identifier et lire les lettres qui nécessitent de tirer le bout de la langue ;',
+    '3_4': 'Capacité à lire les lettres mises dans le désordre ;',
+    '3_5': 'Compétences générales en prononciation ;',
+    '3_6': 'Capacité à lire fluidement les mots des exercices 1 à 5 ;',
+    '3_7': 'Capacité à bien prononcer les 3 voyelles courtes.',
+    # Leçon 7
+    '7_1': 'Capacité à reconnaître et lire les lettres qui sortent avec l\'air ;',
+    '7_2': 'Capacité à reconnaître et lire les lettres qui sont appelées القَلْقَلَة ;',
+    '7_3': 'Capacité à reconnaître et lire les lettres qui sont appelées اللِّينِيَّة ;',
+    '7_4': 'Capacité à reconnaître et lire les lettres fortes ;',
+    '7_5': 'Compétences générales en prononciation ;',
+    '7_6': 'Capacité à lire fluidement les mots des exercices 6 et 7 ;',
+    '7_7': 'Capacité à identifier et lire les lettres qui nécessitent de tirer le bout de la langue.',
+    # Leçon 8
+    '8_1': 'Capacité à reconnaître les lettres de prolongement ;',
+    '8_2': 'Capacité à distinguer les voyelles courtes des voyelles longues ;',
+    '8_3': 'Capacité à distinguer les lettres de line des lettres de prolongement ;',
+    '8_4': 'Compétences générales en prononciation ;',
+    '8_5': 'Capacité à lire fluidement le texte, les exemples et l\'exercice 8.',
+    # Leçon 9
+    '9_1': 'Capacité à identifier les différents types de doubles voyelles ;',
+    '9_2': 'Capacité à maîtriser l\'arrêt sur les doubles voyelles ;',
+    '9_3': 'Compétences générales en prononciation ;',
+    '9_4': 'Capacité à lire fluidement le texte, les exemples et l\'exercice 9.',
+    '9_5': 'Capacité à distinguer la particularité des doubles voyelles fathatayn par rapport aux autres doubles voyelles.',
+    # Règles de base
+    'regles_1': 'Capacité à appliquer la nasalisation (الْغُنَّة) sur le noun ;',
+    'regles_2': 'Maîtrise des différentes déclinaisons de ن ;',
+    'regles_3': 'Capacité à distinguer les différents types de prolongement plus de 2 temps ;',
+    'regles_4': 'Maîtrise les types de الْقَلْقَلَة.'
+}
+
+PREFIXE_REGLES = 'Capacité à appliquer la nasalisation'
+
+
+def periode_demandee(request):
+    """Mois et année demandés en GET, ou ceux du jour si absents ou invalides"""
+    date_actuelle = timezone.now()
+    try:
+        mois = int(request.GET.get('mois', date_actuelle.month))
+        annee = int(request.GET.get('annee', date_actuelle.year))
+    except (ValueError, TypeError):
+        return date_actuelle.month, date_actuelle.year
+    if mois < 1 or mois > 12:
+        mois = date_actuelle.month
+    if annee < 2000 or annee > 2100:  # Plage raisonnable pour les années
+        annee = date_actuelle.year
+    return mois, annee
+
+
+def _nom_sourate(index):
+    return SOURATES[index].nom if index is not None else None
+
+
+def _enseignant(seance):
+    return seance.enseignant.nom if seance.enseignant else 'Non spécifié'
+
+
+class CatalogueCompetences:
+    """Compétences du livre indexées par id, par leçon et par description"""
+
+    def __init__(self, competences):
+        self.competences = list(competences)
+        self.par_id = {competence.pk: competence for competence in self.competences}
+        self.par_lecon = {}
+        self.par_description = {}
+        for competence in self.competences:
+            self.par_lecon.setdefault(competence.lecon, []).append(competence)
+            # La première compétence (dans l'ordre du livre) l'emporte en cas de doublon
+            self.par_description.setdefault(competence.description.strip(), competence)
+
+    @classmethod
+    def charger(cls):
+        return cls(CompetenceLivre.objects.order_by('lecon', 'ordre'))
+
+
+class LectureCarnet:
+    """Séances du mois et bilan des compétences du carnet d'un élève"""
+
+    def __init__(self, eleve, carnet, mois, annee, catalogue, evaluations):
+        self.eleve = eleve
+        self.carnet = carnet
+        self.mois = mois
+        self.annee = annee
+        self.catalogue = catalogue
+        self.evaluations = {evaluation.competence_id: evaluation for evaluation in evaluations}
+
+        self.ecoutes = carnet.ecoutes_mois
+        self.memorisations = carnet.memorisations_mois
+        self.revisions = carnet.revisions_mois
+        self.repetitions = carnet.repetitions_mois
+
+        # Sourates des écoutes et mémorisations résolues en un seul passage
+        seances = self.ecoutes + self.memorisations
+        indexes = get_sourates_for_plages([(seance.debut_page, seance.fin_page) for seance in seances])
+        for seance, index in zip(seances, indexes):
+            seance.sourate_nom = _nom_sourate(index)
+
+    @property
+    def total_pages_memo(self):
+        return sum(memorisation.fin_page for memorisation in self.memorisations)
+
+    @property
+    def competences_par_lecon(self):
+        return {
+            lecon: [{'competence': competence, 'evaluation': self.evaluations.get(competence.pk)}
+                    for competence in competences]
+            for lecon, competences in self.catalogue.par_lecon.items()
+        }
+
+    @property
+    def dates_annotation(self):
+        """Date de la première évaluation de chaque leçon, avec les regroupements des tableaux du livre"""
+        dates = {}
+        for lecon, competences in self.catalogue.par_lecon.items():
+            for competence in competences:
+                evaluation = self.evaluations.get(competence.pk)
+                if evaluation:
+                    dates[lecon] = evaluation.date_evaluation
+                    break
+
+        # Tableau 1: Leçons 1-2 -> utiliser leçon 1 ou 2 selon disponibilité
+        if 1 not in dates and 2 in dates:
+            dates[1] = dates[2]
+        elif 2 not in dates and 1 in dates:
+            dates[2] = dates[1]
+
+        # Tableau 2: Leçons 3-6 -> utiliser la première date disponible
+        for lecon in [3, 4, 5, 6]:
+            if lecon in dates:
+                dates[3] = dates[lecon]  # Le template utilise dates_annotation.3
+                break
+
+        # Tableau 6: Règles de base -> chercher dans les compétences "regles"
+        for competence in self.catalogue.competences:
+            if competence.description.startswith(PREFIXE_REGLES):
+                evaluation = self.evaluations.get(competence.pk)
+                if evaluation:
+                    dates['regles'] = evaluation.date_evaluation
+                    break
+        return dates
+
+    @property
+    def competences_id_mapping(self):
+        """Case statique du livre -> id réel de la compétence"""
+        mapping = {}
+        for static_id, description in COMPETENCES_MAPPING.items():
+            competence = self.catalogue.par_description.get(description.strip())
+            if competence is not None:
+                mapping[static_id] = competence.pk
+        return mapping
+
+    @property
+    def competences_status(self):
+        """Case statique du livre -> statut de l'évaluation de l'élève"""
+        return {
+            static_id: self.evaluations[competence_id].statut
+            for static_id, competence_id in self.competences_id_mapping.items()
+            if competence_id in self.evaluations
+        }
+
+    def contexte(self):
+        """Contexte du template du carnet"""
+        return {
+            'eleve': self.eleve,
+            'carnet': self.carnet,
+            'ecoutes': self.ecoutes,
+            'memorisations': self.memorisations,
+            'revisions': self.revisions,
+            'repetitions': self.repetitions,
+            'total_pages_memo': self.total_pages_memo,
+            'competences_par_lecon': self.competences_par_lecon,
+            'competences_status': self.competences_status,
+            'competences_id_mapping': self.competences_id_mapping,
+            'dates_annotation': self.dates_annotation,
+            'mois': self.mois,
+            'annee': self.annee,
+        }
+
+    def donnees_json(self):
+        """Données du mois au format attendu par l'API du carnet"""
+        return {
+            'stats': {
+                'memorisations_count': len(self.memorisations),
+                'total_pages_memo': self.total_pages_memo,
+                'revisions_count': len(self.revisions),
+                'repetitions_count': len(self.repetitions),
+            },
+            'ecoutes': [{
+                'id': e.id,
+                'date': e.date.strftime('%d/%m/%Y'),
+                'sourate': e.sourate_nom,
+                'debut_page': e.debut_page,
+                'fin_page': e.fin_page,
+                'enseignant': _enseignant(e),
+                'remarques': e.remarques,
+            } for e in self.ecoutes],
+            'memorisations': [{
+                'id': m.id,
+                'date': m.date.strftime('%d/%m/%Y'),
+                'sourate': m.sourate_nom,
+                'debut_page': m.debut_page,
+                'fin_page': m.fin_page,
+                'enseignant': _enseignant(m),
+                'commentaire': m.remarques,
+            } for m in self.memorisations],
+            'revisions': [{
+                'id': r.id,
+                'date': r.date.strftime('%d/%m/%Y'),
+                'semaine': r.semaine,
+                'jour': r.get_jour_display(),
+                'nombre_hizb': r.nombre_hizb,
+            } for r in self.revisions],
+            'repetitions': [{
+                'id': r.id,
+                'derniere_date': r.derniere_date.strftime('%d/%m/%Y'),
+                'sourate': r.sourate,
+                'page': r.page,
+                'nombre_repetitions': r.nombre_repetitions,
+            } for r in self.repetitions],
+        }
+
+
+def lire_carnet(eleve, mois, annee, catalogue=None):
+    """
+    Charge le carnet de l'élève (créé s'il n'existe pas) avec les séances du
+    mois et les évaluations de compétences, en un seul lot de prefetch.
+    """
+    carnet, created = CarnetPedagogique.objects.get_or_create(eleve=eleve)
+    prefetch_related_objects(
+        [carnet],
+        Prefetch('ecoutes', to_attr='ecoutes_mois', queryset=EcouteAvantMemo.objects
+                 .filter(date__year=annee, date__month=mois).select_related('enseignant').order_by('-date')),
+        Prefetch('memorisations', to_attr='memorisations_mois', queryset=Memorisation.objects
+                 .filter(date__year=annee, date__month=mois).select_related('enseignant').order_by('-date')),
+        # Colonnes limitées : `remarques` peut manquer sur les bases non migrées
+        Prefetch('revisions', to_attr='revisions_mois', queryset=Revision.objects
+                 .filter(date__year=annee, date__month=mois)
+                 .only('id', 'carnet_id', 'semaine', 'date', 'jour', 'nombre_hizb').order_by('-date')),
+        Prefetch('repetitions', to_attr='repetitions_mois', queryset=Repetition.objects
+                 .filter(derniere_date__year=annee, derniere_date__month=mois).order_by('-derniere_date')),
+    )
+    evaluations = EvaluationCompetence.objects.filter(eleve=eleve).only(
+        'id', 'eleve_id', 'competence_id', 'statut', 'date_evaluation')
+    return LectureCarnet(eleve, carnet, mois, annee, catalogue or CatalogueCompetences.charger(), evaluations)
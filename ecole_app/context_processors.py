@@ -1,6 +1,6 @@
-from .models import SiteConfig
+from .cache_parametres import get_site_name
 
 def site_name(request):
     return {
-        'site_name': SiteConfig.get_site_name()
+        'site_name': get_site_name()
     }
@@ -0,0 +1,104 @@
+"""
+Corpus du texte coranique partagé par tout le processus.
+
+Le fichier `static/coran/quran_ar.json` (≈1,7 Mo) n'est lu qu'une seule fois,
+au premier accès, puis conservé sous une forme compacte : un tuple unique des
+6 236 versets dans l'ordre du Mushaf et un tableau d'offsets par sourate.
+Toutes les recherches (par sourate, par verset, par plage de pages) sont
+ensuite des accès indexés en O(1).
+"""
+import json
+import os
+import threading
+from array import array
+from collections import namedtuple
+
+from django.conf import settings
+
+from .sourate import get_sourates_for_range
+
+NOMBRE_SOURATES = 114
+
+Verset = namedtuple('Verset', ['sura', 'aya', 'text'])
+
+
+def _chemin_coran(nom_fichier):
+    return os.path.join(settings.BASE_DIR, 'ecole_app', 'static', 'coran', nom_fichier)
+
+
+class CorpusCoran:
+    """Index en mémoire des versets du Coran, construit paresseusement"""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self._textes = None
+        self._offsets = None
+        self._sourates = None
+
+    def _charger_textes(self):
+        with self._verrou:
+            if self._textes is not None:
+                return
+            with open(_chemin_coran('quran_ar.json'), encoding='utf-8') as f:
+                versets = json.load(f)['quran']
+
+            # Les versets sont triés par (sura, aya) dans le fichier source ;
+            # offsets[n - 1] donne l'index du premier verset de la sourate n.
+            offsets = array('H', [0] * (NOMBRE_SOURATES + 1))
+            for index, verset in enumerate(versets):
+                if verset['aya'] == 1:
+                    offsets[verset['sura'] - 1] = index
+            offsets[NOMBRE_SOURATES] = len(versets)
+
+            self._offsets = offsets
+            self._textes = tuple(v['text'] for v in versets)
+
+    @property
+    def sourates(self):
+        """Liste des sourates (numero, nom_ar, nom_fr) issue de sourates.json"""
+        if self._sourates is None:
+            with open(_chemin_coran('sourates.json'), encoding='utf-8') as f:
+                self._sourates = json.load(f)
+        return self._sourates
+
+    def _bornes(self, sura):
+        if self._textes is None:
+            self._charger_textes()
+        if not 1 <= sura <= NOMBRE_SOURATES:
+            return 0, 0
+        return self._offsets[sura - 1], self._offsets[sura]
+
+    def nombre_versets(self, sura):
+        debut, fin = self._bornes(sura)
+        return fin - debut
+
+    def versets_sourate(self, sura):
+        """Retourne les versets d'une sourate (liste vide si le numéro est invalide)"""
+        debut, fin = self._bornes(sura)
+        return [Verset(sura, aya, texte) for aya, texte in enumerate(self._textes[debut:fin], start=1)]
+
+    def verset(self, sura, aya):
+        """Retourne le verset (sura, aya) ou None s'il n'existe pas"""
+        debut, fin = self._bornes(sura)
+        if not 1 <= aya <= fin - debut:
+            return None
+        return Verset(sura, aya, self._textes[debut + aya - 1])
+
+    def sourates_pages(self, debut_page, fin_page):
+        """Numéros des sourates dont la plage de pages recoupe [debut_page, fin_page]"""
+        return [index + 1 for index in get_sourates_for_range(debut_page, fin_page)]
+
+    def versets_pages(self, debut_page, fin_page):
+        """Retourne les versets des sourates couvrant la plage de pages donnée"""
+        versets = []
+        for sura in self.sourates_pages(debut_page, fin_page):
+            versets.extend(self.versets_sourate(sura))
+        return versets
+
+
+_corpus = CorpusCoran()
+
+
+def get_corpus():
+    """Retourne le corpus coranique partagé par le processus"""
+    return _corpus
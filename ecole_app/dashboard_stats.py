@@ -0,0 +1,116 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import Classe, Composante, Creneau, Eleve, Paiement, Professeur
+
+# Durée de vie des statistiques dans le cache partagé (settings.CACHES) ; les
+# signaux invalident avant expiration, pour tous les processus
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(composante_id):
+    return f"dashboard_stats:{composante_id}"
+
+
+def _subquery_count(queryset):
+    """Sous-requête scalaire comptant les lignes du queryset corrélé"""
+    return Coalesce(
+        Subquery(queryset.order_by().values('composante').annotate(c=Count('id')).values('c')[:1],
+                 output_field=IntegerField()),
+        0,
+    )
+
+
+def _subquery_sum(queryset, champ):
+    """Sous-requête scalaire sommant `champ` sur le queryset corrélé"""
+    return Coalesce(
+        Subquery(queryset.order_by().values('composante').annotate(s=Sum(champ)).values('s')[:1],
+                 output_field=DecimalField(max_digits=12, decimal_places=2)),
+        0,
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def calculer_dashboard_stats(composante_id):
+    """
+    Calcule les statistiques du dashboard d'une composante en deux requêtes :
+    une sur la composante (totaux via sous-requêtes) et une sur ses classes
+    (effectifs annotés avec Count filtré).
+    """
+    eleves_actifs = Eleve.objects.filter(composante=OuterRef('pk'), archive=False)
+    totaux = Composante.objects.filter(pk=composante_id).annotate(
+        nb_eleves=_subquery_count(eleves_actifs),
+        nb_classes=_subquery_count(Classe.objects.filter(composante=OuterRef('pk'))),
+        nb_creneaux=_subquery_count(Creneau.objects.filter(composante=OuterRef('pk'))),
+        nb_profs=Coalesce(
+            Subquery(
+                Professeur.composantes.through.objects.filter(composante=OuterRef('pk'))
+                .order_by().values('composante').annotate(c=Count('professeur', distinct=True)).values('c')[:1],
+                output_field=IntegerField(),
+            ),
+            0,
+        ),
+        total_attendu=_subquery_sum(Eleve.objects.filter(composante=OuterRef('pk')), 'montant_total'),
+        total_collecte=_subquery_sum(Paiement.objects.filter(composante=OuterRef('pk')), 'montant'),
+    ).values('nb_eleves', 'nb_classes', 'nb_creneaux', 'nb_profs', 'total_attendu', 'total_collecte').first() or {}
+
+    classes = (
+        Classe.objects.filter(composante_id=composante_id)
+        .select_related('creneau', 'professeur')
+        .annotate(eleves_en_classe=Count('eleves', filter=Q(eleves__archive=False)))
+    )
+
+    classe_stats = []
+    total_capacite = 0
+    for classe in classes:
+        capacite = classe.capacite or 20
+        total_capacite += capacite
+        taux_occupation = min(100, round((classe.eleves_en_classe / capacite) * 100)) if capacite > 0 else 0
+        classe_stats.append({
+            'id': classe.id,
+            'nom': classe.nom,
+            'eleves_en_classe': classe.eleves_en_classe,
+            'capacite': capacite,
+            'taux_occupation': taux_occupation,
+            'creneau': classe.creneau,
+            'professeur': classe.professeur,
+        })
+
+    total_eleves = totaux.get('nb_eleves', 0)
+    total_attendu = totaux.get('total_attendu') or 0
+    total_collecte = totaux.get('total_collecte') or 0
+
+    return {
+        'total_eleves': total_eleves,
+        'total_profs': totaux.get('nb_profs', 0),
+        'total_classes': totaux.get('nb_classes', 0),
+        'total_creneaux': totaux.get('nb_creneaux', 0),
+        'classe_stats': classe_stats,
+        'taux_remplissage': round((total_eleves / total_capacite) * 100) if total_capacite > 0 else 0,
+        'total_capacite': total_capacite,
+        'total_attendu': total_attendu,
+        'total_collecte': total_collecte,
+        'pourcentage_collecte': round((total_collecte / total_attendu) * 100) if total_attendu > 0 else 0,
+    }
+
+
+def get_dashboard_stats(composante_id):
+    """Retourne les statistiques du dashboard depuis le cache, en les recalculant si nécessaire"""
+    key = _cache_key(composante_id)
+    stats = cache.get(key)
+    if stats is None:
+        stats = calculer_dashboard_stats(composante_id)
+        cache.set(key, stats, DASHBOARD_CACHE_TIMEOUT)
+    return stats
+
+
+def invalider_dashboard_stats(*composante_ids):
+    """
+    Supprime du cache les statistiques des composantes indiquées, une fois la
+    transaction en cours validée (sans quoi une autre requête pourrait les
+    recalculer avant la validation et remettre en cache l'ancien état)
+    """
+    cles = [_cache_key(cid) for cid in composante_ids if cid]
+    transaction.on_commit(lambda: cache.delete_many(cles))
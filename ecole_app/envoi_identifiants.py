@@ -0,0 +1,138 @@
+"""
+Envoi groupé des identifiants de connexion des élèves.
+
+La vue `envoyer_tous_identifiants` se contente de créer une tâche
+`EnvoiIdentifiants` ; la commande `traiter_envois_identifiants` la traite
+ensuite hors du cycle requête/réponse, par lots, en réutilisant une seule
+connexion SMTP et des templates compilés une seule fois. Une tâche laissée
+« en cours » par un worker interrompu est reprise après `DELAI_REPRISE`.
+"""
+import datetime
+import re
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .identifiants import hacher_mots_de_passe
+from .models import Eleve, EnvoiIdentifiants, generer_mot_de_passe
+
+SUJET_IDENTIFIANTS = "Vos identifiants de connexion - Al Markaz"
+TAILLE_LOT = 50
+# Au-delà, une tâche encore « en cours » est considérée comme abandonnée
+DELAI_REPRISE = datetime.timedelta(hours=1)
+
+
+def mot_de_passe_par_defaut(eleve):
+    """Mot de passe au format nom.prenom1, ou aléatoire si le nom ou le prénom manque"""
+    nom = re.sub(r'[^a-z0-9]', '', eleve.nom.lower() if eleve.nom else '')
+    prenom = re.sub(r'[^a-z0-9]', '', eleve.prenom.lower() if eleve.prenom else '')
+    return f"{nom}.{prenom}1" if nom and prenom else generer_mot_de_passe()
+
+
+def creer_envoi(composante_id, eleve_ids, utilisateur=None):
+    """Enregistre une tâche d'envoi d'identifiants pour les élèves donnés"""
+    eleve_ids = sorted(set(eleve_ids))
+    return EnvoiIdentifiants.objects.create(
+        composante_id=composante_id,
+        cree_par=utilisateur if utilisateur and utilisateur.is_authenticated else None,
+        eleve_ids=eleve_ids,
+        total=len(eleve_ids),
+    )
+
+
+def reserver_prochain_envoi(delai_reprise=DELAI_REPRISE):
+    """
+    Réserve la plus ancienne tâche en attente, ou une tâche restée en cours
+    depuis plus de `delai_reprise` (worker arrêté ou redéployé pendant le
+    traitement) ; retourne None s'il n'y en a pas. Une tâche reprise
+    continue après les élèves déjà traités.
+    """
+    abandonnees = Q(statut='en_cours', date_debut__lt=timezone.now() - delai_reprise)
+    for envoi in EnvoiIdentifiants.objects.filter(Q(statut='en_attente') | abandonnees).order_by('date_creation'):
+        # La mise à jour conditionnelle évite que deux workers traitent la même tâche
+        reserve = EnvoiIdentifiants.objects.filter(
+            pk=envoi.pk, statut=envoi.statut, date_debut=envoi.date_debut
+        ).update(statut='en_cours', date_debut=timezone.now())
+        if reserve:
+            envoi.refresh_from_db()
+            return envoi
+    return None
+
+
+def _traiter_lot(envoi, ids_lot, eleves, templates, connection):
+    """Régénère les mots de passe d'un lot d'élèves et envoie leurs emails en une fois"""
+    template_html, template_texte = templates
+    utilisateurs = []
+    eleves_a_modifier = []
+    emails = []
+
+    for eleve in eleves:
+        if not eleve.user:
+            envoi.sans_compte += 1
+            continue
+        if not eleve.email:
+            envoi.sans_email += 1
+            continue
+        eleves_a_modifier.append(eleve)
+
+    # Mots de passe du lot hachés en une fois (en parallèle pour les grands lots)
+    mots_de_passe = [mot_de_passe_par_defaut(eleve) for eleve in eleves_a_modifier]
+    for eleve, password, hachage in zip(eleves_a_modifier, mots_de_passe, hacher_mots_de_passe(mots_de_passe)):
+        eleve.user.password = hachage
+        eleve.mot_de_passe_en_clair = password
+        utilisateurs.append(eleve.user)
+
+        context = {'eleve': eleve, 'username': eleve.user.username, 'password': password}
+        email = EmailMultiAlternatives(
+            SUJET_IDENTIFIANTS,
+            template_texte.render(context),
+            settings.DEFAULT_FROM_EMAIL,
+            [eleve.email],
+            connection=connection,
+        )
+        email.attach_alternative(template_html.render(context), "text/html")
+        emails.append(email)
+
+    with transaction.atomic():
+        User.objects.bulk_update(utilisateurs, ['password'])
+        Eleve.objects.bulk_update(eleves_a_modifier, ['mot_de_passe_en_clair'])
+
+    if emails:
+        try:
+            envoyes = connection.send_messages(emails) or 0
+        except Exception as e:
+            envoyes = 0
+            envoi.message_erreur = str(e)
+        envoi.envoyes += envoyes
+        envoi.erreurs += len(emails) - envoyes
+
+    envoi.traites += len(ids_lot)
+    envoi.save(update_fields=['traites', 'envoyes', 'sans_email', 'sans_compte', 'erreurs', 'message_erreur'])
+
+
+def traiter_envoi(envoi, taille_lot=TAILLE_LOT):
+    """Traite une tâche d'envoi réservée, lot par lot, avec une seule connexion SMTP"""
+    templates = (
+        get_template('ecole_app/emails/identifiants_eleve.html'),
+        get_template('ecole_app/emails/identifiants_eleve.txt'),
+    )
+    try:
+        with get_connection(fail_silently=False) as connection:
+            # Une tâche reprise reprend après le dernier lot enregistré
+            for debut in range(envoi.traites, len(envoi.eleve_ids), taille_lot):
+                ids_lot = envoi.eleve_ids[debut:debut + taille_lot]
+                eleves = Eleve.objects.filter(id__in=ids_lot).select_related('user')
+                _traiter_lot(envoi, ids_lot, list(eleves), templates, connection)
+        envoi.statut = 'termine'
+    except Exception as e:
+        envoi.statut = 'echec'
+        envoi.message_erreur = str(e)
+
+    envoi.date_fin = timezone.now()
+    envoi.save(update_fields=['statut', 'message_erreur', 'date_fin'])
+    return envoi
@@ -0,0 +1,97 @@
+"""
+Pipeline commun des exports Excel.
+
+Les classeurs sont écrits en mode `write_only` d'openpyxl : les lignes sont
+produites par un générateur (typiquement un queryset parcouru avec
+`.iterator(chunk_size=...)`) et sérialisées au fil de l'eau dans un fichier
+temporaire, renvoyé ensuite en streaming par `FileResponse`. La mémoire
+consommée reste donc constante quel que soit le nombre de lignes.
+"""
+import tempfile
+
+from django.http import FileResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+CONTENT_TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Taille des paquets de lignes lus en base lors du parcours des querysets
+TAILLE_CHUNK = 2000
+
+BORDURE_FINE = Border(
+    left=Side(style='thin'),
+    right=Side(style='thin'),
+    top=Side(style='thin'),
+    bottom=Side(style='thin')
+)
+
+STYLE_EN_TETE_SIMPLE = {'font': Font(bold=True)}
+STYLE_EN_TETE_COLORE = {
+    'font': Font(bold=True, color="FFFFFF"),
+    'fill': PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+    'alignment': Alignment(horizontal="center", vertical="center"),
+    'border': BORDURE_FINE,
+}
+STYLE_CELLULE_BORDEE = {
+    'alignment': Alignment(horizontal="left", vertical="top", wrap_text=True),
+    'border': BORDURE_FINE,
+}
+
+
+def _cellule(ws, valeur, style):
+    cellule = WriteOnlyCell(ws, value=valeur)
+    for attribut, valeur_style in style.items():
+        setattr(cellule, attribut, valeur_style)
+    return cellule
+
+
+class FeuilleExcel:
+    """Feuille d'un classeur en écriture seule"""
+
+    def __init__(self, ws, style_cellules=None):
+        self.ws = ws
+        self.style_cellules = style_cellules
+
+    def ecrire_ligne(self, valeurs, style=None):
+        style = style if style is not None else self.style_cellules
+        if style:
+            self.ws.append([_cellule(self.ws, valeur, style) for valeur in valeurs])
+        else:
+            self.ws.append(list(valeurs))
+
+    def ecrire_lignes(self, lignes):
+        for valeurs in lignes:
+            self.ecrire_ligne(valeurs)
+
+
+class ClasseurExcel:
+    """Classeur Excel en écriture seule, renvoyé en streaming depuis un fichier temporaire"""
+
+    def __init__(self):
+        self.wb = Workbook(write_only=True)
+
+    def ajouter_feuille(self, titre, en_tetes, largeurs=None, style_en_tetes=None, style_cellules=None):
+        # Excel limite le titre d'une feuille à 31 caractères
+        ws = self.wb.create_sheet(title=titre[:31])
+        # En mode écriture seule, les largeurs doivent être fixées avant la première ligne
+        for index, largeur in enumerate(largeurs or [], 1):
+            ws.column_dimensions[get_column_letter(index)].width = largeur
+        feuille = FeuilleExcel(ws, style_cellules)
+        feuille.ecrire_ligne(en_tetes, style=style_en_tetes or STYLE_EN_TETE_SIMPLE)
+        return feuille
+
+    def reponse(self, nom_fichier):
+        fichier = tempfile.TemporaryFile()
+        self.wb.save(fichier)
+        fichier.seek(0)
+        return FileResponse(fichier, as_attachment=True, filename=nom_fichier, content_type=CONTENT_TYPE_XLSX)
+
+
+def reponse_excel(nom_fichier, titre, en_tetes, lignes, largeurs=None, style_en_tetes=None, style_cellules=None):
+    """Construit un export Excel d'une seule feuille à partir d'un itérable de lignes"""
+    classeur = ClasseurExcel()
+    feuille = classeur.ajouter_feuille(titre, en_tetes, largeurs, style_en_tetes, style_cellules)
+    feuille.ecrire_lignes(lignes)
+    return classeur.reponse(nom_fichier)
@@ -0,0 +1,139 @@
+"""
+Envoi de fichiers du disque en téléchargement.
+
+Le fichier est lu par blocs (mémoire constante quelle que soit sa taille)
+avec prise en charge des requêtes conditionnelles (`ETag`/`If-None-Match`,
+`Last-Modified`/`If-Modified-Since`) et des plages d'octets (`Range`,
+`If-Range`) pour reprendre un téléchargement interrompu.
+
+Si `FICHIERS_ENVOI_SERVEUR` vaut 'x-sendfile' (Apache) ou 'x-accel-redirect'
+(Nginx), l'envoi est délégué au serveur web : la réponse ne contient qu'un
+en-tête indiquant le fichier. Pour Nginx, `FICHIERS_X_ACCEL_PREFIXES`
+associe un dossier du disque à l'emplacement interne qui le sert, par
+exemple {'/srv/app/media/': '/protege/media/'}.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+TAILLE_BLOC = 64 * 1024
+
+MOTIF_PLAGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def etag_fichier(infos):
+    """ETag fort dérivé de la taille et de la date de modification du fichier"""
+    return f'"{infos.st_size:x}-{infos.st_mtime_ns:x}"'
+
+
+def _non_modifie(request, etag, mtime):
+    si_aucun = request.headers.get('If-None-Match')
+    if si_aucun is not None:
+        return si_aucun.strip() == '*' or etag in [valeur.strip() for valeur in si_aucun.split(',')]
+    si_modifie = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return si_modifie is not None and int(mtime) <= si_modifie
+
+
+def lire_plage(en_tete, taille):
+    """
+    Interprète un en-tête Range à une seule plage. Retourne (debut, fin)
+    inclusifs, None si l'en-tête est absent ou non pris en charge (le
+    fichier entier est alors envoyé), ou False si la plage est hors du
+    fichier.
+    """
+    correspondance = MOTIF_PLAGE.match(en_tete.replace(' ', '')) if en_tete else None
+    if not correspondance or correspondance.groups() == ('', ''):
+        return None
+    if taille == 0:
+        # Aucune plage n'est satisfiable dans un fichier vide
+        return False
+    debut, fin = correspondance.groups()
+    if debut == '':
+        # Suffixe : les N derniers octets
+        longueur = int(fin)
+        if longueur == 0:
+            return False
+        return max(taille - longueur, 0), taille - 1
+    debut = int(debut)
+    fin = min(int(fin), taille - 1) if fin else taille - 1
+    if debut >= taille or debut > fin:
+        return False
+    return debut, fin
+
+
+def _lire_blocs(fichier, debut, longueur):
+    try:
+        fichier.seek(debut)
+        while longueur > 0:
+            bloc = fichier.read(min(TAILLE_BLOC, longueur))
+            if not bloc:
+                break
+            longueur -= len(bloc)
+            yield bloc
+    finally:
+        fichier.close()
+
+
+def _chemin_interne(chemin):
+    for dossier, emplacement in getattr(settings, 'FICHIERS_X_ACCEL_PREFIXES', {}).items():
+        dossier = os.path.join(os.path.abspath(dossier), '')
+        if chemin.startswith(dossier):
+            return emplacement.rstrip('/') + '/' + quote(chemin[len(dossier):].replace(os.sep, '/'))
+    return None
+
+
+def servir_fichier(request, chemin, nom_telechargement=None, content_type=None):
+    """Réponse de téléchargement du fichier `chemin` pour la requête donnée"""
+    chemin = os.path.abspath(chemin)
+    infos = os.stat(chemin)
+    nom_telechargement = nom_telechargement or os.path.basename(chemin)
+    content_type = content_type or mimetypes.guess_type(nom_telechargement)[0] or 'application/octet-stream'
+    etag = etag_fichier(infos)
+
+    if _non_modifie(request, etag, infos.st_mtime):
+        reponse = HttpResponseNotModified()
+        reponse['ETag'] = etag
+        return reponse
+
+    mode = getattr(settings, 'FICHIERS_ENVOI_SERVEUR', None)
+    chemin_interne = _chemin_interne(chemin) if mode == 'x-accel-redirect' else None
+    if mode == 'x-sendfile' or chemin_interne:
+        # Le serveur web lit le fichier et gère lui-même les plages
+        reponse = HttpResponse(content_type=content_type)
+        if chemin_interne:
+            reponse['X-Accel-Redirect'] = chemin_interne
+        else:
+            reponse['X-Sendfile'] = chemin
+    else:
+        plage = lire_plage(request.headers.get('Range'), infos.st_size)
+        si_plage = request.headers.get('If-Range')
+        if plage is not None and si_plage is not None and si_plage.strip() != etag:
+            # Le fichier a changé depuis le début du téléchargement : tout renvoyer
+            plage = None
+
+        if plage is False:
+            reponse = HttpResponse(status=416, content_type=content_type)
+            reponse['Content-Range'] = f'bytes */{infos.st_size}'
+            return reponse
+        if plage:
+            debut, fin = plage
+            longueur = fin - debut + 1
+            reponse = StreamingHttpResponse(
+                _lire_blocs(open(chemin, 'rb'), debut, longueur), status=206, content_type=content_type
+            )
+            reponse['Content-Range'] = f'bytes {debut}-{fin}/{infos.st_size}'
+            reponse['Content-Length'] = str(longueur)
+        else:
+            reponse = FileResponse(open(chemin, 'rb'), content_type=content_type)
+            reponse.block_size = TAILLE_BLOC
+
+    reponse['Content-Disposition'] = content_disposition_header(True, nom_telechargement)
+    reponse['Accept-Ranges'] = 'bytes'
+    reponse['ETag'] = etag
+    reponse['Last-Modified'] = http_date(infos.st_mtime)
+    return reponse
@@ -178,8 +178,8 @@ class EleveForm(ComposanteFormMixin, forms.ModelForm):
             kwargs['initial'] = {}
         if 'montant_total' not in kwargs.get('initial', {}):
             # Utiliser le montant par défaut des paramètres du site
-            from .models import ParametreSite
-            kwargs['initial']['montant_total'] = ParametreSite.get_montant_defaut()
+            from .cache_parametres import get_montant_defaut
+            kwargs['initial']['montant_total'] = get_montant_defaut()
             
         super().__init__(*args, **kwargs)
         # Rendre le champ montant_total optionnel
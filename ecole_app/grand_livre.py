@@ -0,0 +1,129 @@
+"""
+Grand livre mensuel : entrées (paiements), charges et indemnisations par mois.
+
+Chaque source est agrégée en une seule requête groupée par mois
+(TruncMonth) pour une composante et une année scolaire ; les résultats
+sont fusionnés en Python et mis en cache. Les totaux, les séries des
+graphiques et les tableaux mensuels de la comptabilité sont ensuite lus
+dans le même grand livre. Les signaux sur Paiement et Charge invalident le
+cache de la composante concernée, une fois la transaction validée.
+"""
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Charge, Paiement
+
+# Durée de vie du grand livre en cache (les signaux invalident avant expiration)
+GRAND_LIVRE_CACHE_TIMEOUT = 60 * 60
+
+SOURCES = {
+    'entrees': (Paiement, Q()),
+    'charges': (Charge, ~Q(categorie='indemnisation')),
+    'indemnisations': (Charge, Q(categorie='indemnisation')),
+}
+
+
+def _cle_version(composante_id):
+    return f"grand_livre:version:{composante_id}"
+
+
+def _cache_key(composante_id, annee_id):
+    # La version change à chaque invalidation : inutile de connaître les années déjà en cache
+    version = cache.get_or_set(_cle_version(composante_id), 1, None)
+    return f"grand_livre:{composante_id}:{annee_id}:{version}"
+
+
+def mois_entre(date_debut, date_fin):
+    """Premiers jours des mois couverts par la période, dans l'ordre"""
+    mois = datetime.date(date_debut.year, date_debut.month, 1)
+    while mois <= date_fin:
+        yield mois
+        mois = datetime.date(mois.year + mois.month // 12, mois.month % 12 + 1, 1)
+
+
+def _groupes_par_mois(source, composante_id, annee_id):
+    modele, filtre = SOURCES[source]
+    queryset = modele.objects.filter(filtre)
+    if composante_id:
+        queryset = queryset.filter(composante_id=composante_id)
+    if annee_id:
+        queryset = queryset.filter(annee_scolaire_id=annee_id)
+    lignes = (queryset.annotate(mois=TruncMonth('date')).values('mois')
+              .annotate(total=Sum('montant'), nombre=Count('id')).order_by())
+    return {ligne['mois']: (ligne['total'], ligne['nombre']) for ligne in lignes}
+
+
+class GrandLivre:
+    """Montants et nombres d'opérations par source et par mois"""
+
+    def __init__(self, groupes):
+        # {source: {premier jour du mois: (total, nombre)}}
+        self.groupes = groupes
+
+    def total(self, source, mois=None):
+        if mois is not None:
+            return self.groupes[source].get(mois, (Decimal('0'), 0))[0]
+        return sum((total for total, nombre in self.groupes[source].values()), Decimal('0'))
+
+    def nombre(self, source, mois=None):
+        if mois is not None:
+            return self.groupes[source].get(mois, (Decimal('0'), 0))[1]
+        return sum(nombre for total, nombre in self.groupes[source].values())
+
+    def par_mois(self, source):
+        """Mois ayant des opérations, du plus récent au plus ancien"""
+        return [
+            {'mois': mois, 'total': total, 'count': nombre}
+            for mois, (total, nombre) in sorted(self.groupes[source].items(), reverse=True)
+        ]
+
+    def serie(self, date_debut, date_fin):
+        """Entrées, charges, indemnisations et solde de chaque mois de la période"""
+        serie = []
+        for mois in mois_entre(date_debut, date_fin):
+            ligne = {'mois': mois}
+            for source in SOURCES:
+                ligne[source] = self.total(source, mois)
+            ligne['solde'] = ligne['entrees'] - (ligne['charges'] + ligne['indemnisations'])
+            serie.append(ligne)
+        return serie
+
+
+def calculer_grand_livre(composante_id=None, annee_id=None):
+    """Une requête groupée par mois pour chaque source"""
+    return GrandLivre({source: _groupes_par_mois(source, composante_id, annee_id) for source in SOURCES})
+
+
+def get_grand_livre(composante_id=None, annee_id=None):
+    """
+    Grand livre d'une composante (toutes si None) pour une année scolaire
+    (toutes si None), depuis le cache ou recalculé si nécessaire
+    """
+    key = _cache_key(composante_id, annee_id)
+    groupes = cache.get(key)
+    if groupes is None:
+        groupes = calculer_grand_livre(composante_id, annee_id).groupes
+        cache.set(key, groupes, GRAND_LIVRE_CACHE_TIMEOUT)
+    return GrandLivre(groupes)
+
+
+def invalider_grand_livre(*composante_ids):
+    """
+    Invalide le grand livre des composantes indiquées et celui de toutes les
+    composantes, après la validation de la transaction en cours : invalidé
+    plus tôt, il pourrait être recalculé par une autre requête avant la
+    validation et remis en cache avec les anciennes données.
+    """
+    def invalider():
+        for composante_id in set(composante_ids) | {None}:
+            try:
+                cache.incr(_cle_version(composante_id))
+            except ValueError:
+                # Aucune version en cache : aucun grand livre à invalider
+                pass
+    transaction.on_commit(invalider)
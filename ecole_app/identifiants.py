@@ -0,0 +1,76 @@
+"""
+Génération des identifiants de connexion et hachage groupé des mots de passe.
+"""
+import random
+import string
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import get_hasher, make_password
+from django.utils.module_loading import import_string
+
+# En dessous de ce nombre de mots de passe, le coût de démarrage des processus
+# dépasse le gain : le hachage se fait dans le processus courant.
+SEUIL_HACHAGE_PARALLELE = 64
+
+
+def generate_username(nom, prenom):
+    """Génère un nom d'utilisateur au format prenom.nom"""
+    # Supprime les espaces et caractères spéciaux
+    nom_clean = ''.join(c for c in nom.lower() if c.isalnum())
+    prenom_clean = ''.join(c for c in prenom.lower() if c.isalnum())
+    
+    # Créer l'identifiant au format prenom.nom
+    return f"{prenom_clean}.{nom_clean}"
+
+
+def generate_password(nom_complet):
+    """Génère un mot de passe aléatoire basé sur le nom complet"""
+    # Extraire le nom et prénom du nom complet si possible
+    parts = nom_complet.split() if nom_complet else []
+    
+    # Utiliser les 3 premières lettres du nom et prénom si disponibles
+    prefix = ""
+    if parts and len(parts) > 0:
+        prefix += parts[0][:3].lower()  # Première partie (nom)
+    if parts and len(parts) > 1:
+        prefix += parts[1][:3].lower()  # Deuxième partie (prénom)
+    
+    # Si le préfixe est trop court, ajouter des caractères aléatoires
+    while len(prefix) < 4:
+        prefix += random.choice(string.ascii_lowercase)
+    
+    # Ajouter 4 chiffres aléatoires
+    suffix = ''.join(random.choices(string.digits, k=4))
+    
+    return prefix + suffix
+
+
+def _hacher(chemin_hasher, mot_de_passe):
+    # Exécuté dans un processus fils : le hasher est instancié directement,
+    # sans dépendre de la configuration Django du processus parent.
+    hasher = import_string(chemin_hasher)()
+    return hasher.encode(mot_de_passe, hasher.salt())
+
+
+def hacher_mots_de_passe(mots_de_passe, processus=None):
+    """
+    Hache une liste de mots de passe avec le hasher par défaut.
+
+    PBKDF2 coûte plusieurs dizaines de millisecondes par mot de passe ; au-delà
+    de SEUIL_HACHAGE_PARALLELE, le travail est réparti sur un pool de processus.
+    Retourne les hachages dans l'ordre des mots de passe fournis.
+    """
+    mots_de_passe = list(mots_de_passe)
+    if len(mots_de_passe) < SEUIL_HACHAGE_PARALLELE:
+        return [make_password(mdp) for mdp in mots_de_passe]
+
+    hasher = get_hasher()
+    chemin_hasher = f"{type(hasher).__module__}.{type(hasher).__qualname__}"
+    try:
+        with ProcessPoolExecutor(max_workers=processus) as pool:
+            return list(pool.map(
+                _hacher, [chemin_hasher] * len(mots_de_passe), mots_de_passe, chunksize=16
+            ))
+    except (OSError, RuntimeError, NotImplementedError):
+        # Environnement sans multiprocessing (certains hébergeurs) : repli séquentiel
+        return [make_password(mdp) for mdp in mots_de_passe]
@@ -0,0 +1,200 @@
+"""
+Relevé des impayés : montant dû à une date, montant payé et retard par élève.
+
+Les frais d'inscription (`Eleve.montant_total`) sont répartis en échéances
+mensuelles égales sur les mois de l'année scolaire, exigibles le 1er de
+chaque mois. Le montant dû à une date est la part des échéances échues. Le
+montant payé est la somme des versements (`PaiementHistorique`) datés
+jusqu'à ce jour, calculée pour tous les élèves actifs d'une composante dans
+une seule requête annotée. Le retard est ensuite exprimé en nombre
+d'échéances, classé par tranche et totalisé par classe et par créneau.
+
+Le relevé est mis en cache par composante, année scolaire et jour ; les
+signaux sur Paiement et Eleve l'invalident une fois la transaction validée.
+Les écritures qui ne passent pas par les signaux (`bulk_create`,
+`QuerySet.update()` : import des élèves, montant par défaut appliqué à tous
+les élèves, recalcul des paiements) doivent appeler elles-mêmes
+`invalider_releve_impayes` pour les composantes touchées.
+"""
+import datetime
+import math
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import DecimalField, Exists, F, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .grand_livre import mois_entre
+from .models import AnneeScolaire, Eleve, Paiement, PaiementHistorique
+
+# Le relevé dépend du jour : il n'a pas à vivre plus d'une journée
+RELEVE_CACHE_TIMEOUT = 60 * 60 * 24
+
+CHAMP_MONTANT = DecimalField(max_digits=10, decimal_places=2)
+CENTIME = Decimal('0.01')
+
+# Tranches de retard, en nombre d'échéances mensuelles impayées
+TRANCHES = (
+    (1, "1 échéance"),
+    (2, "2 échéances"),
+    (3, "3 échéances et plus"),
+)
+
+
+def _cle_version(composante_id):
+    return f"impayes:version:{composante_id}"
+
+
+def _cache_key(composante_id, annee_id, date):
+    version = cache.get_or_set(_cle_version(composante_id), 1, None)
+    return f"impayes:{composante_id}:{annee_id}:{date.isoformat()}:{version}"
+
+
+def echeances(annee, date):
+    """Nombre d'échéances échues à la date et nombre total d'échéances de l'année"""
+    if annee is None:
+        # Sans année scolaire, la totalité des frais est exigible
+        return 1, 1
+    mois = list(mois_entre(annee.date_debut, annee.date_fin))
+    return sum(1 for debut in mois if debut <= date), len(mois)
+
+
+def tranche(nombre_echeances):
+    """Tranche de retard (1, 2 ou 3) d'un nombre d'échéances impayées"""
+    return min(nombre_echeances, TRANCHES[-1][0])
+
+
+def montant_du(montant_total, echues, total):
+    """Part des frais exigible après `echues` échéances sur `total`, arrondie au centime"""
+    return (Decimal(montant_total) * echues / total).quantize(CENTIME, rounding=ROUND_HALF_UP)
+
+
+def annoter_impayes(queryset, date):
+    """
+    Ajoute aux élèves le montant payé jusqu'à la date donnée (`paye`) et la
+    date de leur dernier versement (`dernier_versement`, `dernier_paiement_saisi`).
+
+    Un élève n'a en général qu'un `Paiement` dont le montant cumule tous ses
+    versements et dont la date est celle du dernier : les versements sont donc
+    lus dans `PaiementHistorique`, à leur propre date. Seuls les paiements
+    sans historique, saisis directement, comptent pour leur montant et leur date.
+    """
+    versements = (PaiementHistorique.objects.filter(paiement__eleve_id=OuterRef('pk'), date__lte=date)
+                  .order_by().values('paiement__eleve_id'))
+    sans_historique = (Paiement.objects.filter(eleve_id=OuterRef('pk'), date__lte=date)
+                       .exclude(Exists(PaiementHistorique.objects.filter(paiement_id=OuterRef('pk'))))
+                       .order_by().values('eleve_id'))
+    return queryset.annotate(
+        paye_versements=Coalesce(Subquery(versements.annotate(total=Sum('montant')).values('total'),
+                                          output_field=CHAMP_MONTANT), Value(Decimal('0')), output_field=CHAMP_MONTANT),
+        paye_saisi=Coalesce(Subquery(sans_historique.annotate(total=Sum('montant')).values('total'),
+                                     output_field=CHAMP_MONTANT), Value(Decimal('0')), output_field=CHAMP_MONTANT),
+        dernier_versement=Subquery(versements.annotate(derniere=Max('date')).values('derniere')),
+        dernier_paiement_saisi=Subquery(sans_historique.annotate(derniere=Max('date')).values('derniere')),
+    ).annotate(paye=F('paye_versements') + F('paye_saisi'))
+
+
+def _groupe(nom):
+    return {'nom': nom, 'eleves': 0, 'en_retard': 0, 'du': Decimal('0'), 'paye': Decimal('0'), 'retard': Decimal('0')}
+
+
+def _cumuler(groupe, ligne):
+    groupe['eleves'] += 1
+    groupe['du'] += ligne['du']
+    groupe['paye'] += ligne['paye']
+    if ligne['retard'] > 0:
+        groupe['en_retard'] += 1
+        groupe['retard'] += ligne['retard']
+
+
+def calculer_releve(composante_id, annee=None, date=None):
+    """
+    Relevé des impayés des élèves actifs d'une composante à une date (le jour
+    même par défaut) : élèves en retard, tranches de retard et totaux par
+    classe et par créneau. Une requête annotée, plus le chargement des
+    classes et créneaux des élèves.
+    """
+    date = date or datetime.date.today()
+    echues, total = echeances(annee, date)
+    eleves = (annoter_impayes(Eleve.objects.filter(composante_id=composante_id, archive=False), date)
+              .prefetch_related('classes', 'creneaux').order_by('nom', 'prenom', 'id'))
+
+    lignes = []
+    tranches = {numero: {'tranche': numero, 'libelle': libelle, 'eleves': 0, 'retard': Decimal('0')}
+                for numero, libelle in TRANCHES}
+    par_classe, par_creneau = {}, {}
+    totaux = _groupe('Total')
+    for eleve in eleves:
+        # Montant dû calculé en Decimal : SQLite diviserait en entiers
+        du = montant_du(eleve.montant_total, echues, total)
+        dates = [jour for jour in (eleve.dernier_versement, eleve.dernier_paiement_saisi) if jour]
+        ligne = {
+            'eleve_id': eleve.pk,
+            'nom': eleve.nom,
+            'prenom': eleve.prenom,
+            'telephone': eleve.telephone,
+            'classes': [classe.nom for classe in eleve.classes.all()],
+            'creneaux': [creneau.nom for creneau in eleve.creneaux.all()],
+            'montant_total': eleve.montant_total,
+            'du': du,
+            'paye': eleve.paye,
+            'retard': du - eleve.paye,
+            'dernier_paiement': max(dates) if dates else None,
+            'echeances_retard': 0,
+        }
+        if ligne['retard'] > 0:
+            mensualite = Decimal(eleve.montant_total) / total
+            ligne['echeances_retard'] = math.ceil(ligne['retard'] / mensualite)
+            ligne['tranche'] = tranche(ligne['echeances_retard'])
+            tranches[ligne['tranche']]['eleves'] += 1
+            tranches[ligne['tranche']]['retard'] += ligne['retard']
+            lignes.append(ligne)
+        _cumuler(totaux, ligne)
+        for nom in ligne['classes'] or ['Sans classe']:
+            _cumuler(par_classe.setdefault(nom, _groupe(nom)), ligne)
+        for nom in ligne['creneaux'] or ['Sans créneau']:
+            _cumuler(par_creneau.setdefault(nom, _groupe(nom)), ligne)
+
+    lignes.sort(key=lambda ligne: ligne['retard'], reverse=True)
+    return {
+        'date': date,
+        'echeances_echues': echues,
+        'echeances_total': total,
+        'eleves': lignes,
+        'tranches': list(tranches.values()),
+        'par_classe': sorted(par_classe.values(), key=lambda groupe: groupe['nom']),
+        'par_creneau': sorted(par_creneau.values(), key=lambda groupe: groupe['nom']),
+        'totaux': totaux,
+    }
+
+
+def get_releve_impayes(composante_id, annee_id=None, date=None):
+    """
+    Relevé des impayés d'une composante pour une année scolaire (l'année
+    active par défaut) à une date, depuis le cache ou recalculé si nécessaire
+    """
+    date = date or datetime.date.today()
+    annees = AnneeScolaire.objects.all()
+    annee = annees.filter(pk=annee_id).first() if annee_id else annees.filter(active=True).first()
+    key = _cache_key(composante_id, annee.pk if annee else None, date)
+    releve = cache.get(key)
+    if releve is None:
+        releve = calculer_releve(composante_id, annee, date)
+        cache.set(key, releve, RELEVE_CACHE_TIMEOUT)
+    releve['annee'] = annee
+    return releve
+
+
+def invalider_releve_impayes(*composante_ids):
+    """
+    Invalide les relevés des composantes indiquées, tous jours confondus,
+    après la validation de la transaction en cours
+    """
+    def invalider():
+        for composante_id in set(composante_ids) - {None}:
+            try:
+                cache.incr(_cle_version(composante_id))
+            except ValueError:
+                pass
+    transaction.on_commit(invalider)
@@ -0,0 +1,405 @@
+"""
+Import groupé d'élèves depuis un fichier Excel ou CSV.
+
+L'import se déroule en quatre étapes :
+1. lecture complète du fichier en lignes normalisées (`lire_fichier`) ;
+2. résolution ensembliste des classes, créneaux, doublons et identifiants,
+   avec un nombre de requêtes indépendant du nombre de lignes ;
+3. hachage des mots de passe, réparti sur un pool de processus ;
+4. `bulk_create` des utilisateurs, des élèves et de leurs relations dans une
+   seule transaction.
+
+En mode simulation, seules les deux premières étapes sont exécutées : le
+rapport indique ce qui serait créé sans rien écrire en base.
+"""
+import csv
+import datetime
+import io
+import unicodedata
+from collections import Counter
+
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+
+from .dashboard_stats import invalider_dashboard_stats
+from .identifiants import generate_password, generate_username, hacher_mots_de_passe
+from .impayes import invalider_releve_impayes
+from .models import Classe, Creneau, Eleve
+
+# En-têtes acceptés (normalisés sans accents ni casse) et champ correspondant
+COLONNES = {
+    'nom': 'nom',
+    'prenom': 'prenom',
+    'classe': 'classe',
+    'classe id': 'classe_id',
+    'creneau': 'creneau',
+    'creneau id': 'creneau_id',
+    'date de naissance': 'date_naissance',
+    'date naissance': 'date_naissance',
+    'telephone': 'telephone',
+    'email': 'email',
+    'adresse': 'adresse',
+}
+COLONNES_OBLIGATOIRES = ('nom', 'prenom')
+FORMATS_DATE = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y')
+CHAMPS_LIMITES = ('nom', 'prenom', 'telephone', 'email')
+
+# Taille des paquets de valeurs passées dans une clause IN
+TAILLE_PAQUET_IN = 500
+
+
+def normaliser_entete(valeur):
+    """Met un en-tête de colonne en minuscules, sans accents ni soulignés"""
+    if valeur is None:
+        return ''
+    texte = unicodedata.normalize('NFKD', str(valeur)).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(texte.replace('_', ' ').lower().split())
+
+
+def _texte(valeur):
+    if valeur is None:
+        return ''
+    # Excel renvoie les nombres entiers (téléphones, identifiants) sous forme de float
+    if isinstance(valeur, float) and valeur.is_integer():
+        return str(int(valeur))
+    return str(valeur).strip()
+
+
+def _lignes_excel(fichier):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(fichier, read_only=True, data_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _lignes_csv(fichier):
+    contenu = fichier.read()
+    if isinstance(contenu, bytes):
+        try:
+            contenu = contenu.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            contenu = contenu.decode('latin-1')
+    try:
+        dialecte = csv.Sniffer().sniff(contenu.split('\n', 1)[0], delimiters=',;\t')
+    except csv.Error:
+        dialecte = csv.excel
+    return csv.reader(io.StringIO(contenu), dialecte)
+
+
+def lire_fichier(fichier, type_fichier=None):
+    """
+    Lit tout le fichier et retourne une liste de dictionnaires, un par ligne
+    non vide, avec les champs de COLONNES et le numéro de ligne (`ligne`).
+
+    Lève ValueError si une colonne obligatoire est absente.
+    """
+    if type_fichier is None:
+        nom = getattr(fichier, 'name', '') or ''
+        type_fichier = 'csv' if nom.lower().endswith('.csv') else 'excel'
+    lignes = _lignes_csv(fichier) if type_fichier == 'csv' else _lignes_excel(fichier)
+
+    lignes = iter(lignes)
+    en_tetes = next(lignes, None) or []
+    champs = [COLONNES.get(normaliser_entete(en_tete)) for en_tete in en_tetes]
+    manquantes = [col for col in COLONNES_OBLIGATOIRES if col not in champs]
+    if manquantes:
+        raise ValueError(
+            f"Colonnes obligatoires manquantes : {', '.join(manquantes)}. "
+            f"Colonnes trouvées : {', '.join(_texte(e) for e in en_tetes if e is not None)}"
+        )
+
+    resultat = []
+    for numero, valeurs in enumerate(lignes, start=2):
+        if not any(v not in (None, '') for v in valeurs):
+            continue
+        donnees = {'ligne': numero}
+        for champ, valeur in zip(champs, valeurs):
+            if champ and champ not in donnees:
+                donnees[champ] = valeur
+        resultat.append(donnees)
+    return resultat
+
+
+def _date(valeur):
+    if valeur in (None, ''):
+        return None
+    if isinstance(valeur, datetime.datetime):
+        return valeur.date()
+    if isinstance(valeur, datetime.date):
+        return valeur
+    texte = str(valeur).strip()
+    for fmt in FORMATS_DATE:
+        try:
+            return datetime.datetime.strptime(texte, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Format de date non reconnu: {texte}")
+
+
+def _par_paquets(valeurs, taille=TAILLE_PAQUET_IN):
+    valeurs = list(valeurs)
+    for debut in range(0, len(valeurs), taille):
+        yield valeurs[debut:debut + taille]
+
+
+def _cle_doublon(nom, prenom, date_naissance):
+    return (nom.casefold(), prenom.casefold(), date_naissance)
+
+
+def _valider(lignes, rapport):
+    """Nettoie les lignes lues et écarte celles qui sont incomplètes ou invalides"""
+    limites = {champ: Eleve._meta.get_field(champ).max_length for champ in CHAMPS_LIMITES}
+    valides = []
+    for donnees in lignes:
+        ligne = {champ: _texte(donnees.get(champ)) for champ in COLONNES.values()}
+        ligne['ligne'] = donnees['ligne']
+        if not ligne['nom'] or not ligne['prenom']:
+            rapport['erreurs'].append(f"Ligne {ligne['ligne']}: Nom ou prénom manquant")
+            continue
+        try:
+            ligne['date_naissance'] = _date(donnees.get('date_naissance'))
+        except ValueError as e:
+            rapport['erreurs'].append(f"Ligne {ligne['ligne']}: {e}")
+            continue
+        trop_longs = [champ for champ, limite in limites.items() if len(ligne[champ]) > limite]
+        if trop_longs:
+            rapport['erreurs'].append(f"Ligne {ligne['ligne']}: Valeur trop longue ({', '.join(trop_longs)})")
+            continue
+        valides.append(ligne)
+    return valides
+
+
+def _ecarter_doublons(lignes, composante_id, rapport):
+    """Écarte les élèves déjà inscrits dans la composante et les doublons internes au fichier"""
+    existants = {
+        _cle_doublon(nom, prenom or '', date_naissance)
+        for nom, prenom, date_naissance in Eleve.objects.filter(composante_id=composante_id)
+        .values_list('nom', 'prenom', 'date_naissance')
+    }
+    retenues = []
+    for ligne in lignes:
+        cle = _cle_doublon(ligne['nom'], ligne['prenom'], ligne['date_naissance'])
+        if cle in existants:
+            date_texte = ligne['date_naissance'] or 'date inconnue'
+            rapport['erreurs'].append(
+                f"Ligne {ligne['ligne']}: L'élève {ligne['nom']} {ligne['prenom']} ({date_texte}) existe déjà"
+            )
+            continue
+        existants.add(cle)
+        retenues.append(ligne)
+    return retenues
+
+
+def _nom_creneau(nom):
+    """Retourne (heure_debut, heure_fin) pour un nom au format HH:MM-HH:MM, sinon None"""
+    morceaux = nom.split('-')
+    if len(morceaux) != 2:
+        return None
+    try:
+        return tuple(datetime.datetime.strptime(m.strip(), '%H:%M').time() for m in morceaux)
+    except ValueError:
+        return None
+
+
+def _resoudre(lignes, modele, champ_nom, champ_id, composante_id, creer_manquants, rapport, libelle):
+    """
+    Associe à chaque ligne l'objet `modele` désigné par nom ou par identifiant,
+    en une seule requête sur les objets de la composante. Les noms inconnus
+    sont créés si `creer_manquants` (en mémoire seulement : ils seront
+    enregistrés par `_enregistrer`).
+    """
+    demandes = [ligne for ligne in lignes if ligne[champ_nom] or ligne[champ_id]]
+    if not demandes:
+        return []
+    objets = list(modele.objects.filter(composante_id=composante_id))
+    par_id = {str(objet.id): objet for objet in objets}
+    par_nom = {objet.nom.casefold(): objet for objet in objets}
+
+    nouveaux = {}
+    for ligne in demandes:
+        objet = par_id.get(ligne[champ_id]) if ligne[champ_id] else par_nom.get(ligne[champ_nom].casefold())
+        if objet is None and ligne[champ_nom] and creer_manquants:
+            cle = ligne[champ_nom].casefold()
+            objet = nouveaux.get(cle)
+            if objet is None:
+                objet = modele(nom=ligne[champ_nom], composante_id=composante_id)
+                if modele is Creneau:
+                    heures = _nom_creneau(ligne[champ_nom])
+                    if heures is None:
+                        objet = None
+                    else:
+                        objet.heure_debut, objet.heure_fin = heures
+                if objet is not None:
+                    nouveaux[cle] = objet
+        if objet is None:
+            rapport['avertissements'].append(
+                f"Ligne {ligne['ligne']}: {libelle} « {ligne[champ_nom] or ligne[champ_id]} » introuvable"
+            )
+        ligne[f'{champ_nom}_objet'] = objet
+    return list(nouveaux.values())
+
+
+def _identifiants_existants(candidats):
+    existants = set()
+    for paquet in _par_paquets(candidats):
+        existants.update(User.objects.filter(username__in=paquet).values_list('username', flat=True))
+    return existants
+
+
+def attribuer_identifiants(bases):
+    """
+    Retourne un identifiant unique pour chaque base fournie. Les bases déjà
+    prises reçoivent un suffixe numérique ; les candidats sont vérifiés par
+    paquets plutôt qu'un par un.
+    """
+    identifiants = [None] * len(bases)
+    reserves = _identifiants_existants(set(bases))
+    a_suffixer = []
+    for index, base in enumerate(bases):
+        if base in reserves:
+            a_suffixer.append(index)
+        else:
+            identifiants[index] = base
+            reserves.add(base)
+
+    prochain_suffixe = {}
+    while a_suffixer:
+        fenetres = {
+            base: range(prochain_suffixe.get(base, 1), prochain_suffixe.get(base, 1) + nombre + 1)
+            for base, nombre in Counter(bases[index] for index in a_suffixer).items()
+        }
+        reserves |= _identifiants_existants({f"{base}{n}" for base, fenetre in fenetres.items() for n in fenetre})
+        restants = []
+        for index in a_suffixer:
+            base = bases[index]
+            libre = next((f"{base}{n}" for n in fenetres[base] if f"{base}{n}" not in reserves), None)
+            if libre is None:
+                restants.append(index)
+            else:
+                identifiants[index] = libre
+                reserves.add(libre)
+        for base, fenetre in fenetres.items():
+            prochain_suffixe[base] = fenetre.stop
+        a_suffixer = restants
+    return identifiants
+
+
+def _enregistrer(lignes, composante_id, classes_creees, creneaux_crees):
+    """Crée utilisateurs, élèves et relations par bulk_create dans une seule transaction"""
+    hachages = hacher_mots_de_passe([ligne['password'] for ligne in lignes])
+
+    with transaction.atomic():
+        if classes_creees:
+            Classe.objects.bulk_create(classes_creees)
+        if creneaux_crees:
+            Creneau.objects.bulk_create(creneaux_crees)
+
+        utilisateurs = User.objects.bulk_create([
+            User(
+                username=ligne['username'],
+                password=hachage,
+                first_name=ligne['prenom'][:150],
+                last_name=ligne['nom'][:150],
+                email=ligne['email'],
+            )
+            for ligne, hachage in zip(lignes, hachages)
+        ])
+        if any(u.pk is None for u in utilisateurs):
+            # Bases ne renvoyant pas les clés créées (MySQL) : relecture par identifiant
+            ids = dict(User.objects.filter(username__in=[u.username for u in utilisateurs])
+                       .values_list('username', 'id'))
+            for utilisateur in utilisateurs:
+                utilisateur.pk = ids[utilisateur.username]
+
+        groupe_eleves, _ = Group.objects.get_or_create(name='Élèves')
+        User.groups.through.objects.bulk_create([
+            User.groups.through(user_id=utilisateur.pk, group_id=groupe_eleves.pk)
+            for utilisateur in utilisateurs
+        ])
+
+        eleves = Eleve.objects.bulk_create([
+            Eleve(
+                nom=ligne['nom'],
+                prenom=ligne['prenom'],
+                classe=ligne.get('classe_objet'),
+                date_naissance=ligne['date_naissance'],
+                telephone=ligne['telephone'],
+                email=ligne['email'],
+                adresse=ligne['adresse'],
+                user=utilisateur,
+                mot_de_passe_en_clair=ligne['password'],
+                composante_id=composante_id,
+            )
+            for ligne, utilisateur in zip(lignes, utilisateurs)
+        ])
+        if any(e.pk is None for e in eleves):
+            ids = dict(Eleve.objects.filter(user_id__in=[u.pk for u in utilisateurs])
+                       .values_list('user_id', 'id'))
+            for eleve in eleves:
+                eleve.pk = ids[eleve.user_id]
+
+        Eleve.classes.through.objects.bulk_create([
+            Eleve.classes.through(eleve_id=eleve.pk, classe_id=ligne['classe_objet'].pk)
+            for ligne, eleve in zip(lignes, eleves) if ligne.get('classe_objet')
+        ])
+        Eleve.creneaux.through.objects.bulk_create([
+            Eleve.creneaux.through(eleve_id=eleve.pk, creneau_id=ligne['creneau_objet'].pk)
+            for ligne, eleve in zip(lignes, eleves) if ligne.get('creneau_objet')
+        ])
+
+    # bulk_create ne déclenche pas post_save : invalidation explicite du
+    # dashboard et du relevé des impayés
+    invalider_dashboard_stats(composante_id)
+    invalider_releve_impayes(composante_id)
+
+
+def importer_eleves(lignes, composante_id, creer_manquants=False, simulation=False):
+    """
+    Importe en lot les élèves lus par `lire_fichier` dans la composante.
+
+    Avec `creer_manquants`, les classes et créneaux inconnus sont créés dans
+    la composante (un créneau doit être nommé au format HH:MM-HH:MM). Avec
+    `simulation`, rien n'est écrit en base.
+
+    Retourne un rapport : nombre d'élèves créés (ou à créer) et ignorés,
+    erreurs et avertissements par ligne, identifiants générés, classes et
+    créneaux créés.
+    """
+    rapport = {
+        'simulation': simulation,
+        'crees': 0,
+        'ignores': 0,
+        'erreurs': [],
+        'avertissements': [],
+        'identifiants': [],
+        'classes_creees': [],
+        'creneaux_crees': [],
+    }
+
+    valides = _ecarter_doublons(_valider(lignes, rapport), composante_id, rapport)
+    rapport['ignores'] = len(lignes) - len(valides)
+
+    classes_creees = _resoudre(valides, Classe, 'classe', 'classe_id', composante_id,
+                               creer_manquants, rapport, "Classe")
+    creneaux_crees = _resoudre(valides, Creneau, 'creneau', 'creneau_id', composante_id,
+                               creer_manquants, rapport, "Créneau")
+    rapport['classes_creees'] = [classe.nom for classe in classes_creees]
+    rapport['creneaux_crees'] = [creneau.nom for creneau in creneaux_crees]
+
+    bases = [generate_username('eleve', f"{ligne['nom']}{ligne['prenom']}")[:140] for ligne in valides]
+    for ligne, username in zip(valides, attribuer_identifiants(bases)):
+        ligne['username'] = username
+        ligne['password'] = generate_password(f"{ligne['nom']} {ligne['prenom']}")
+        rapport['identifiants'].append({
+            'nom': f"{ligne['nom']} {ligne['prenom']}",
+            'username': username,
+            'password': ligne['password'],
+        })
+
+    if valides and not simulation:
+        _enregistrer(valides, composante_id, classes_creees, creneaux_crees)
+    rapport['crees'] = len(valides)
+    return rapport
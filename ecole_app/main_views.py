@@ -2,60 +2,39 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
-from django.db.models import Q, Count, Avg, F, Sum
+from django.db.models import Q, Count, Avg, F, Sum, Prefetch, Exists, OuterRef
+from django.db import transaction
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.models import User
 from django.utils.safestring import mark_safe
+from django.utils.html import format_html_join
 from django.core.mail import send_mail
 from django.conf import settings
+from urllib.parse import urlencode
 import csv
 import json
 import random
 import string
 from datetime import datetime
 import datetime
-from .models import Eleve, Professeur, Classe, Creneau, Paiement, ListeAttente, generer_mot_de_passe
+from .models import Eleve, Professeur, Classe, Creneau, Paiement, ListeAttente, EnvoiIdentifiants, generer_mot_de_passe
+from .dashboard_stats import get_dashboard_stats
+from .coran import get_corpus
+from .envoi_identifiants import creer_envoi
+from .exports_excel import reponse_excel, TAILLE_CHUNK
+from .identifiants import generate_username, generate_password
+from .import_eleves import lire_fichier, importer_eleves
+from .pagination import paginer, TAILLE_PAGE
 from .forms import EleveForm, EleveRapideForm, ProfesseurForm, ClasseForm, CreneauForm, PaiementForm, ImportDataForm, ExportDataForm, DesarchivageEleveForm, ListeAttenteForm
+from .regeneration_identifiants import regenerer_mots_de_passe
+from .soldes import recalculer_paiement
+from .statistiques_notes import SerieNotes
 import openpyxl
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, Border, Side
 from io import BytesIO
 
-# Fonctions utilitaires pour la génération d'identifiants et mots de passe
-def generate_username(nom, prenom):
-    """Génère un nom d'utilisateur au format prenom.nom"""
-    # Supprime les espaces et caractères spéciaux
-    nom_clean = ''.join(c for c in nom.lower() if c.isalnum())
-    prenom_clean = ''.join(c for c in prenom.lower() if c.isalnum())
-    
-    # Créer l'identifiant au format prenom.nom
-    return f"{prenom_clean}.{nom_clean}"
-
-def generate_password(nom_complet):
-    """Génère un mot de passe aléatoire basé sur le nom complet"""
-    import random
-    import string
-    
-    # Extraire le nom et prénom du nom complet si possible
-    parts = nom_complet.split() if nom_complet else []
-    
-    # Utiliser les 3 premières lettres du nom et prénom si disponibles
-    prefix = ""
-    if parts and len(parts) > 0:
-        prefix += parts[0][:3].lower()  # Première partie (nom)
-    if parts and len(parts) > 1:
-        prefix += parts[1][:3].lower()  # Deuxième partie (prénom)
-    
-    # Si le préfixe est trop court, ajouter des caractères aléatoires
-    while len(prefix) < 4:
-        prefix += random.choice(string.ascii_lowercase)
-    
-    # Ajouter 4 chiffres aléatoires
-    suffix = ''.join(random.choices(string.digits, k=4))
-    
-    return prefix + suffix
-
 # Vue principale - Dashboard
 @login_required
 def dashboard(request):
@@ -65,52 +44,8 @@ def dashboard(request):
         messages.warning(request, "Veuillez sélectionner une composante pour accéder au dashboard.")
         return redirect('selection_composante')
         
-    # Statistiques générales - filtrées par composante
-    total_eleves = Eleve.objects.filter(archive=False, composante_id=composante_id).count()
-    total_profs = Professeur.objects.filter(composantes__id=composante_id).count()
-    total_classes = Classe.objects.filter(composante_id=composante_id).count()
-    
-    # Calcul des statistiques d'occupation des classes - filtrées par composante
-    classes = Classe.objects.filter(composante_id=composante_id)
-    classe_stats = []
-    total_capacite = 0
-    
-    for classe in classes:
-        eleves_en_classe = classe.eleves.filter(archive=False).count()
-        capacite = classe.capacite or 20
-        total_capacite += capacite
-        taux_occupation = min(100, round((eleves_en_classe / capacite) * 100)) if capacite > 0 else 0
-        
-        classe_stats.append({
-            'id': classe.id,
-            'nom': classe.nom,
-            'eleves_en_classe': eleves_en_classe,
-            'capacite': capacite,
-            'taux_occupation': taux_occupation,
-            'creneau': classe.creneau,
-            'professeur': classe.professeur,
-        })
-    
-    # Taux de remplissage global
-    taux_remplissage = round((total_eleves / total_capacite) * 100) if total_capacite > 0 else 0
-    
-    # Statistiques financières
-    total_attendu = Eleve.objects.aggregate(total=Sum('montant_total'))['total'] or 0
-    total_collecte = Paiement.objects.aggregate(total=Sum('montant'))['total'] or 0
-    pourcentage_collecte = round((total_collecte / total_attendu) * 100) if total_attendu > 0 else 0
-
-    context = {
-        'total_eleves': total_eleves,
-        'total_profs': total_profs,
-        'total_classes': total_classes,
-        'total_creneaux': Creneau.objects.filter(composante_id=composante_id).count(),
-        'classe_stats': classe_stats,
-        'taux_remplissage': taux_remplissage,
-        'total_capacite': total_capacite,
-        'total_attendu': total_attendu,
-        'total_collecte': total_collecte,
-        'pourcentage_collecte': pourcentage_collecte,
-    }
+    # Statistiques agrégées par composante, mises en cache et invalidées par signaux
+    context = get_dashboard_stats(composante_id)
 
     return render(request, 'ecole_app/dashboard.html', context)
 
@@ -219,24 +154,22 @@ def eleve_home(request):
     if not eleve:
         return redirect('dashboard')
     
-    # Récupérer les notes d'examen de l'élève avec optimisation des requêtes
-    notes_examens = eleve.notes_examens.select_related('professeur', 'classe').order_by('-date_examen')[:10]
+    # Récupérer les 10 dernières notes d'examen de l'élève en une requête
+    notes_examens = list(
+        eleve.notes_examens.select_related('professeur', 'classe').order_by('-date_examen')[:10]
+    )
     
-    # Calculer les statistiques des notes
-    if notes_examens:
-        notes_list = [note.pourcentage for note in notes_examens]
-        moyenne_generale = round(sum(notes_list) / len(notes_list), 1)
-        derniere_note = notes_examens[0] if notes_examens else None
-    else:
-        moyenne_generale = 0
-        derniere_note = None
+    # Calculer les statistiques des notes sur la liste déjà chargée
+    serie = SerieNotes(note.pourcentage for note in notes_examens)
+    moyenne_generale = round(serie.moyenne, 1)
+    derniere_note = notes_examens[0] if notes_examens else None
     
     context = {
         'eleve': eleve,
         'notes_examens': notes_examens,
         'moyenne_generale': moyenne_generale,
         'derniere_note': derniere_note,
-        'nb_notes': notes_examens.count() if notes_examens else 0
+        'nb_notes': len(notes_examens)
     }
     
     return render(request, 'ecole_app/eleves/home.html', context)
@@ -281,27 +214,95 @@ def archives_eleves(request):
     # Filtres pour le tri
     classe_id = request.GET.get('classe')
     creneau_id = request.GET.get('creneau')
-    eleves = Eleve.objects.filter(archive=True, composante_id=composante_id)
-    if classe_id:
-        eleves = eleves.filter(classes__id=classe_id)
-    if creneau_id:
-        eleves = eleves.filter(creneau_id=creneau_id)
-    eleves = eleves.order_by('nom', 'prenom')
+    recherche = request.GET.get('q', '').strip()
+    eleves_filtres = filtrer_eleves(composante_id, recherche, classe_id, creneau_id, archive=True)
+    eleves = paginer(
+        eleves_filtres.prefetch_related('classes'),
+        CHAMPS_TRI_ELEVES,
+        apres=request.GET.get('apres'),
+        avant=request.GET.get('avant'),
+    )
     form = EleveForm()
     form_rapide = EleveRapideForm()
     from .models import Classe, Creneau
     classes = Classe.objects.filter(composante_id=composante_id).order_by('nom')
     creneaux = Creneau.objects.filter(composante_id=composante_id).order_by('nom')
+    filtres = {'classe': classe_id, 'creneau': creneau_id, 'q': recherche}
     context = {
         'eleves': eleves,
+        'total_eleves': eleves_filtres.count(),
         'form': form,
         'form_rapide': form_rapide,
         'archives_tab': True,
         'classes': classes,
         'creneaux': creneaux,
+        'recherche': recherche,
+        'filtres_query': urlencode({cle: valeur for cle, valeur in filtres.items() if valeur}),
     }
     return render(request, 'ecole_app/eleves/liste.html', context)
 
+CHAMPS_TRI_ELEVES = ('nom', 'prenom', 'id')
+
+
+def filtrer_eleves(composante_id, recherche='', classe_id=None, creneau_id=None, archive=False):
+    """
+    Élèves actifs (ou archivés) d'une composante filtrés par nom/prénom, classe et créneau.
+
+    Les filtres sur les relations many-to-many passent par des sous-requêtes
+    EXISTS pour éviter les doublons (et donc un DISTINCT sur toute la liste).
+    """
+    eleves = Eleve.objects.filter(composante_id=composante_id, archive=archive)
+    # Chaque mot recherché doit préfixer le nom ou le prénom
+    for mot in recherche.split():
+        eleves = eleves.filter(Q(nom__istartswith=mot) | Q(prenom__istartswith=mot))
+    if classe_id:
+        eleves = eleves.filter(Exists(
+            Eleve.classes.through.objects.filter(eleve_id=OuterRef('pk'), classe_id=classe_id)
+        ))
+    if creneau_id:
+        eleves = eleves.filter(Exists(
+            Eleve.creneaux.through.objects.filter(eleve_id=OuterRef('pk'), creneau_id=creneau_id)
+        ))
+    return eleves
+
+
+@login_required
+def recherche_eleves(request):
+    """Recherche paginée des élèves de la composante active, au format JSON"""
+    composante_id = request.session.get('composante_id')
+    if not composante_id:
+        return JsonResponse({'error': 'Aucune composante sélectionnée'}, status=400)
+    try:
+        classe_id = int(request.GET['classe']) if request.GET.get('classe') else None
+        creneau_id = int(request.GET['creneau']) if request.GET.get('creneau') else None
+        taille = min(max(int(request.GET.get('taille', TAILLE_PAGE)), 1), 200)
+    except ValueError:
+        return JsonResponse({'error': 'Paramètres invalides'}, status=400)
+    
+    eleves = paginer(
+        filtrer_eleves(composante_id, request.GET.get('q', '').strip(), classe_id, creneau_id)
+        .prefetch_related('classes', 'creneaux'),
+        CHAMPS_TRI_ELEVES,
+        apres=request.GET.get('apres'),
+        avant=request.GET.get('avant'),
+        taille=taille,
+    )
+    return JsonResponse({
+        'resultats': [{
+            'id': eleve.id,
+            'nom': eleve.nom,
+            'prenom': eleve.prenom,
+            'classes': [classe.nom for classe in eleve.classes.all()],
+            'creneaux': [creneau.nom for creneau in eleve.creneaux.all()],
+            'age': eleve.age,
+            'telephone': eleve.telephone,
+            'email': eleve.email,
+        } for eleve in eleves],
+        'suivant': eleves.suivant,
+        'precedent': eleves.precedent,
+    })
+
+
 @login_required
 def liste_eleves(request):
     # Vérifier si une composante est sélectionnée
@@ -313,18 +314,16 @@ def liste_eleves(request):
     # Filtres pour le tri
     classe_id = request.GET.get('classe')
     creneau_id = request.GET.get('creneau')
-    
-    # Construction de la requête de base
-    query = Q(composante_id=composante_id) & Q(archive=False)
-    
-    # Ajouter les filtres si nécessaire
-    if classe_id:
-        query &= Q(classes__id=classe_id)
-    if creneau_id:
-        query &= Q(creneau__id=creneau_id)
-    
-    # Exécuter la requête finale
-    eleves = Eleve.objects.filter(query).order_by('nom', 'prenom').distinct()
+    recherche = request.GET.get('q', '').strip()
+    
+    # Page courante, lue par curseur sur (nom, prenom, id)
+    eleves_filtres = filtrer_eleves(composante_id, recherche, classe_id, creneau_id)
+    eleves = paginer(
+        eleves_filtres.prefetch_related('classes'),
+        CHAMPS_TRI_ELEVES,
+        apres=request.GET.get('apres'),
+        avant=request.GET.get('avant'),
+    )
     form = EleveForm(request=request)  # Utiliser le formulaire complet par défaut
     form_rapide = EleveRapideForm()  # Formulaire rapide comme alternative
     
@@ -339,154 +338,18 @@ def liste_eleves(request):
                         messages.error(request, "Le fichier doit être au format Excel (.xlsx ou .xls)")
                         return redirect('liste_eleves')
                     
-                    # Charger le fichier Excel
-                    wb = load_workbook(excel_file)
-                    ws = wb.active
-                    
-                    # Colonnes attendues
-                    required_columns = ['Nom', 'Prénom']
-                    optional_columns = ['Classe', 'Date de naissance', 'Téléphone', 'Email', 'Adresse']
-                    expected_columns = required_columns + optional_columns
-
-                    import unicodedata
-                    def normalize(s):
-                        if not s:
-                            return ''
-                        return unicodedata.normalize('NFKD', str(s)).encode('ascii', 'ignore').decode('ascii').strip().lower()
-
-                    # Normaliser les en-têtes du fichier
-                    headers = [cell.value for cell in ws[1]]
-                    norm_headers = [normalize(h) for h in headers]
-                    norm_expected = [normalize(c) for c in expected_columns]
-
-                    # Vérifier les colonnes obligatoires manquantes
-                    missing_required = [col for col in required_columns if normalize(col) not in norm_headers]
-                    if missing_required:
-                        messages.error(request, f"Colonnes obligatoires manquantes dans le fichier Excel : {', '.join(missing_required)}.\nColonnes trouvées : {headers}")
-                        return redirect('liste_eleves')
-
-                    # Mapper les indices des colonnes (uniquement pour les colonnes présentes dans le fichier)
-                    column_indices = {}
-                    for col in expected_columns:
-                        try:
-                            column_indices[col] = norm_headers.index(normalize(col))
-                        except ValueError:
-                            # La colonne n'est pas dans le fichier, on l'ignore
-                            pass
-                    
-                    # Compteurs pour le suivi
-                    count_created = 0
-                    count_skipped = 0
-                    errors = []
+                    lignes = lire_fichier(excel_file, 'excel')
+                    rapport = importer_eleves(lignes, composante_id, simulation='simulation' in request.POST)
+                    errors = rapport['erreurs']
+                    count_created = rapport['crees']
+                    count_skipped = rapport['ignores']
                     
-                    # Parcourir les lignes (en commençant par la deuxième ligne)
-                    for row_idx, row in enumerate(ws.iter_rows(min_row=2), start=2):
-                        # Récupérer les valeurs (vérifier que les colonnes obligatoires sont présentes)
-                        try:
-                            nom = row[column_indices['Nom']].value
-                            prenom = row[column_indices['Prénom']].value
-                        except KeyError as e:
-                            errors.append(f"Ligne {row_idx}: Colonne manquante - {str(e)}")
-                            count_skipped += 1
-                            continue
-                        
-                        # Vérifier que nom et prénom sont présents
-                        if not nom or not prenom:
-                            errors.append(f"Ligne {row_idx}: Nom ou prénom manquant")
-                            count_skipped += 1
-                            continue
-                        
-                        # Récupérer les autres valeurs (toutes optionnelles sauf Nom et Prénom)
-                        classe_nom = row[column_indices.get('Classe')].value if 'Classe' in column_indices else None
-                        date_naissance_val = row[column_indices.get('Date de naissance')].value if 'Date de naissance' in column_indices else None
-                        telephone = row[column_indices.get('Téléphone')].value if 'Téléphone' in column_indices else ''
-                        email = row[column_indices.get('Email')].value if 'Email' in column_indices else ''
-                        adresse = row[column_indices.get('Adresse')].value if 'Adresse' in column_indices else ''
-                        
-                        # Initialiser la date de naissance par défaut
-                        date_naissance = None
-                        # Convertir la date de naissance si présente
-                        if date_naissance_val:
-                            if isinstance(date_naissance_val, datetime.datetime):
-                                date_naissance = date_naissance_val.date()
-                            elif isinstance(date_naissance_val, str):
-                                try:
-                                    # Essayer différents formats de date
-                                    formats = ['%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y']
-                                    for fmt in formats:
-                                        try:
-                                            date_naissance = datetime.datetime.strptime(date_naissance_val, fmt).date()
-                                            break
-                                        except ValueError:
-                                            continue
-                                    if not date_naissance:
-                                        raise ValueError(f"Format de date non reconnu: {date_naissance_val}")
-                                except ValueError as e:
-                                    errors.append(f"Ligne {row_idx}: {str(e)}")
-                                    count_skipped += 1
-                                    continue
-                        
-                        # Vérifier si l'élève existe déjà dans la même composante (nom, prénom ET date de naissance)
-                        if date_naissance is not None:
-                            existe = Eleve.objects.filter(
-                                nom__iexact=str(nom).strip(),
-                                prenom__iexact=str(prenom).strip(),
-                                date_naissance=date_naissance,
-                                composante_id=composante_id
-                            )
-                        else:
-                            existe = Eleve.objects.filter(
-                                nom__iexact=str(nom).strip(),
-                                prenom__iexact=str(prenom).strip(),
-                                date_naissance__isnull=True,
-                                composante_id=composante_id
-                            )
-                        if existe.exists():
-                            print('[DEBUG] Doublon détecté:', list(existe.values('id', 'nom', 'prenom', 'date_naissance')))
-                            errors.append(f"Ligne {row_idx}: L'élève {nom} {prenom} ({date_naissance if date_naissance else 'date inconnue'}) existe déjà")
-                            count_skipped += 1
-                            continue
-                        
-                        # Trouver la classe et le créneau correspondants
-                        classe = None
-                        if classe_nom:
-                            try:
-                                classe = Classe.objects.get(nom=classe_nom)
-                            except Classe.DoesNotExist:
-                                pass  # La classe est facultative
-                        
-                        creneau = None  # Le créneau n'est plus utilisé
-                        
-                        # Créer un utilisateur pour cet élève
-                        username = generate_username('eleve', f"{nom}{prenom}")
-                        password = generate_password(nom)  # Utiliser nom et prénom pour le mot de passe
-                        
-                        # Vérifier si le nom d'utilisateur existe déjà
-                        while User.objects.filter(username=username).exists():
-                            username = f"{username}{random.randint(1, 999)}"
-                        
-                        # Créer l'utilisateur
-                        user = User.objects.create_user(username=username, password=password)
-                        
-                        # Créer l'élève
-                        Eleve.objects.create(
-                            nom=nom,
-                            prenom=prenom,
-                            classe=classe,
-                            date_naissance=date_naissance,
-                            telephone=telephone,
-                            email=email,
-                            adresse=adresse,
-                            user=user,
-                            composante_id=composante_id
-                        )
-                        count_created += 1
-                    
-                    # Afficher un résumé
+                    if rapport['simulation']:
+                        messages.info(request, f"Simulation : {count_created} élève(s) seraient importés, {count_skipped} ignoré(s).")
                     # Affichage du message : si erreur, afficher uniquement error (barre rouge)
                     if errors:
                         messages.error(request, "Erreurs lors de l'import : " + "; ".join(errors[:5]) + ("... et d'autres" if len(errors) > 5 else ""))
-                    else:
+                    elif not rapport['simulation']:
                         if count_skipped > 0:
                             messages.warning(request, f"{count_skipped} élève(s) ignoré(s) lors de l'import.")
                         elif count_created > 0:
@@ -601,14 +464,18 @@ def liste_eleves(request):
                 return redirect('liste_eleves')
     
     from .models import Classe, Creneau
+    filtres = {'classe': classe_id, 'creneau': creneau_id, 'q': recherche}
     context = {
         'eleves': eleves,
+        'total_eleves': eleves_filtres.count(),
         'form': form,
         'form_rapide': form_rapide,
-        'classes': Classe.objects.all(),
-        'creneaux': Creneau.objects.all(),
+        'classes': Classe.objects.filter(composante_id=composante_id).order_by('nom'),
+        'creneaux': Creneau.objects.filter(composante_id=composante_id).order_by('nom'),
         'selected_classe': int(classe_id) if classe_id else None,
         'selected_creneau': int(creneau_id) if creneau_id else None,
+        'recherche': recherche,
+        'filtres_query': urlencode({cle: valeur for cle, valeur in filtres.items() if valeur}),
     }
     
     return render(request, 'ecole_app/eleves/liste.html', context)
@@ -657,27 +524,19 @@ def detail_eleve(request, eleve_id):
 
 @login_required
 def coran_eleve(request, eleve_id):
-    import os
-    import json
-    from django.conf import settings
     eleve = get_object_or_404(Eleve, id=eleve_id)
-    # Chemin vers le fichier JSON du Coran
-    coran_path = os.path.join(settings.BASE_DIR, 'ecole_app', 'static', 'coran', 'quran_ar.json')
-    with open(coran_path, encoding='utf-8') as f:
-        coran_data = json.load(f)
-    # Lire la liste complète des sourates depuis le fichier JSON
-    sourates_path = os.path.join(settings.BASE_DIR, 'ecole_app', 'static', 'coran', 'sourates.json')
-    with open(sourates_path, encoding='utf-8') as f:
-        sourates = json.load(f)
+    # Le corpus est chargé une seule fois par processus puis indexé par sourate
+    corpus = get_corpus()
     # Récupérer la sourate sélectionnée
-    sourate_num = int(request.GET.get('sourate', 1))
-    # Filtrer les versets de la sourate
-    versets = [v for v in coran_data['quran'] if v['sura'] == sourate_num]
+    try:
+        sourate_num = int(request.GET.get('sourate', 1))
+    except ValueError:
+        sourate_num = 1
     context = {
         'eleve': eleve,
-        'sourates': sourates,
+        'sourates': corpus.sourates,
         'sourate_active': sourate_num,
-        'versets': versets,
+        'versets': corpus.versets_sourate(sourate_num),
     }
     return render(request, 'ecole_app/eleves/coran.html', context)
 
@@ -1048,40 +907,11 @@ def import_data(request):
         try:
             fichier = request.FILES['fichier_import']
             type_fichier = form.cleaned_data['type_fichier']
-            count = 0
-            if type_fichier == 'csv':
-                decoded_file = fichier.read().decode('utf-8').splitlines()
-                reader = csv.DictReader(decoded_file)
-                for row in reader:
-                    Eleve.objects.create(
-                        nom=row.get('nom', ''),
-                        prenom=row.get('prenom', ''),
-                        classe_id=row.get('classe_id') or None,
-                        creneau_id=row.get('creneau_id') or None,
-                        date_naissance=row.get('date_naissance') or None,
-                        telephone=row.get('telephone', ''),
-                        email=row.get('email', ''),
-                        adresse=row.get('adresse', '')
-                    )
-                    count += 1
-            elif type_fichier == 'excel':
-                wb = openpyxl.load_workbook(fichier)
-                ws = wb.active
-                headers = [cell.value for cell in next(ws.iter_rows(min_row=1, max_row=1))]
-                for row in ws.iter_rows(min_row=2, values_only=True):
-                    data = dict(zip(headers, row))
-                    Eleve.objects.create(
-                        nom=data.get('nom', ''),
-                        prenom=data.get('prenom', ''),
-                        classe_id=data.get('classe_id') or None,
-                        creneau_id=data.get('creneau_id') or None,
-                        date_naissance=data.get('date_naissance') or None,
-                        telephone=data.get('telephone', ''),
-                        email=data.get('email', ''),
-                        adresse=data.get('adresse', '')
-                    )
-                    count += 1
-            messages.success(request, f'{count} élèves ont été importés avec succès !')
+            lignes = lire_fichier(fichier, type_fichier)
+            rapport = importer_eleves(lignes, request.session.get('composante_id'))
+            messages.success(request, f"{rapport['crees']} élèves ont été importés avec succès !")
+            if rapport['erreurs']:
+                messages.warning(request, "Lignes ignorées : " + "; ".join(rapport['erreurs'][:5]) + ("... et d'autres" if len(rapport['erreurs']) > 5 else ""))
         except Exception as e:
             messages.error(request, f'Erreur lors de l\'import : {str(e)}')
     return redirect('import_export')
@@ -1202,7 +1032,7 @@ def liste_paiements(request):
         return redirect('selection_composante')
         
     # Filtrer les paiements par composante active
-    paiements = Paiement.objects.filter(composante_id=composante_id).order_by('-date')
+    paiements = Paiement.objects.filter(composante_id=composante_id).select_related('eleve').order_by('-date')
     form = PaiementForm(request=request)
     
     if request.method == 'POST':
@@ -1324,36 +1154,27 @@ def detail_paiement(request, paiement_id):
 # Vue pour exporter les paiements
 @login_required
 def export_paiements(request):
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="paiements-{datetime.datetime.now().strftime("%Y%m%d")}.xlsx"'
-    
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Paiements"
-    
-    # Définir les en-têtes
-    headers = ['ID', 'Élève', 'Date', 'Montant', 'Méthode de paiement', 'Commentaire']
-    ws.append(headers)
-    
-    # Appliquer le style aux en-têtes
-    header_font = Font(bold=True)
-    for cell in ws[1]:
-        cell.font = header_font
-    
-    # Ajouter les données
-    paiements = Paiement.objects.all().order_by('-date')
-    for paiement in paiements:
-        ws.append([
+    # Parcours par paquets avec l'élève joint : pas de requête par ligne
+    paiements = Paiement.objects.select_related('eleve').order_by('-date').iterator(chunk_size=TAILLE_CHUNK)
+    lignes = (
+        [
             paiement.id,
             f"{paiement.eleve.nom} {paiement.eleve.prenom}",
             paiement.date,
             paiement.montant,
             paiement.get_methode_display(),
             paiement.commentaire or ""
-        ])
-    
-    wb.save(response)
-    return response
+        ]
+        for paiement in paiements
+    )
+    
+    return reponse_excel(
+        f'paiements-{datetime.datetime.now().strftime("%Y%m%d")}.xlsx',
+        "Paiements",
+        ['ID', 'Élève', 'Date', 'Montant', 'Méthode de paiement', 'Commentaire'],
+        lignes,
+        largeurs=[8, 30, 12, 12, 20, 40],
+    )
 
 # Vue pour supprimer un paiement
 @login_required
@@ -1375,10 +1196,9 @@ def regenerer_password_eleve(request, eleve_id):
         messages.error(request, "Cet élève n'a pas de compte utilisateur associé.")
         return redirect('detail_eleve', eleve_id=eleve.id)
     
-    # Générer un nouveau mot de passe
-    password = generate_password(eleve.nom, eleve.prenom)
-    eleve.user.set_password(password)
-    eleve.user.save()
+    # Générer un nouveau mot de passe (enregistré aussi en clair pour l'affichage)
+    password = regenerer_mots_de_passe(
+        [eleve], generer=lambda e: generate_password(f"{e.nom} {e.prenom}"))[0]['mot_de_passe']
     
     # Stocker le mot de passe temporairement dans la session pour l'affichage
     request.session['temp_password'] = password
@@ -1399,10 +1219,8 @@ def regenerer_password_professeur(request, professeur_id):
         messages.error(request, "Ce professeur n'a pas de compte utilisateur associé.")
         return redirect('detail_professeur', professeur_id=professeur.id)
     
-    # Générer un nouveau mot de passe
-    password = generate_password(professeur.nom)
-    professeur.user.set_password(password)
-    professeur.user.save()
+    # Générer un nouveau mot de passe (enregistré aussi en clair pour l'affichage)
+    password = regenerer_mots_de_passe([professeur], generer=lambda p: generate_password(p.nom))[0]['mot_de_passe']
     
     # Stocker le mot de passe temporairement dans la session pour l'affichage
     request.session['temp_password'] = password
@@ -1695,10 +1513,8 @@ def envoyer_identifiants_professeur(request, professeur_id):
         messages.error(request, "Veuillez fournir une adresse email valide.")
         return redirect('detail_professeur', professeur_id=professeur.id)
     
-    # Générer un nouveau mot de passe
-    password = generate_password(professeur.nom)
-    professeur.user.set_password(password)
-    professeur.user.save()
+    # Générer un nouveau mot de passe (enregistré aussi en clair pour l'affichage)
+    password = regenerer_mots_de_passe([professeur], generer=lambda p: generate_password(p.nom))[0]['mot_de_passe']
     
     # Envoyer l'email avec les identifiants
     subject = "Vos identifiants de connexion - École Al Markaz"
@@ -1836,56 +1652,35 @@ def export_eleves_excel(request):
     if classe_id:
         eleves = eleves.filter(classes__id=classe_id)
     if creneau_id:
-        eleves = eleves.filter(creneau_id=creneau_id)
-    
-    # Créer le fichier Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Élèves"
-    
-    # Définir les en-têtes
-    headers = ['ID', 'Nom', 'Prénom', 'Classe', 'Créneau', 'Date de naissance', 'Téléphone', 'Email', 'Adresse']
-    ws.append(headers)
-    
-    # Appliquer le style aux en-têtes
-    header_font = Font(bold=True)
-    for cell in ws[1]:
-        cell.font = header_font
-    
-    # Ajouter les données
-    for eleve in eleves:
-        ws.append([
-            eleve.id,
-            eleve.nom,
-            eleve.prenom,
-            ", ".join([classe.nom for classe in eleve.classes.all()]) if eleve.classes.exists() else "",
-            ", ".join([classe.creneau.nom for classe in eleve.classes.all() if classe.creneau]) if eleve.classes.exists() else "",
-            eleve.date_naissance if eleve.date_naissance else "",
-            eleve.telephone or "",
-            eleve.email or "",
-            eleve.adresse or ""
-        ])
-    
-    # Ajuster les largeurs de colonnes
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            if cell.value:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-    
-    # Sauvegarder et renvoyer le fichier
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = f'attachment; filename="eleves-{datetime.datetime.now().strftime("%Y%m%d")}.xlsx"'
-    
-    wb.save(response)
-    return response
+        eleves = eleves.filter(creneaux__id=creneau_id)
+    
+    # Classes et créneaux préchargés par paquet pour éviter les requêtes par ligne
+    eleves = eleves.distinct().order_by('nom', 'prenom', 'id').prefetch_related(
+        Prefetch('classes', queryset=Classe.objects.select_related('creneau'))
+    ).iterator(chunk_size=TAILLE_CHUNK)
+    
+    def lignes():
+        for eleve in eleves:
+            classes = list(eleve.classes.all())
+            yield [
+                eleve.id,
+                eleve.nom,
+                eleve.prenom,
+                ", ".join(classe.nom for classe in classes),
+                ", ".join(classe.creneau.nom for classe in classes if classe.creneau),
+                eleve.date_naissance if eleve.date_naissance else "",
+                eleve.telephone or "",
+                eleve.email or "",
+                eleve.adresse or ""
+            ]
+    
+    return reponse_excel(
+        f'eleves-{datetime.datetime.now().strftime("%Y%m%d")}.xlsx',
+        "Élèves",
+        ['ID', 'Nom', 'Prénom', 'Classe', 'Créneau', 'Date de naissance', 'Téléphone', 'Email', 'Adresse'],
+        lignes(),
+        largeurs=[8, 20, 20, 25, 25, 18, 16, 30, 40],
+    )
 
 # Vue pour importer des élèves depuis un fichier Excel
 @login_required
@@ -1893,97 +1688,20 @@ def import_eleves_excel(request):
     if request.method == 'POST' and request.FILES.get('excel_file'):
         try:
             excel_file = request.FILES['excel_file']
-            wb = openpyxl.load_workbook(excel_file)
-            ws = wb.active
-            
-            # Récupérer les en-têtes
-            headers = [str(cell.value).strip() for cell in ws[1]]
-            required_headers = ['Nom', 'Prénom']
-            
-            # Vérifier que les colonnes obligatoires sont présentes
-            for header in required_headers:
-                if header not in headers:
-                    messages.error(request, f'La colonne {header} est obligatoire dans le fichier Excel.')
-                    return redirect('liste_eleves')
-            
-            # Créer les élèves
-            eleves_created = 0
-            for row in ws.iter_rows(min_row=2, values_only=True):
-                row_data = dict(zip(headers, row))
-                
-                # Vérifier les données obligatoires
-                if not row_data.get('Nom') or not row_data.get('Prénom'):
-                    continue
-                
-                # Récupérer la classe et le créneau s'ils existent
-                classe = None
-                creneau = None
-                
-                if 'Classe' in headers and row_data.get('Classe'):
-                    classe_nom = row_data.get('Classe')
-                    classe, created = Classe.objects.get_or_create(nom=classe_nom)
-                
-                if 'Créneau' in headers and row_data.get('Créneau'):
-                    creneau_nom = row_data.get('Créneau')
-                    # Formater l'heure début et fin depuis le nom du créneau (format supposé: "HH:MM-HH:MM")
-                    creneau_parts = creneau_nom.split('-')
-                    if len(creneau_parts) == 2:
-                        heure_debut = creneau_parts[0].strip()
-                        heure_fin = creneau_parts[1].strip()
-                        creneau, created = Creneau.objects.get_or_create(
-                            nom=creneau_nom,
-                            defaults={
-                                'heure_debut': heure_debut,
-                                'heure_fin': heure_fin
-                            }
-                        )
-                
-                nom = row_data.get('Nom')
-                prenom = row_data.get('Prénom')
-                
-                # Créer un utilisateur pour cet élève
-                username = generate_username('eleve', f"{nom}{prenom}")
-                password = generate_password(f"{nom} {prenom}")
-                
-                # Vérifier si le nom d'utilisateur existe déjà
-                while User.objects.filter(username=username).exists():
-                    username = f"{username}{random.randint(1, 999)}"
-                
-                # Créer l'utilisateur
-                user = User.objects.create_user(username=username, password=password)
-                
-                # Créer l'élève et associer l'utilisateur
-                Eleve.objects.create(
-                    nom=nom,
-                    prenom=prenom,
-                    classe=classe,
-                    creneau=creneau,
-                    date_naissance=row_data.get('Date de naissance'),
-                    telephone=row_data.get('Téléphone', ''),
-                    email=row_data.get('Email', ''),
-                    adresse=row_data.get('Adresse', ''),
-                    user=user
-                )
-                
-                # Stocker les informations d'identification pour l'affichage ultérieur
-                if not hasattr(request, 'imported_credentials'):
-                    request.imported_credentials = []
-                request.imported_credentials.append({
-                    'nom': f"{nom} {prenom}",
-                    'username': username,
-                    'password': password
-                })
-                eleves_created += 1
+            lignes = lire_fichier(excel_file, 'excel')
+            rapport = importer_eleves(lignes, request.session.get('composante_id'), creer_manquants=True)
             
             # Créer un message pour indiquer le nombre d'élèves importés
-            success_msg = f'{eleves_created} élèves ont été importés avec succès!'
+            success_msg = f"{rapport['crees']} élèves ont été importés avec succès!"
             
             # Ajouter les informations d'identification
-            if hasattr(request, 'imported_credentials') and request.imported_credentials:
+            if rapport['identifiants']:
                 success_msg += '<br><br><strong>Identifiants de connexion créés:</strong><br>'
                 success_msg += '<div style="max-height: 200px; overflow-y: auto; margin-top: 10px;">'
-                for cred in request.imported_credentials:
-                    success_msg += f"<div>- {cred['nom']}: Identifiant <strong>{cred['username']}</strong> | Mot de passe <strong>{cred['password']}</strong></div>"
+                success_msg += format_html_join(
+                    '', "<div>- {}: Identifiant <strong>{}</strong> | Mot de passe <strong>{}</strong></div>",
+                    ((cred['nom'], cred['username'], cred['password']) for cred in rapport['identifiants'])
+                )
                 success_msg += '</div>'
                 success_msg += '<br><div class="alert alert-warning">Veuillez noter ces identifiants car ils ne seront plus affichés.</div>'
             
@@ -2001,13 +1719,12 @@ from decimal import Decimal
 
 # Fonction utilitaire pour recalculer le montant total d'un paiement
 def recalculer_montant_paiement(paiement):
-    """Recalcule le montant total d'un paiement à partir de ses historiques"""
-    total = Decimal('0.00')
-    for historique in paiement.historiques.all():
-        total += historique.montant
-    paiement.montant = total
-    paiement.save()
-    return total
+    """
+    Recalcule le montant total d'un paiement à partir de ses historiques,
+    en base et avec le solde de l'élève (voir soldes.recalculer_paiement)
+    """
+    paiement.montant = recalculer_paiement(paiement.pk)
+    return paiement.montant
 
 # Vue pour modifier un historique de paiement
 @login_required
@@ -2029,10 +1746,11 @@ def modifier_historique_paiement(request, historique_id):
         historique.date = date
         historique.methode = methode
         historique.commentaire = commentaire
-        historique.save()
-        
-        # Recalculer le montant total du paiement à partir de tous les historiques
-        recalculer_montant_paiement(paiement)
+        with transaction.atomic():
+            historique.save()
+            
+            # Recalculer le montant total du paiement à partir de tous les historiques
+            recalculer_montant_paiement(paiement)
         
         messages.success(request, 'L\'historique de paiement a été modifié avec succès!')
         return redirect('detail_paiement', paiement_id=paiement.id)
@@ -2053,11 +1771,12 @@ def supprimer_historique_paiement(request, historique_id):
         # Sauvegarder une référence au paiement avant de supprimer l'historique
         paiement_ref = paiement
         
-        # Supprimer l'historique
-        historique.delete()
-        
-        # Recalculer le montant total du paiement à partir des historiques restants
-        recalculer_montant_paiement(paiement_ref)
+        with transaction.atomic():
+            # Supprimer l'historique
+            historique.delete()
+            
+            # Recalculer le montant total du paiement à partir des historiques restants
+            recalculer_montant_paiement(paiement_ref)
         
         messages.success(request, 'L\'historique de paiement a été supprimé avec succès!')
         return redirect('detail_paiement', paiement_id=paiement.id)
@@ -2097,259 +1816,44 @@ def envoyer_tous_identifiants(request):
         messages.warning(request, "Veuillez sélectionner une composante.")
         return redirect('selection_composante')
     
-    # Construction de la requête de base (même logique que dans liste_eleves)
-    query = Q(composante_id=composante_id) & Q(archive=False)
+    # Mêmes filtres que la liste (recherche, classe, créneau), transmis par le formulaire
+    eleves = filtrer_eleves(
+        composante_id,
+        request.POST.get('q', '').strip(),
+        request.POST.get('classe') or None,
+        request.POST.get('creneau') or None,
+    )
+    eleve_ids = list(eleves.values_list('id', flat=True))
+    if not eleve_ids:
+        messages.warning(request, "Aucun élève ne correspond aux critères actuels.")
+        return redirect('liste_eleves')
     
-    # Récupérer les filtres de la session ou des paramètres
-    classe_id = request.session.get('classe_filter')
-    creneau_id = request.session.get('creneau_filter')
+    # Mettre l'envoi en file d'attente : il est traité en arrière-plan par la
+    # commande traiter_envois_identifiants pour ne pas bloquer la requête
+    envoi = creer_envoi(composante_id, eleve_ids, request.user)
+    request.session['envoi_identifiants_id'] = envoi.id
+    messages.info(request, f"L'envoi des identifiants à {envoi.total} élève(s) a été mis en file d'attente.")
     
-    # Ajouter les filtres si nécessaire
-    if classe_id:
-        query &= Q(classes__id=classe_id)
-    if creneau_id:
-        query &= Q(creneau__id=creneau_id)
-    
-    # Récupérer tous les élèves correspondant aux critères
-    eleves = Eleve.objects.filter(query).distinct()
-    
-    # Compteurs pour les statistiques
-    total_eleves = eleves.count()
-    eleves_avec_email = 0
-    eleves_sans_email = 0
-    eleves_sans_compte = 0
-    emails_envoyes = 0
-    erreurs = 0
-    
-    # Traiter chaque élève
-    for eleve in eleves:
-        # Vérifier si l'élève a un compte utilisateur et un email
-        if not eleve.user:
-            eleves_sans_compte += 1
-            continue
-        
-        if not eleve.email:
-            eleves_sans_email += 1
-            continue
-        
-        eleves_avec_email += 1
-        
-        try:
-            # Générer un nouveau mot de passe au format nom.prenom1
-            nom = eleve.nom.lower() if eleve.nom else ''
-            prenom = eleve.prenom.lower() if eleve.prenom else ''
-            
-            # Nettoyer les caractères spéciaux et espaces
-            import re
-            nom = re.sub(r'[^a-z0-9]', '', nom)
-            prenom = re.sub(r'[^a-z0-9]', '', prenom)
-            
-            # Créer le mot de passe au format nom.prenom1
-            password = f"{nom}.{prenom}1" if nom and prenom else generer_mot_de_passe()
-            
-            # Mettre à jour le mot de passe de l'utilisateur
-            eleve.user.set_password(password)
-            eleve.user.save()
-            
-            # Mettre à jour le mot de passe en clair pour l'affichage
-            eleve.mot_de_passe_en_clair = password
-            eleve.save()
-            
-            # Envoyer l'email avec les identifiants
-            subject = "Vos identifiants de connexion - Al Markaz"
-            
-            # Message HTML avec des couleurs et un design élaboré
-            html_message = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="UTF-8">
-                <style>
-                    body {{
-                        font-family: Arial, sans-serif;
-                        line-height: 1.6;
-                        color: #333;
-                        margin: 0;
-                        padding: 0;
-                    }}
-                    .container {{
-                        max-width: 600px;
-                        margin: 0 auto;
-                        padding: 20px;
-                    }}
-                    .header {{
-                        background: linear-gradient(135deg, #1e7e34, #218838);
-                        color: white;
-                        padding: 20px;
-                        text-align: center;
-                        font-size: 24px;
-                        font-weight: bold;
-                        border-radius: 5px 5px 0 0;
-                    }}
-                    .content {{
-                        background-color: #f9f9f9;
-                        padding: 20px;
-                        border-left: 1px solid #ddd;
-                        border-right: 1px solid #ddd;
-                    }}
-                    .arabic {{
-                        font-family: 'Traditional Arabic', 'Arial', sans-serif;
-                        font-size: 24px;
-                        text-align: center;
-                        margin: 20px 0;
-                        color: #006400;
-                        direction: rtl;
-                    }}
-                    .greeting {{
-                        margin-bottom: 20px;
-                        font-size: 16px;
-                    }}
-                    .credentials {{
-                        background-color: #f0f8ff;
-                        border: 1px solid #4CAF50;
-                        border-radius: 5px;
-                        padding: 15px;
-                        margin: 20px 0;
-                    }}
-                    .credential-item {{
-                        margin-bottom: 10px;
-                    }}
-                    .credential-label {{
-                        font-weight: bold;
-                        color: #006400;
-                    }}
-                    .credential-value {{
-                        font-family: monospace;
-                        background-color: #f5f5f5;
-                        padding: 2px 5px;
-                        border-radius: 3px;
-                    }}
-                    .advice {{
-                        background-color: #fffacd;
-                        border-left: 4px solid #ffd700;
-                        padding: 10px 15px;
-                        margin: 20px 0;
-                    }}
-                    .quote {{
-                        font-style: italic;
-                        background-color: #e8f5e9;
-                        padding: 15px;
-                        border-radius: 5px;
-                        margin: 20px 0;
-                        text-align: center;
-                    }}
-                    .footer {{
-                        background-color: #f5f5f5;
-                        padding: 10px 20px;
-                        text-align: center;
-                        font-size: 12px;
-                        color: #666;
-                        border-radius: 0 0 5px 5px;
-                        border: 1px solid #ddd;
-                    }}
-                    .mosque-icon {{
-                        font-size: 24px;
-                        text-align: center;
-                        margin: 10px 0;
-                    }}
-                    .signature {{
-                        margin-top: 20px;
-                        font-weight: bold;
-                    }}
-                </style>
-            </head>
-            <body>
-            <div class="container">
-                <div class="header">
-                    Al Markaz
-                </div>
-                <div class="content">
-                    <div class="arabic">بِسْمِ اللَّهِ الرَّحْمَـٰنِ الرَّحِيمِ</div>
-                    
-                    <div class="greeting">
-                        Assalamu alaykum wa rahmatullahi wa barakatuh <strong>{eleve.prenom} {eleve.nom}</strong>,
-                    </div>
-                    
-                    <p>Nous vous transmettons vos identifiants de connexion :</p>
-                    
-                    <div class="credentials">
-                        <div class="credential-item">
-                            <span class="credential-label">📱 Identifiant</span>: 
-                            <span class="credential-value">{eleve.user.username}</span>
-                        </div>
-                        <div class="credential-item">
-                            <span class="credential-label">🔐 Mot de passe</span>: 
-                            <span class="credential-value">{password}</span>
-                        </div>
-                    </div>
-                    
-                    <div class="advice">
-                        <p>🌙 <strong>Conseil</strong> : Gardez ces informations confidentielles et changez votre mot de passe régulièrement.</p>
-                    </div>
-                    
-                    <div class="mosque-icon">🕋</div>
-                    
-                    <div class="quote">
-                        "Et rappelle-toi ton Seigneur dans ton âme avec humilité et crainte, et à voix basse, le matin et le soir, et ne sois pas du nombre des négligents."
-                        <br><strong>Coran 7:205</strong>
-                    </div>
-                    
-                    <div class="signature">
-                        Barakallahu fikum,<br>
-                        L'équipe Al Markaz
-                    </div>
-                </div>
-                <div class="footer">
-                    &copy; {datetime.datetime.now().year} Al Markaz - Tous droits réservés
-                </div>
-            </div>
-            </body>
-            </html>
-            """
-            
-            # Message texte simple pour les clients qui ne supportent pas le HTML
-            message = f"""بِسْمِ اللَّهِ الرَّحْمَـٰنِ الرَّحِيمِ
-
-Assalamu alaykum wa rahmatullahi wa barakatuh {eleve.prenom} {eleve.nom},
-
-Nous vous transmettons vos identifiants de connexion :
-
-📱 Identifiant : {eleve.user.username}
-🔐 Mot de passe : {password}
-
-🌙 Conseil : Gardez ces informations confidentielles et changez votre mot de passe régulièrement.
+    return redirect('liste_eleves')
 
-📖 "Et rappelle-toi ton Seigneur dans ton âme avec humilité et crainte, et à voix basse, le matin et le soir, et ne sois pas du nombre des négligents." - Coran 7:205
 
-Barakallahu fikum,
-L'équipe Al Markaz
-"""
-            
-            sender_email = settings.DEFAULT_FROM_EMAIL
-            recipient_list = [eleve.email]
-            
-            # Envoyer l'email avec les deux versions (HTML et texte)
-            from django.core.mail import EmailMultiAlternatives
-            email_message = EmailMultiAlternatives(subject, message, sender_email, recipient_list)
-            email_message.attach_alternative(html_message, "text/html")
-            email_message.send()
-            
-            emails_envoyes += 1
-        except Exception as e:
-            erreurs += 1
-            print(f"Erreur pour l'élève {eleve.id} - {eleve.nom} {eleve.prenom}: {str(e)}")
-    
-    # Afficher un résumé des opérations
-    if emails_envoyes > 0:
-        messages.success(request, f"{emails_envoyes} email(s) envoyé(s) avec succès.")
-    
-    if eleves_sans_email > 0:
-        messages.warning(request, f"{eleves_sans_email} élève(s) sans adresse email.")
-    
-    if eleves_sans_compte > 0:
-        messages.warning(request, f"{eleves_sans_compte} élève(s) sans compte utilisateur.")
-    
-    if erreurs > 0:
-        messages.error(request, f"{erreurs} erreur(s) lors de l'envoi des emails.")
-    
-    return redirect('liste_eleves')
+@login_required
+def progression_envoi_identifiants(request, envoi_id):
+    """Retourne l'avancement d'un envoi groupé d'identifiants (interrogé en AJAX par la liste des élèves)"""
+    envoi = get_object_or_404(EnvoiIdentifiants, id=envoi_id, composante_id=request.session.get('composante_id'))
+    termine = envoi.statut in ('termine', 'echec')
+    if termine and request.session.get('envoi_identifiants_id') == envoi.id:
+        del request.session['envoi_identifiants_id']
+    return JsonResponse({
+        'id': envoi.id,
+        'statut': envoi.statut,
+        'statut_display': envoi.get_statut_display(),
+        'termine': termine,
+        'total': envoi.total,
+        'traites': envoi.traites,
+        'pourcentage': envoi.pourcentage,
+        'envoyes': envoi.envoyes,
+        'sans_email': envoi.sans_email,
+        'sans_compte': envoi.sans_compte,
+        'erreurs': envoi.erreurs,
+    })
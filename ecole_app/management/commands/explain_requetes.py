@@ -0,0 +1,56 @@
+import datetime
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ecole_app.main_views import CHAMPS_TRI_ELEVES, filtrer_eleves
+from ecole_app.models import Memorisation, ObjectifMensuel, Paiement, PresenceEleve, Revision
+from ecole_app.models_pedagogie import TentativeQuiz
+
+# Parcours complet d'une table : "SCAN table" sans index (SQLite), "Seq Scan" (PostgreSQL)
+MOTIF_PARCOURS_COMPLET = re.compile(r'^\s*(?:.*\bSCAN \w+$|.*Seq Scan on)', re.MULTILINE)
+
+
+def requetes_principales(identifiant, jour):
+    """Requêtes représentatives des vues les plus sollicitées"""
+    debut_mois = jour.replace(day=1)
+    return [
+        ("Liste paginée des élèves", filtrer_eleves(identifiant).order_by(*CHAMPS_TRI_ELEVES)[:51]),
+        ("Appel d'une classe", PresenceEleve.objects.filter(classe_id=identifiant, date=jour)),
+        ("Absences d'un élève", PresenceEleve.objects.filter(eleve_id=identifiant, present=False,
+                                                             date__gte=debut_mois)),
+        ("Objectifs mensuels d'un élève", ObjectifMensuel.objects.filter(eleve_id=identifiant, mois=debut_mois)),
+        ("Mémorisations du mois", Memorisation.objects.filter(carnet_id=identifiant, date__gte=debut_mois)),
+        ("Révisions du mois", Revision.objects.filter(carnet_id=identifiant, date__gte=debut_mois)),
+        ("Tentatives terminées d'un quiz", TentativeQuiz.objects.filter(quiz_id=identifiant, eleve_id=identifiant,
+                                                                         terminee=True)),
+        ("Paiements d'une composante", Paiement.objects.filter(composante_id=identifiant, date__gte=debut_mois)),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Affiche le plan d'exécution (EXPLAIN) des requêtes principales pour repérer les parcours complets de table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--id', type=int, default=1,
+                            help="Identifiant utilisé dans les filtres (composante, classe, élève...)")
+        parser.add_argument('--strict', action='store_true',
+                            help="Échouer si une requête parcourt une table entière")
+
+    def handle(self, *args, **options):
+        parcours_complets = []
+        for titre, queryset in requetes_principales(options['id'], datetime.date.today()):
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(titre))
+            self.stdout.write(plan)
+            if MOTIF_PARCOURS_COMPLET.search(plan):
+                parcours_complets.append(titre)
+                self.stdout.write(self.style.WARNING("  -> parcours complet de table"))
+            self.stdout.write('')
+
+        self.stdout.write(f"Base : {connection.vendor}")
+        if not parcours_complets:
+            self.stdout.write(self.style.SUCCESS("Toutes les requêtes utilisent un index."))
+        elif options['strict']:
+            raise CommandError(f"Parcours complet de table : {', '.join(parcours_complets)}")
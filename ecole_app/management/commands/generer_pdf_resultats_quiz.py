@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ecole_app.models_pedagogie import Quiz
+from ecole_app.resultats_quiz_pdf import generer_bundle_resultats_classe
+
+
+class Command(BaseCommand):
+    help = ("Génère les PDF de résultats d'un quiz et les regroupe en une archive ZIP par classe "
+            "(les PDF restent dans le cache pour les téléchargements suivants).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz_id', type=int)
+        parser.add_argument('--classe', type=int, action='append', dest='classe_ids',
+                            help="Limiter à une classe du module (répétable, toutes par défaut)")
+        parser.add_argument('--sortie', default='.', help="Dossier où écrire les archives")
+
+    def handle(self, *args, **options):
+        quiz = Quiz.objects.select_related('module').filter(id=options['quiz_id']).first()
+        if quiz is None:
+            raise CommandError(f"Quiz introuvable : {options['quiz_id']}")
+
+        classes = quiz.module.classes.all()
+        if options['classe_ids']:
+            classes = classes.filter(id__in=options['classe_ids'])
+
+        sortie = Path(options['sortie'])
+        sortie.mkdir(parents=True, exist_ok=True)
+        for classe in classes:
+            chemin = sortie / f"resultats_quiz{quiz.pk}_classe{classe.pk}.zip"
+            nombre = generer_bundle_resultats_classe(quiz, classe, chemin)
+            if nombre:
+                self.stdout.write(self.style.SUCCESS(f"{classe.nom} : {nombre} PDF -> {chemin}"))
+            else:
+                chemin.unlink(missing_ok=True)
+                self.stdout.write(f"{classe.nom} : aucune tentative terminée")
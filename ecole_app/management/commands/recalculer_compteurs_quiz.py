@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from ecole_app.models_pedagogie import Quiz
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs matérialisés des quiz (tentatives, scores, réponses par question)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, action='append', dest='quiz_ids',
+                            help="Identifiant d'un quiz à recalculer (répétable, tous par défaut)")
+
+    def handle(self, *args, **options):
+        quiz = Quiz.objects.all()
+        if options['quiz_ids']:
+            quiz = quiz.filter(id__in=options['quiz_ids'])
+
+        total = 0
+        for un_quiz in quiz.iterator():
+            un_quiz.recalculer_compteurs()
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"Compteurs recalculés pour {total} quiz."))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from ecole_app.soldes import reconcilier_soldes, recalculer_paiements
+
+
+class Command(BaseCommand):
+    help = ("Compare le total payé enregistré de chaque élève (Eleve.montant_paye) à la somme de ses paiements "
+            "et corrige les écarts, par exemple après un import ou une modification faite hors de l'application.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--eleve', type=int, action='append', dest='eleves',
+                            help="Limiter la vérification à un élève (option répétable ; tous par défaut)")
+        parser.add_argument('--verifier', action='store_true',
+                            help="Lister les écarts sans les corriger")
+        parser.add_argument('--paiements', action='store_true',
+                            help="Recalculer d'abord le montant des paiements à partir de leurs historiques")
+        parser.add_argument('--composante', type=int,
+                            help="Limiter le recalcul des paiements à une composante (avec --paiements)")
+
+    def handle(self, *args, **options):
+        if options['paiements'] and not options['verifier']:
+            nombre = recalculer_paiements(composante_id=options['composante'])
+            self.stdout.write(self.style.SUCCESS(f"{nombre} paiement(s) recalculé(s) à partir des historiques."))
+        ecarts = reconcilier_soldes(eleve_ids=options['eleves'], corriger=not options['verifier'])
+        for eleve_id, enregistre, reel in ecarts:
+            self.stdout.write(f"Élève {eleve_id} : {enregistre} € enregistrés, {reel} € payés")
+        if options['verifier']:
+            self.stdout.write(self.style.SUCCESS(f"{len(ecarts)} solde(s) en écart."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"{len(ecarts)} solde(s) corrigé(s)."))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from ecole_app.pages_memorisees import reconstruire_pages
+
+
+class Command(BaseCommand):
+    help = ("Recalcule les pages mémorisées de chaque élève (ProgressionCoran.pages_memorisees) à partir des "
+            "mémorisations du carnet, par exemple après un import fait hors de l'application.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--eleve', type=int, action='append', dest='eleves',
+                            help="Limiter le recalcul à un élève (option répétable ; tous par défaut)")
+
+    def handle(self, *args, **options):
+        total = reconstruire_pages(eleve_ids=options['eleves'], creer=True)
+        self.stdout.write(self.style.SUCCESS(f"{total} progression(s) mise(s) à jour."))
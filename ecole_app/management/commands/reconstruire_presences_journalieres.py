@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from ecole_app.presences import reconstruire_cumuls
+
+
+class Command(BaseCommand):
+    help = ("Reconstruit les cumuls journaliers de présence (PresenceJournaliere) à partir des présences élèves, "
+            "par exemple après une modification faite hors de l'application.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--composante', type=int,
+                            help="Limiter la reconstruction à une composante (toutes par défaut)")
+
+    def handle(self, *args, **options):
+        total = reconstruire_cumuls(composante_id=options['composante'])
+        self.stdout.write(self.style.SUCCESS(f"{total} cumul(s) journalier(s) reconstruit(s)."))
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ecole_app.models import Eleve, Professeur
+from ecole_app.regeneration_identifiants import ecrire_fiche_csv, fiche_pdf, regenerer_mots_de_passe
+
+
+class Command(BaseCommand):
+    help = ("Régénère en une fois les mots de passe des élèves ou des professeurs (hachage réparti sur plusieurs "
+            "processus) et écrit la fiche des nouveaux identifiants en CSV ou en PDF.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('type', choices=['eleves', 'professeurs'],
+                            help="Comptes à régénérer")
+        parser.add_argument('--composante', type=int,
+                            help="Limiter aux comptes d'une composante")
+        parser.add_argument('--classe', type=int,
+                            help="Limiter aux élèves ou aux professeurs d'une classe")
+        parser.add_argument('--format', choices=['csv', 'pdf'], default='csv',
+                            help="Format de la fiche des identifiants (csv par défaut)")
+        parser.add_argument('--sortie',
+                            help="Chemin de la fiche (identifiants-<type>-<date>.<format> par défaut)")
+        parser.add_argument('--processus', type=int,
+                            help="Nombre de processus de hachage (nombre de cœurs par défaut)")
+
+    def handle(self, *args, **options):
+        if options['type'] == 'eleves':
+            personnes = Eleve.objects.filter(archive=False)
+            if options['composante']:
+                personnes = personnes.filter(composante_id=options['composante'])
+            if options['classe']:
+                personnes = personnes.filter(classes__id=options['classe'])
+            personnes = personnes.order_by('nom', 'prenom', 'id')
+        else:
+            personnes = Professeur.objects.all()
+            if options['composante']:
+                personnes = personnes.filter(composantes__id=options['composante'])
+            if options['classe']:
+                personnes = personnes.filter(classes__id=options['classe'])
+            personnes = personnes.order_by('nom', 'id')
+
+        personnes = personnes.distinct().select_related('user').prefetch_related('classes')
+        lignes = regenerer_mots_de_passe(personnes, processus=options['processus'])
+        if not lignes:
+            raise CommandError("Aucun compte à régénérer pour ces critères.")
+
+        sortie = options['sortie'] or (
+            f"identifiants-{options['type']}-{timezone.now().strftime('%Y%m%d-%H%M')}.{options['format']}")
+        if options['format'] == 'csv':
+            with open(sortie, 'w', newline='', encoding='utf-8-sig') as fichier:
+                ecrire_fiche_csv(lignes, fichier)
+        else:
+            contenu = fiche_pdf(lignes, f"Identifiants de connexion - {options['type'].capitalize()}")
+            if contenu is None:
+                raise CommandError("Mots de passe régénérés, mais la génération du PDF a échoué.")
+            with open(sortie, 'wb') as fichier:
+                fichier.write(contenu)
+        self.stdout.write(self.style.SUCCESS(f"{len(lignes)} mot(s) de passe régénéré(s). Fiche : {sortie}"))
@@ -0,0 +1,40 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+
+from ecole_app.envoi_identifiants import reserver_prochain_envoi, traiter_envoi, DELAI_REPRISE, TAILLE_LOT
+
+
+class Command(BaseCommand):
+    help = "Traite les envois groupés d'identifiants en attente (worker d'arrière-plan)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boucle', action='store_true',
+                            help="Continuer à surveiller la file d'attente au lieu de s'arrêter quand elle est vide")
+        parser.add_argument('--intervalle', type=int, default=5,
+                            help="Secondes d'attente entre deux vérifications en mode boucle")
+        parser.add_argument('--taille-lot', type=int, default=TAILLE_LOT,
+                            help="Nombre d'élèves traités par lot")
+        parser.add_argument('--delai-reprise', type=int, default=int(DELAI_REPRISE.total_seconds() // 60),
+                            help="Minutes après lesquelles une tâche restée en cours est reprise")
+
+    def handle(self, *args, **options):
+        delai_reprise = datetime.timedelta(minutes=options['delai_reprise'])
+        while True:
+            envoi = reserver_prochain_envoi(delai_reprise)
+            if envoi is None:
+                if not options['boucle']:
+                    break
+                time.sleep(options['intervalle'])
+                continue
+
+            self.stdout.write(f"Traitement de l'envoi #{envoi.pk} ({envoi.total} élèves)...")
+            envoi = traiter_envoi(envoi, taille_lot=options['taille_lot'])
+            if envoi.statut == 'termine':
+                self.stdout.write(self.style.SUCCESS(
+                    f"Envoi #{envoi.pk} terminé : {envoi.envoyes} email(s) envoyé(s), "
+                    f"{envoi.sans_email} sans email, {envoi.sans_compte} sans compte, {envoi.erreurs} erreur(s)."
+                ))
+            else:
+                self.stdout.write(self.style.ERROR(f"Envoi #{envoi.pk} en échec : {envoi.message_erreur}"))
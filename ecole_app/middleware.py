@@ -1,7 +1,11 @@
+from functools import lru_cache
+
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.urls import resolve, reverse
 
+from .cache_parametres import get_role_utilisateur
+
 class ComposanteMiddleware:
     """
     Middleware qui assure l'isolation des données par composante.
@@ -27,26 +31,28 @@ class ComposanteMiddleware:
             'static',  # Fichiers statiques
             'media',   # Fichiers média
         ]
+        # La résolution d'URL ne dépend que du chemin : le résultat est mémorisé par chemin
+        self.url_exemptee = lru_cache(maxsize=2048)(self._url_exemptee)
+    
+    def _url_exemptee(self, path_info):
+        current_url = resolve(path_info).url_name
+        return current_url is None or any(url in current_url for url in self.exempted_urls)
     
     def __call__(self, request):
-        # Vérifier si l'URL actuelle nécessite une composante
-        resolved = resolve(request.path_info)
-        current_url = resolved.url_name
-        
-        # Si l'URL est exemptée ou current_url est None, on continue normalement
-        if current_url is None or request.path.startswith('/admin/') or any(url in current_url for url in self.exempted_urls):
+        # Si l'URL est exemptée ou n'a pas de nom, on continue normalement
+        if request.path.startswith('/admin/') or self.url_exemptee(request.path_info):
             return self.get_response(request)
         
         # Si l'utilisateur n'est pas connecté, on continue normalement (la vue login_required redirigera)
-        if not request.user.is_authenticated:
+        role = get_role_utilisateur(request)
+        if role is None:
             return self.get_response(request)
         
         # Ne pas imposer la sélection de composante pour les élèves et les professeurs
-        if (hasattr(request.user, 'eleve') and request.user.eleve) or (hasattr(request.user, 'professeur') and request.user.professeur):
+        if role['est_eleve'] or role['est_professeur']:
             # Pour les professeurs, sélectionner automatiquement la première composante si aucune n'est sélectionnée
-            if hasattr(request.user, 'professeur') and request.user.professeur and not request.session.get('composante_id'):
-                if request.user.professeur.composantes.exists():
-                    request.session['composante_id'] = request.user.professeur.composantes.first().id
+            if role['est_professeur'] and role['composante_ids'] and not request.session.get('composante_id'):
+                request.session['composante_id'] = role['composante_ids'][0]
             return self.get_response(request)
 
         # Vérifier si une composante est sélectionnée (pour les autres)
@@ -0,0 +1,41 @@
+# Generated by Django 5.0.9 on 2026-10-17 18:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecole_app', '0050_merge_20250825_1516'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvoiIdentifiants',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('eleve_ids', models.JSONField(default=list, help_text='Identifiants des élèves à traiter')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('termine', 'Terminé'), ('echec', 'Échec')], default='en_attente', max_length=20)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('traites', models.PositiveIntegerField(default=0)),
+                ('envoyes', models.PositiveIntegerField(default=0)),
+                ('sans_email', models.PositiveIntegerField(default=0)),
+                ('sans_compte', models.PositiveIntegerField(default=0)),
+                ('erreurs', models.PositiveIntegerField(default=0)),
+                ('message_erreur', models.TextField(blank=True)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_debut', models.DateTimeField(blank=True, null=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+                ('composante', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='envois_identifiants', to='ecole_app.composante')),
+                ('cree_par', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='envois_identifiants', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': "Envoi d'identifiants",
+                'verbose_name_plural': "Envois d'identifiants",
+                'ordering': ['-date_creation'],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.9 on 2026-10-17 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecole_app', '0051_envoiidentifiants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='eleve',
+            index=models.Index(condition=models.Q(('archive', False)), fields=['composante', 'nom', 'prenom', 'id'], name='eleve_actifs_nom_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='memorisation',
+            index=models.Index(fields=['carnet', 'date'], name='memorisation_carnet_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='objectifmensuel',
+            index=models.Index(fields=['eleve', 'mois'], name='objectif_eleve_mois_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paiement',
+            index=models.Index(fields=['composante', 'date'], name='paiement_comp_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='presenceeleve',
+            index=models.Index(fields=['classe', 'date'], name='presence_classe_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='presenceeleve',
+            index=models.Index(condition=models.Q(('present', False)), fields=['eleve', 'date'], name='presence_absences_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='revision',
+            index=models.Index(fields=['carnet', 'date'], name='revision_carnet_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tentativequiz',
+            index=models.Index(fields=['quiz', 'eleve', 'terminee'], name='tentative_quiz_eleve_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.9 on 2026-10-17 18:20
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def initialiser_compteurs(apps, schema_editor):
+    """Initialise les compteurs à partir des tentatives terminées existantes"""
+    Quiz = apps.get_model('ecole_app', 'Quiz')
+    Question = apps.get_model('ecole_app', 'Question')
+    Reponse = apps.get_model('ecole_app', 'Reponse')
+
+    quiz_totaux = (Quiz.objects.filter(tentatives__terminee=True)
+                   .annotate(nombre=Count('tentatives'), somme=Sum('tentatives__score')))
+    for quiz in quiz_totaux:
+        Quiz.objects.filter(pk=quiz.pk).update(nb_tentatives_terminees=quiz.nombre, somme_scores=quiz.somme or 0)
+
+    lignes = (Reponse.objects.filter(tentative__terminee=True).order_by().values('question_id')
+              .annotate(nb_reponses=Count('id'), nb_correctes=Count('id', filter=Q(est_correcte=True))))
+    for ligne in lignes:
+        Question.objects.filter(pk=ligne['question_id']).update(
+            nb_reponses=ligne['nb_reponses'], nb_correctes=ligne['nb_correctes'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecole_app', '0052_index_composites'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='nb_correctes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='nb_reponses',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='nb_tentatives_terminees',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='somme_scores',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(initialiser_compteurs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.9 on 2026-10-17 18:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def initialiser_cumuls(apps, schema_editor):
+    """Calcule les cumuls journaliers des présences existantes"""
+    PresenceEleve = apps.get_model('ecole_app', 'PresenceEleve')
+    PresenceJournaliere = apps.get_model('ecole_app', 'PresenceJournaliere')
+
+    lignes = (PresenceEleve.objects.order_by().values('composante_id', 'classe_id', 'date')
+              .annotate(presents=Count('id', filter=Q(present=True)),
+                        absents=Count('id', filter=Q(present=False, justifie=False)),
+                        absents_justifies=Count('id', filter=Q(present=False, justifie=True))))
+    PresenceJournaliere.objects.bulk_create((PresenceJournaliere(**ligne) for ligne in lignes.iterator()),
+                                            batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecole_app', '0053_compteurs_quiz'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresenceJournaliere',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('presents', models.PositiveIntegerField(default=0)),
+                ('absents', models.PositiveIntegerField(default=0, help_text='Absences non justifiées')),
+                ('absents_justifies', models.PositiveIntegerField(default=0)),
+                ('classe', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='presences_journalieres', to='ecole_app.classe')),
+                ('composante', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='presences_journalieres', to='ecole_app.composante')),
+            ],
+            options={
+                'verbose_name': 'Présences du jour',
+                'verbose_name_plural': 'Présences journalières',
+                'indexes': [models.Index(fields=['composante', 'date'], name='presence_jour_comp_date_idx')],
+                'unique_together': {('composante', 'classe', 'date')},
+            },
+        ),
+        migrations.RunPython(initialiser_cumuls, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.9 on 2026-10-17 18:32
+
+from django.db import migrations, models
+
+NOMBRE_PAGES = 604
+
+
+def initialiser_pages(apps, schema_editor):
+    """Calcule les pages mémorisées de chaque élève à partir des mémorisations existantes"""
+    Memorisation = apps.get_model('ecole_app', 'Memorisation')
+    ProgressionCoran = apps.get_model('ecole_app', 'ProgressionCoran')
+
+    masques = {}
+    for eleve_id, debut, fin in Memorisation.objects.values_list('carnet__eleve_id', 'debut_page', 'fin_page').iterator():
+        debut, fin = sorted((debut, fin))
+        debut, fin = max(debut, 1), min(fin, NOMBRE_PAGES)
+        if debut <= fin:
+            masques[eleve_id] = masques.get(eleve_id, 0) | (((1 << (fin - debut + 1)) - 1) << (debut - 1))
+
+    progressions = {progression.eleve_id: progression for progression in ProgressionCoran.objects.all()}
+    a_creer, a_modifier = [], []
+    for eleve_id, masque in masques.items():
+        octets = masque.to_bytes((NOMBRE_PAGES + 7) // 8, 'little')
+        progression = progressions.get(eleve_id)
+        if progression is None:
+            a_creer.append(ProgressionCoran(eleve_id=eleve_id, pages_memorisees=octets))
+        else:
+            progression.pages_memorisees = octets
+            a_modifier.append(progression)
+    ProgressionCoran.objects.bulk_create(a_creer, batch_size=500)
+    ProgressionCoran.objects.bulk_update(a_modifier, ['pages_memorisees'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecole_app', '0054_presences_journalieres'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='progressioncoran',
+            name='pages_memorisees',
+            field=models.BinaryField(default=b'', help_text="Masque de bits des pages mémorisées d'après le carnet (bit p-1 = page p)"),
+        ),
+        migrations.RunPython(initialiser_pages, migrations.RunPython.noop),
+    ]
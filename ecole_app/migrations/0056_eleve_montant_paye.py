@@ -0,0 +1,34 @@
+# Generated by Django 5.0.9 on 2026-10-17 18:39
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def initialiser_soldes(apps, schema_editor):
+    """Calcule le total payé de chaque élève à partir des paiements existants"""
+    Eleve = apps.get_model('ecole_app', 'Eleve')
+    Paiement = apps.get_model('ecole_app', 'Paiement')
+    champ = models.DecimalField(max_digits=10, decimal_places=2)
+    totaux = (Paiement.objects.filter(eleve_id=OuterRef('pk')).order_by()
+              .values('eleve_id').annotate(total=Sum('montant')).values('total'))
+    Eleve.objects.update(montant_paye=Coalesce(Subquery(totaux, output_field=champ), Value(Decimal('0')),
+                                               output_field=champ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ecole_app', '0055_pages_memorisees'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eleve',
+            name='montant_paye',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text="Total des paiements de l'élève, tenu à jour à chaque paiement", max_digits=10),
+        ),
+        migrations.RunPython(initialiser_soldes, migrations.RunPython.noop),
+    ]
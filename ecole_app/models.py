@@ -179,10 +179,26 @@ class Eleve(models.Model):
     motif_archive = models.TextField(blank=True, null=True, help_text="Motif d'archivage")
     date_creation = models.DateTimeField(auto_now_add=True)
     montant_total = models.DecimalField(max_digits=10, decimal_places=2, default=200.00, help_text="Montant total à payer pour l'inscription")
+    # Tenu à jour en base par soldes.actualiser_soldes ; jamais écrit par save()
+    montant_paye = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False,
+                                       help_text="Total des paiements de l'élève, tenu à jour à chaque paiement")
     
     def __str__(self):
         return f"{self.nom} {self.prenom}".strip()
     
+    def save(self, *args, **kwargs):
+        # Un élève chargé avant un paiement porte un montant_paye périmé : une
+        # sauvegarde complète l'écraserait. Seule la création écrit ce champ ;
+        # la commande reconcilier_soldes_eleves corrige les écarts restants
+        # (écritures faites hors de l'ORM).
+        if (self.pk is not None and not self._state.adding and not args
+                and kwargs.get('update_fields') is None and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                champ.name for champ in self._meta.concrete_fields
+                if not champ.primary_key and champ.name != 'montant_paye'
+            ]
+        super().save(*args, **kwargs)
+    
     @property
     def age(self):
         """Calcule l'âge de l'élève à partir de sa date de naissance"""
@@ -191,11 +207,6 @@ class Eleve(models.Model):
         today = date.today()
         return today.year - self.date_naissance.year - ((today.month, today.day) < (self.date_naissance.month, self.date_naissance.day))
     
-    @property
-    def montant_paye(self):
-        """Calcule le montant total payé par l'élève"""
-        return self.paiements.aggregate(total=models.Sum('montant')).get('total') or 0
-    
     @property
     def montant_restant(self):
         """Calcule le montant restant à payer par l'élève"""
@@ -204,6 +215,13 @@ class Eleve(models.Model):
     class Meta:
         verbose_name = "Élève"
         verbose_name_plural = "Élèves"
+        indexes = [
+            # Liste paginée des élèves actifs d'une composante, triée par (nom, prenom, id).
+            # Index partiel : le filtre archive=False est généré en "NOT archive", que seul
+            # un index partiel de même condition permet d'exploiter.
+            models.Index(fields=['composante', 'nom', 'prenom', 'id'], condition=models.Q(archive=False),
+                         name='eleve_actifs_nom_idx'),
+        ]
 
 class ListeAttente(models.Model):
     composante = models.ForeignKey(Composante, on_delete=models.CASCADE, related_name='liste_attente', null=True, blank=True)
@@ -246,6 +264,9 @@ class Paiement(models.Model):
     class Meta:
         verbose_name = "Paiement"
         verbose_name_plural = "Paiements"
+        indexes = [
+            models.Index(fields=['composante', 'date'], name='paiement_comp_date_idx'),
+        ]
 
 class Charge(models.Model):
     CATEGORIES = (
@@ -291,6 +312,32 @@ class PresenceEleve(models.Model):
         verbose_name = "Présence élève"
         verbose_name_plural = "Présences élèves"
         unique_together = ['eleve', 'date', 'classe']
+        indexes = [
+            models.Index(fields=['classe', 'date'], name='presence_classe_date_idx'),
+            # Index partiel : seules les absences sont comptées dans les rapports
+            models.Index(fields=['eleve', 'date'], condition=models.Q(present=False), name='presence_absences_idx'),
+        ]
+
+class PresenceJournaliere(models.Model):
+    """Cumul des présences élèves par composante, classe et jour (maintenu par presences.py)"""
+    composante = models.ForeignKey(Composante, on_delete=models.CASCADE, related_name='presences_journalieres', null=True, blank=True)
+    classe = models.ForeignKey(Classe, on_delete=models.CASCADE, related_name='presences_journalieres', null=True, blank=True)
+    date = models.DateField()
+    presents = models.PositiveIntegerField(default=0)
+    absents = models.PositiveIntegerField(default=0, help_text="Absences non justifiées")
+    absents_justifies = models.PositiveIntegerField(default=0)
+
+    @property
+    def total(self):
+        return self.presents + self.absents + self.absents_justifies
+
+    class Meta:
+        verbose_name = "Présences du jour"
+        verbose_name_plural = "Présences journalières"
+        unique_together = ['composante', 'classe', 'date']
+        indexes = [
+            models.Index(fields=['composante', 'date'], name='presence_jour_comp_date_idx'),
+        ]
 
 class PresenceProfesseur(models.Model):
     composante = models.ForeignKey(Composante, on_delete=models.CASCADE, related_name='presences_professeurs', null=True, blank=True)
@@ -364,6 +411,9 @@ class Memorisation(models.Model):
     class Meta:
         verbose_name = "Mémorisation"
         verbose_name_plural = "Mémorisations"
+        indexes = [
+            models.Index(fields=['carnet', 'date'], name='memorisation_carnet_date_idx'),
+        ]
 
 class Revision(models.Model):
     """Modèle pour le suivi des révisions hebdomadaires"""
@@ -390,6 +440,9 @@ class Revision(models.Model):
     class Meta:
         verbose_name = "Révision"
         verbose_name_plural = "Révisions"
+        indexes = [
+            models.Index(fields=['carnet', 'date'], name='revision_carnet_date_idx'),
+        ]
 
 class Repetition(models.Model):
     """Modèle pour le suivi des répétitions par page et par sourate"""
@@ -531,6 +584,9 @@ class ObjectifMensuel(models.Model):
         verbose_name = "Objectif mensuel"
         verbose_name_plural = "Objectifs mensuels"
         ordering = ['-mois', 'eleve']
+        indexes = [
+            models.Index(fields=['eleve', 'mois'], name='objectif_eleve_mois_idx'),
+        ]
 
 
 # Modèles pour les notes et évaluations
@@ -652,14 +708,34 @@ class ProgressionCoran(models.Model):
     direction_memorisation = models.CharField(max_length=10, choices=DIRECTION_CHOICES, default='debut', 
                                           help_text="Direction de mémorisation (du début ou de la fin du Coran)")
     date_mise_a_jour = models.DateTimeField(auto_now=True)
+    pages_memorisees = models.BinaryField(default=b'', help_text="Masque de bits des pages mémorisées d'après le carnet (bit p-1 = page p)")
     
     def __str__(self):
         return f"Progression de {self.eleve} - Page {self.page_actuelle}"
     
+    @property
+    def masque_pages(self):
+        """Masque (entier) des pages mémorisées d'après les mémorisations du carnet"""
+        from .pages_memorisees import depuis_octets
+        return depuis_octets(self.pages_memorisees)
+    
+    @property
+    def nombre_pages_memorisees(self):
+        return self.masque_pages.bit_count()
+    
     def calculer_pourcentage(self):
-        """Calcule le pourcentage de progression basé sur la page actuelle et la direction de mémorisation"""
+        """
+        Calcule le pourcentage de progression : part des pages réellement
+        mémorisées d'après le carnet, ou à défaut estimation basée sur la page
+        actuelle et la direction de mémorisation
+        """
         total_pages = 604  # Nombre total de pages du Coran
         
+        masque = self.masque_pages
+        if masque:
+            from .pages_memorisees import pourcentage
+            return pourcentage(masque)
+        
         if self.direction_memorisation == 'debut':
             # Si mémorisation depuis le début (Al-Baqara)
             # Une page mémorisée = 1/604 = 0.17%
@@ -686,3 +762,41 @@ class ProgressionCoran(models.Model):
         verbose_name = "Progression du Coran"
         verbose_name_plural = "Progressions du Coran"
 
+
+
+class EnvoiIdentifiants(models.Model):
+    """Tâche d'envoi groupé des identifiants, traitée en arrière-plan par la commande traiter_envois_identifiants"""
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('termine', 'Terminé'),
+        ('echec', 'Échec'),
+    ]
+
+    composante = models.ForeignKey(Composante, on_delete=models.CASCADE, related_name='envois_identifiants', null=True, blank=True)
+    cree_par = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='envois_identifiants')
+    eleve_ids = models.JSONField(default=list, help_text="Identifiants des élèves à traiter")
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente')
+    total = models.PositiveIntegerField(default=0)
+    traites = models.PositiveIntegerField(default=0)
+    envoyes = models.PositiveIntegerField(default=0)
+    sans_email = models.PositiveIntegerField(default=0)
+    sans_compte = models.PositiveIntegerField(default=0)
+    erreurs = models.PositiveIntegerField(default=0)
+    message_erreur = models.TextField(blank=True)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_debut = models.DateTimeField(null=True, blank=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Envoi d'identifiants #{self.pk} ({self.get_statut_display()})"
+
+    @property
+    def pourcentage(self):
+        """Pourcentage d'élèves traités"""
+        return round((self.traites / self.total) * 100) if self.total else 100
+
+    class Meta:
+        verbose_name = "Envoi d'identifiants"
+        verbose_name_plural = "Envois d'identifiants"
+        ordering = ['-date_creation']
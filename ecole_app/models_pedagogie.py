@@ -1,4 +1,7 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Count, F, Q, Sum
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -48,6 +51,9 @@ class Quiz(models.Model):
     publie = models.BooleanField(default=False, help_text="Quiz visible par les élèves")
     temps_limite = models.PositiveIntegerField(null=True, blank=True, help_text="Temps limite en minutes (optionnel)")
     ordre = models.PositiveIntegerField(default=0, help_text="Ordre d'affichage")
+    # Compteurs matérialisés, mis à jour par TentativeQuiz.terminer()
+    nb_tentatives_terminees = models.PositiveIntegerField(default=0, editable=False)
+    somme_scores = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
     
     def __str__(self):
         return self.titre
@@ -57,6 +63,32 @@ class Quiz(models.Model):
         verbose_name_plural = "Quiz"
         ordering = ['ordre', 'date_creation']
 
+    @property
+    def score_moyen(self):
+        """Score moyen des tentatives terminées, sans requête"""
+        if not self.nb_tentatives_terminees:
+            return 0
+        return self.somme_scores / self.nb_tentatives_terminees
+
+    def recalculer_compteurs(self):
+        """Recalcule les compteurs du quiz et de ses questions à partir des tentatives"""
+        tentatives = TentativeQuiz.objects.filter(quiz=self, terminee=True)
+        comptes = compter_reponses_par_question(tentatives)
+        with transaction.atomic():
+            totaux = tentatives.aggregate(nombre=Count('id'), somme=Sum('score'))
+            self.nb_tentatives_terminees = totaux['nombre']
+            self.somme_scores = totaux['somme'] or 0
+            type(self).objects.filter(pk=self.pk).update(
+                nb_tentatives_terminees=self.nb_tentatives_terminees,
+                somme_scores=self.somme_scores,
+            )
+            questions = list(self.questions.all())
+            for question in questions:
+                compte = comptes.get(question.pk, {})
+                question.nb_reponses = compte.get('nb_reponses', 0)
+                question.nb_correctes = compte.get('nb_correctes', 0)
+            Question.objects.bulk_update(questions, ['nb_reponses', 'nb_correctes'])
+
 class Question(models.Model):
     """Question d'un quiz"""
     TYPES = [
@@ -71,6 +103,9 @@ class Question(models.Model):
     type = models.CharField(max_length=20, choices=TYPES, default='choix_unique')
     points = models.PositiveIntegerField(default=1, help_text="Nombre de points pour cette question")
     ordre = models.PositiveIntegerField(default=0, help_text="Ordre d'affichage")
+    # Réponses des tentatives terminées, mis à jour par TentativeQuiz.terminer()
+    nb_reponses = models.PositiveIntegerField(default=0, editable=False)
+    nb_correctes = models.PositiveIntegerField(default=0, editable=False)
     
     def __str__(self):
         return f"{self.texte[:50]}..."
@@ -80,6 +115,10 @@ class Question(models.Model):
         verbose_name_plural = "Questions"
         ordering = ['ordre']
 
+    @property
+    def taux_reussite(self):
+        return (self.nb_correctes / self.nb_reponses * 100) if self.nb_reponses else 0
+
 class Choix(models.Model):
     """Choix possible pour une question"""
     question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='choix')
@@ -111,6 +150,41 @@ class TentativeQuiz(models.Model):
         verbose_name = "Tentative de quiz"
         verbose_name_plural = "Tentatives de quiz"
         ordering = ['-date_debut']
+        indexes = [
+            models.Index(fields=['quiz', 'eleve', 'terminee'], name='tentative_quiz_eleve_idx'),
+        ]
+
+    def terminer(self, score):
+        """
+        Marque la tentative comme terminée et met à jour, dans la même
+        transaction, les compteurs du quiz et de ses questions. Retourne False
+        si la tentative avait déjà été terminée (les compteurs ne sont alors
+        pas modifiés).
+        """
+        score = Decimal(score).quantize(Decimal('0.01'))
+        date_fin = timezone.now()
+        with transaction.atomic():
+            # La mise à jour conditionnelle évite un double comptage si deux
+            # requêtes terminent la même tentative
+            if not type(self).objects.filter(pk=self.pk, terminee=False).update(
+                terminee=True, date_fin=date_fin, score=score
+            ):
+                return False
+            self.terminee, self.date_fin, self.score = True, date_fin, score
+            self._appliquer_compteurs(1)
+        return True
+
+    def _appliquer_compteurs(self, signe):
+        """Ajoute (signe=1) ou retire (signe=-1) la tentative des compteurs"""
+        Quiz.objects.filter(pk=self.quiz_id).update(
+            nb_tentatives_terminees=F('nb_tentatives_terminees') + signe,
+            somme_scores=F('somme_scores') + signe * (self.score or 0),
+        )
+        for question_id, compte in compter_reponses_par_question([self.pk]).items():
+            Question.objects.filter(pk=question_id).update(
+                nb_reponses=F('nb_reponses') + signe * compte['nb_reponses'],
+                nb_correctes=F('nb_correctes') + signe * compte['nb_correctes'],
+            )
         
     def calculer_score(self):
         """Calcule le score de la tentative"""
@@ -128,6 +202,18 @@ class TentativeQuiz(models.Model):
                 
         return (points_obtenus / total_points) * 100
 
+def compter_reponses_par_question(tentatives):
+    """
+    Nombre de réponses et de réponses correctes par question pour les
+    tentatives données (queryset ou liste d'identifiants), en une requête
+    groupée : {question_id: {'nb_reponses': ..., 'nb_correctes': ...}}.
+    """
+    lignes = (Reponse.objects.filter(tentative__in=tentatives)
+              .order_by()
+              .values('question_id')
+              .annotate(nb_reponses=Count('id'), nb_correctes=Count('id', filter=Q(est_correcte=True))))
+    return {ligne.pop('question_id'): ligne for ligne in lignes}
+
 class Reponse(models.Model):
     """Réponse d'un élève à une question"""
     tentative = models.ForeignKey(TentativeQuiz, on_delete=models.CASCADE, related_name='reponses')
@@ -0,0 +1,176 @@
+"""
+Pages du Coran mémorisées par chaque élève, sous forme de masque de bits.
+
+Le bit n° p-1 d'un entier Python correspond à la page p du Mushaf (604
+pages, soit 76 octets stockés dans `ProgressionCoran.pages_memorisees`).
+Le masque est l'union des plages de pages des mémorisations du carnet : il
+est complété à chaque mémorisation enregistrée et recalculé pour l'élève
+concerné quand une mémorisation est supprimée ou que sa plage rétrécit.
+
+La couverture, l'avancement par juz ou par hizb et les cartes de classe se
+calculent ensuite par opérations sur les bits, sans relire les
+mémorisations.
+"""
+from django.db import transaction
+
+from .models import CarnetPedagogique, Memorisation, ProgressionCoran
+from .sourate import NOMBRE_PAGES
+
+NOMBRE_OCTETS = (NOMBRE_PAGES + 7) // 8
+
+# Première page de chaque juz dans le Mushaf de Médine (604 pages) : le
+# premier juz compte 21 pages, les 28 suivants 20 et le dernier 23
+DEBUTS_JUZ = (1,) + tuple(22 + 20 * rang for rang in range(29))
+# Chaque juz est partagé en deux hizb de 10 pages environ (à la page près,
+# un hizb pouvant commencer au milieu d'une page)
+DEBUTS_HIZB = tuple(page for debut in DEBUTS_JUZ for page in (debut, debut + 10))
+
+
+def masque_plage(debut, fin):
+    """Masque des pages debut à fin incluses (bornées au Mushaf)"""
+    if debut is None or fin is None:
+        return 0
+    debut, fin = sorted((debut, fin))
+    debut, fin = max(debut, 1), min(fin, NOMBRE_PAGES)
+    if debut > fin:
+        return 0
+    return ((1 << (fin - debut + 1)) - 1) << (debut - 1)
+
+
+def vers_octets(masque):
+    return masque.to_bytes(NOMBRE_OCTETS, 'little')
+
+
+def depuis_octets(octets):
+    # PostgreSQL renvoie un memoryview, SQLite des bytes ; un champ vide vaut 0
+    return int.from_bytes(bytes(octets or b''), 'little')
+
+
+def _masques_sections(debuts):
+    fins = debuts[1:] + (NOMBRE_PAGES + 1,)
+    return tuple(masque_plage(debut, fin - 1) for debut, fin in zip(debuts, fins))
+
+
+MASQUES_JUZ = _masques_sections(DEBUTS_JUZ)
+MASQUES_HIZB = _masques_sections(DEBUTS_HIZB)
+
+
+def pourcentage(masque, section=None):
+    """Part des pages de `section` (tout le Mushaf par défaut) présentes dans le masque"""
+    if section is None:
+        return round(masque.bit_count() / NOMBRE_PAGES * 100, 2)
+    return round((masque & section).bit_count() / section.bit_count() * 100, 2)
+
+
+def avancement_juz(masque):
+    """Pourcentage mémorisé de chacun des 30 juz"""
+    return [pourcentage(masque, section) for section in MASQUES_JUZ]
+
+
+def avancement_hizb(masque):
+    """Pourcentage mémorisé de chacun des 60 hizb"""
+    return [pourcentage(masque, section) for section in MASQUES_HIZB]
+
+
+def juz_complets(masque):
+    """Numéros des juz entièrement mémorisés"""
+    return [numero for numero, section in enumerate(MASQUES_JUZ, start=1) if masque & section == section]
+
+
+def carte_pages(masques):
+    """
+    Carte de chaleur d'un groupe d'élèves : tableau NumPy de 604 entiers
+    donnant, pour chaque page, le nombre d'élèves qui l'ont mémorisée.
+    """
+    import numpy as np
+
+    octets = np.frombuffer(b''.join(vers_octets(masque) for masque in masques), dtype=np.uint8)
+    bits = np.unpackbits(octets.reshape(-1, NOMBRE_OCTETS), axis=1, bitorder='little')[:, :NOMBRE_PAGES]
+    return bits.sum(axis=0, dtype=np.int64)
+
+
+def carte_juz(masques):
+    """Pourcentage moyen mémorisé de chaque juz sur un groupe d'élèves"""
+    import numpy as np
+
+    masques = list(masques)
+    if not masques:
+        return [0.0] * len(DEBUTS_JUZ)
+    par_page = carte_pages(masques)
+    debuts = np.array(DEBUTS_JUZ) - 1
+    longueurs = np.diff(np.append(debuts, NOMBRE_PAGES))
+    par_juz = np.add.reduceat(par_page, debuts) / (longueurs * len(masques)) * 100
+    return [round(float(valeur), 2) for valeur in par_juz]
+
+
+def masques_eleves(eleves):
+    """Masques {eleve_id: masque} des élèves donnés, en une requête"""
+    masques = {eleve.pk: 0 for eleve in eleves}
+    for eleve_id, octets in ProgressionCoran.objects.filter(eleve_id__in=masques).values_list(
+            'eleve_id', 'pages_memorisees'):
+        masques[eleve_id] = depuis_octets(octets)
+    return masques
+
+
+def ajouter_pages(eleve_id, debut, fin):
+    """Ajoute une plage de pages au masque de l'élève (sans relire ses mémorisations)"""
+    ajout = masque_plage(debut, fin)
+    if not ajout:
+        return
+    with transaction.atomic():
+        progression, created = ProgressionCoran.objects.select_for_update().get_or_create(eleve_id=eleve_id)
+        masque = depuis_octets(progression.pages_memorisees)
+        if masque | ajout != masque:
+            progression.pages_memorisees = vers_octets(masque | ajout)
+            progression.save(update_fields=['pages_memorisees'])
+
+
+def reconstruire_pages(eleve_ids=None, creer=False):
+    """
+    Recalcule les masques à partir des mémorisations, pour les élèves donnés
+    (tous par défaut). Les progressions manquantes ne sont créées que si
+    `creer` est vrai. Retourne le nombre de progressions mises à jour ou créées.
+    """
+    plages = Memorisation.objects.order_by()
+    progressions = ProgressionCoran.objects.all()
+    if eleve_ids is not None:
+        plages = plages.filter(carnet__eleve_id__in=eleve_ids)
+        progressions = progressions.filter(eleve_id__in=eleve_ids)
+
+    masques = {}
+    for eleve_id, debut, fin in plages.values_list('carnet__eleve_id', 'debut_page', 'fin_page').iterator():
+        masques[eleve_id] = masques.get(eleve_id, 0) | masque_plage(debut, fin)
+
+    with transaction.atomic():
+        a_modifier = []
+        for progression in progressions.select_for_update().only('id', 'eleve_id', 'pages_memorisees'):
+            octets = vers_octets(masques.pop(progression.eleve_id, 0))
+            if bytes(progression.pages_memorisees or b'') != octets:
+                progression.pages_memorisees = octets
+                a_modifier.append(progression)
+        ProgressionCoran.objects.bulk_update(a_modifier, ['pages_memorisees'], batch_size=500)
+        a_creer = []
+        if creer:
+            a_creer = [ProgressionCoran(eleve_id=eleve_id, pages_memorisees=vers_octets(masque))
+                       for eleve_id, masque in masques.items() if masque]
+            ProgressionCoran.objects.bulk_create(a_creer, batch_size=500)
+    return len(a_modifier) + len(a_creer)
+
+
+def eleve_du_carnet(carnet_id):
+    return CarnetPedagogique.objects.filter(pk=carnet_id).values_list('eleve_id', flat=True).first()
+
+
+def couverture_eleves(eleves):
+    """
+    Attache à chaque élève ses pages mémorisées (`pages_coran`,
+    `couverture_coran` en %, `juz_complets`) et retourne l'avancement moyen
+    du groupe par juz, sous forme de couples (numéro du juz, pourcentage).
+    """
+    masques = masques_eleves(eleves)
+    for eleve in eleves:
+        masque = masques[eleve.pk]
+        eleve.pages_coran = masque.bit_count()
+        eleve.couverture_coran = pourcentage(masque)
+        eleve.juz_complets = juz_complets(masque)
+    return list(enumerate(carte_juz(masques.values()), start=1))
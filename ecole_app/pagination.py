@@ -0,0 +1,83 @@
+"""
+Pagination par curseur (keyset) sur un tri composé.
+
+Contrairement à OFFSET, le coût d'une page ne dépend pas de sa position : la
+page suivante est lue à partir des valeurs de tri de la dernière ligne
+affichée (`WHERE (nom, prenom, id) > (...)`), ce qui exploite directement un
+index sur les colonnes de tri.
+"""
+import json
+
+from django.db.models import Q
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+TAILLE_PAGE = 50
+
+
+def encoder_curseur(objet, champs):
+    valeurs = [getattr(objet, champ) for champ in champs]
+    return urlsafe_base64_encode(json.dumps(valeurs).encode('utf-8'))
+
+
+def decoder_curseur(curseur, champs):
+    """Retourne la liste des valeurs du curseur, ou None s'il est invalide"""
+    try:
+        valeurs = json.loads(urlsafe_base64_decode(curseur).decode('utf-8'))
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if not isinstance(valeurs, list) or len(valeurs) != len(champs):
+        return None
+    return valeurs
+
+
+def _apres(champs, valeurs, lookup):
+    """Condition (c1, c2, ...) > (v1, v2, ...) en ordre lexicographique"""
+    condition = Q()
+    egalites = {}
+    for champ, valeur in zip(champs, valeurs):
+        condition |= Q(**egalites, **{f'{champ}__{lookup}': valeur})
+        egalites[champ] = valeur
+    return condition
+
+
+class PageCurseur:
+    """Une page de résultats avec les curseurs des pages voisines"""
+
+    def __init__(self, objets, suivant=None, precedent=None):
+        self.objets = objets
+        self.suivant = suivant
+        self.precedent = precedent
+
+    def __iter__(self):
+        return iter(self.objets)
+
+    def __len__(self):
+        return len(self.objets)
+
+
+def paginer(queryset, champs, apres=None, avant=None, taille=TAILLE_PAGE):
+    """
+    Retourne la page de `queryset` (triée par `champs`, le dernier devant être
+    unique) qui suit le curseur `apres` ou précède le curseur `avant`.
+    """
+    valeurs_apres = decoder_curseur(apres, champs) if apres else None
+    valeurs_avant = decoder_curseur(avant, champs) if avant and not valeurs_apres else None
+
+    if valeurs_avant:
+        # Lecture à rebours puis remise dans l'ordre d'affichage
+        objets = list(queryset.filter(_apres(champs, valeurs_avant, 'lt'))
+                      .order_by(*[f'-{champ}' for champ in champs])[:taille + 1])
+        plus = len(objets) > taille
+        objets = objets[:taille][::-1]
+        suivant = encoder_curseur(objets[-1], champs) if objets else None
+        precedent = encoder_curseur(objets[0], champs) if plus else None
+        return PageCurseur(objets, suivant, precedent)
+
+    if valeurs_apres:
+        queryset = queryset.filter(_apres(champs, valeurs_apres, 'gt'))
+    objets = list(queryset.order_by(*champs)[:taille + 1])
+    plus = len(objets) > taille
+    objets = objets[:taille]
+    suivant = encoder_curseur(objets[-1], champs) if plus else None
+    precedent = encoder_curseur(objets[0], champs) if valeurs_apres and objets else None
+    return PageCurseur(objets, suivant, precedent)
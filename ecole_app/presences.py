@@ -0,0 +1,272 @@
+"""
+Service d'enregistrement groupé et d'agrégation des présences élèves.
+
+Un appel pour une classe et une date se fait en un nombre constant de
+requêtes : lecture des présences existantes en une fois, puis écriture des
+nouvelles lignes par `bulk_create` et des lignes modifiées par `bulk_update`,
+le tout dans une seule transaction.
+
+Les statistiques (total, présents, absents, absents justifiés) sont
+calculées par des agrégats conditionnels : une requête pour un total global
+ou pour un regroupement par élève, par classe ou par jour, sans charger les
+lignes de présence.
+
+Les cumuls par composante, classe et jour (`PresenceJournaliere`) sont
+recalculés pour les jours touchés à chaque enregistrement ; les rapports
+sans filtre par élève lisent ces cumuls (une ligne par classe et par jour)
+plutôt que les présences individuelles.
+"""
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .models import PresenceEleve, PresenceJournaliere
+
+CHAMPS_MODIFIABLES = ['present', 'justifie', 'commentaire', 'composante']
+
+# Regroupements possibles des statistiques : nom -> champ de PresenceEleve
+REGROUPEMENTS = {
+    'eleve': 'eleve_id',
+    'classe': 'classe_id',
+    'date': 'date',
+}
+
+STATS_VIDES = {'total': 0, 'presents': 0, 'absents': 0, 'absents_justifies': 0, 'taux_presence': 0}
+
+
+def charger_presences(classe, date, eleve_ids=None):
+    """Retourne un dictionnaire {eleve_id: PresenceEleve} pour une classe et une date"""
+    presences = PresenceEleve.objects.filter(classe=classe, date=date)
+    if eleve_ids is not None:
+        presences = presences.filter(eleve_id__in=eleve_ids)
+    return {presence.eleve_id: presence for presence in presences}
+
+
+def enregistrer_presences(classe, date, saisies, composante_id=None):
+    """
+    Enregistre en lot les présences d'une classe pour une date.
+
+    `saisies` associe un identifiant d'élève à un tuple
+    (present, justifie, commentaire). Retourne un dictionnaire avec le
+    nombre de présences créées, modifiées et inchangées.
+    """
+    composante_id = int(composante_id) if composante_id else classe.composante_id
+    saisies = {int(eleve_id): valeurs for eleve_id, valeurs in saisies.items()}
+    resultat = {'crees': 0, 'modifies': 0, 'inchanges': 0}
+    if not saisies:
+        return resultat
+
+    with transaction.atomic():
+        existantes = charger_presences(classe, date, eleve_ids=saisies.keys())
+        a_creer = []
+        a_modifier = []
+        # Jours dont les cumuls changent (y compris une ancienne composante)
+        cles = {(composante_id, classe.pk, date)}
+
+        for eleve_id, (present, justifie, commentaire) in saisies.items():
+            commentaire = commentaire or ''
+            presence = existantes.get(eleve_id)
+            if presence is None:
+                a_creer.append(PresenceEleve(
+                    eleve_id=eleve_id,
+                    date=date,
+                    classe=classe,
+                    present=present,
+                    justifie=justifie,
+                    commentaire=commentaire,
+                    composante_id=composante_id,
+                ))
+            elif (presence.present, presence.justifie, presence.commentaire, presence.composante_id) != (
+                    present, justifie, commentaire, composante_id):
+                cles.add((presence.composante_id, classe.pk, date))
+                presence.present = present
+                presence.justifie = justifie
+                presence.commentaire = commentaire
+                presence.composante_id = composante_id
+                a_modifier.append(presence)
+            else:
+                resultat['inchanges'] += 1
+
+        if a_creer:
+            # update_conflicts couvre le cas d'une saisie concurrente de la même présence
+            PresenceEleve.objects.bulk_create(
+                a_creer,
+                update_conflicts=True,
+                unique_fields=['eleve', 'date', 'classe'],
+                update_fields=CHAMPS_MODIFIABLES,
+            )
+        if a_modifier:
+            PresenceEleve.objects.bulk_update(a_modifier, CHAMPS_MODIFIABLES)
+        if a_creer or a_modifier:
+            actualiser_cumuls(cles)
+
+    resultat['crees'] = len(a_creer)
+    resultat['modifies'] = len(a_modifier)
+    return resultat
+
+
+def _compteurs():
+    return {
+        'total': Count('id'),
+        'presents': Count('id', filter=Q(present=True)),
+        'absents': Count('id', filter=Q(present=False, justifie=False)),
+        'absents_justifies': Count('id', filter=Q(present=False, justifie=True)),
+    }
+
+
+def _ajouter_taux(stats):
+    stats['taux_presence'] = round((stats['presents'] / stats['total']) * 100, 1) if stats['total'] else 0
+    return stats
+
+
+def statistiques_presences(presences):
+    """
+    Totaux d'un queryset de présences en une requête : `total`, `presents`,
+    `absents` (non justifiés), `absents_justifies` et `taux_presence`.
+    """
+    return _ajouter_taux(presences.order_by().aggregate(**_compteurs()))
+
+
+def statistiques_presences_par(presences, par):
+    """
+    Totaux d'un queryset de présences regroupés par élève, classe ou jour
+    (`par` parmi REGROUPEMENTS), en une requête. Retourne un dictionnaire
+    {clé: stats} trié par clé.
+    """
+    champ = REGROUPEMENTS[par]
+    lignes = presences.order_by(champ).values(champ).annotate(**_compteurs())
+    return {ligne.pop(champ): _ajouter_taux(ligne) for ligne in lignes}
+
+
+def _filtre_cles(cles):
+    """Présences couvrant les jours des clés (composante_id, classe_id, date), sur-ensemble à restreindre"""
+    classe_ids = {classe_id for _, classe_id, _ in cles}
+    filtre_classe = Q(classe_id__in=classe_ids - {None})
+    if None in classe_ids:
+        filtre_classe |= Q(classe__isnull=True)
+    return Q(date__in={date for _, _, date in cles}) & filtre_classe
+
+
+def cle_cumul(objet):
+    """Clé (composante_id, classe_id, date) d'une présence, d'un cumul ou d'une ligne de valeurs"""
+    if isinstance(objet, dict):
+        return (objet['composante_id'], objet['classe_id'], objet['date'])
+    # La date peut encore être une chaîne sur une instance non rechargée
+    return (objet.composante_id, objet.classe_id, PresenceEleve._meta.get_field('date').to_python(objet.date))
+
+
+def actualiser_cumuls(cles):
+    """
+    Recalcule les cumuls journaliers des clés (composante_id, classe_id,
+    date) à partir des présences, en une requête d'agrégation groupée ; les
+    cumuls devenus vides sont supprimés.
+    """
+    cles = set(cles)
+    if not cles:
+        return
+    filtre = _filtre_cles(cles)
+    lignes = {
+        cle_cumul(ligne): ligne
+        for ligne in PresenceEleve.objects.filter(filtre).order_by()
+        .values('composante_id', 'classe_id', 'date')
+        .annotate(**_compteurs())
+    }
+    with transaction.atomic():
+        existants = {cle_cumul(cumul): cumul for cumul in PresenceJournaliere.objects.filter(filtre)}
+        a_creer, a_modifier, a_supprimer = [], [], []
+        for cle in cles:
+            ligne = lignes.get(cle)
+            cumul = existants.get(cle)
+            if ligne is None:
+                if cumul is not None:
+                    a_supprimer.append(cumul.pk)
+                continue
+            if cumul is None:
+                cumul = PresenceJournaliere(composante_id=cle[0], classe_id=cle[1], date=cle[2])
+                a_creer.append(cumul)
+            else:
+                a_modifier.append(cumul)
+            cumul.presents = ligne['presents']
+            cumul.absents = ligne['absents']
+            cumul.absents_justifies = ligne['absents_justifies']
+
+        if a_supprimer:
+            PresenceJournaliere.objects.filter(pk__in=a_supprimer).delete()
+        if a_modifier:
+            PresenceJournaliere.objects.bulk_update(a_modifier, ['presents', 'absents', 'absents_justifies'])
+        if a_creer:
+            PresenceJournaliere.objects.bulk_create(a_creer)
+
+
+def reconstruire_cumuls(composante_id=None, taille_lot=1000):
+    """
+    Reconstruit entièrement les cumuls journaliers (d'une composante ou de
+    toutes) à partir des présences. Retourne le nombre de cumuls créés.
+    """
+    presences = PresenceEleve.objects.all()
+    cumuls = PresenceJournaliere.objects.all()
+    if composante_id is not None:
+        presences = presences.filter(composante_id=composante_id)
+        cumuls = cumuls.filter(composante_id=composante_id)
+
+    lignes = (presences.order_by().values('composante_id', 'classe_id', 'date')
+              .annotate(**_compteurs()).iterator(chunk_size=taille_lot))
+    with transaction.atomic():
+        cumuls.delete()
+        total = 0
+        lot = []
+        for ligne in lignes:
+            lot.append(PresenceJournaliere(
+                composante_id=ligne['composante_id'],
+                classe_id=ligne['classe_id'],
+                date=ligne['date'],
+                presents=ligne['presents'],
+                absents=ligne['absents'],
+                absents_justifies=ligne['absents_justifies'],
+            ))
+            if len(lot) >= taille_lot:
+                PresenceJournaliere.objects.bulk_create(lot)
+                total += len(lot)
+                lot = []
+        PresenceJournaliere.objects.bulk_create(lot)
+        total += len(lot)
+    return total
+
+
+def cumuls_presences(composante_id, date_debut, date_fin, classes=None):
+    """Cumuls journaliers d'une composante sur une période, éventuellement limités à des classes"""
+    cumuls = PresenceJournaliere.objects.filter(
+        composante_id=composante_id,
+        date__gte=date_debut,
+        date__lte=date_fin,
+    )
+    if classes is not None:
+        cumuls = cumuls.filter(classe__in=classes)
+    return cumuls
+
+
+def _sommes():
+    return {
+        'presents': Sum('presents'),
+        'absents': Sum('absents'),
+        'absents_justifies': Sum('absents_justifies'),
+    }
+
+
+def _stats_depuis_sommes(sommes):
+    stats = {cle: sommes[cle] or 0 for cle in ('presents', 'absents', 'absents_justifies')}
+    stats = dict(total=stats['presents'] + stats['absents'] + stats['absents_justifies'], **stats)
+    return _ajouter_taux(stats)
+
+
+def statistiques_cumuls(cumuls):
+    """Mêmes totaux que statistiques_presences(), lus dans les cumuls journaliers"""
+    return _stats_depuis_sommes(cumuls.order_by().aggregate(**_sommes()))
+
+
+def statistiques_cumuls_par(cumuls, par):
+    """Mêmes totaux que statistiques_presences_par(), par classe ou par jour"""
+    if par not in ('classe', 'date'):
+        raise ValueError(f"Regroupement impossible sur les cumuls journaliers : {par}")
+    champ = REGROUPEMENTS[par]
+    lignes = cumuls.order_by(champ).values(champ).annotate(**_sommes())
+    return {ligne[champ]: _stats_depuis_sommes(ligne) for ligne in lignes}
@@ -0,0 +1,77 @@
+"""
+Régénération groupée des mots de passe des élèves et des professeurs.
+
+Les nouveaux mots de passe sont hachés en une fois par
+`identifiants.hacher_mots_de_passe` (réparti sur un pool de processus au-delà
+de quelques dizaines de comptes), puis enregistrés par `bulk_update` sur les
+utilisateurs et sur le mot de passe en clair, dans une transaction. La fiche
+des identifiants (CSV ou PDF) est produite à partir des mêmes lignes, sans
+relire la base.
+"""
+import csv
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.template.loader import get_template
+from django.utils import timezone
+from xhtml2pdf import pisa
+
+from .identifiants import hacher_mots_de_passe
+from .models import generer_mot_de_passe
+
+EN_TETES_FICHE = ['Nom', 'Prénom', 'Classes', 'Identifiant', 'Mot de passe']
+TEMPLATE_FICHE_PDF = 'ecole_app/fiche_identifiants_pdf.html'
+
+
+def regenerer_mots_de_passe(personnes, generer=None, processus=None):
+    """
+    Attribue un nouveau mot de passe à chaque élève ou professeur donné (tous
+    du même modèle, chargés avec `select_related('user')` et de préférence
+    `prefetch_related('classes')`). Ceux qui n'ont pas de compte sont ignorés.
+    `generer(personne)` fournit le mot de passe (aléatoire par défaut).
+    Retourne les lignes de la fiche des identifiants, dans l'ordre reçu.
+    """
+    personnes = [personne for personne in personnes if personne.user_id]
+    if not personnes:
+        return []
+    mots_de_passe = [generer(personne) if generer else generer_mot_de_passe() for personne in personnes]
+    hachages = hacher_mots_de_passe(mots_de_passe, processus=processus)
+
+    lignes = []
+    for personne, mot_de_passe, hachage in zip(personnes, mots_de_passe, hachages):
+        personne.user.password = hachage
+        personne.mot_de_passe_en_clair = mot_de_passe
+        lignes.append({
+            'nom': personne.nom,
+            'prenom': getattr(personne, 'prenom', '') or '',
+            'classes': ", ".join(classe.nom for classe in personne.classes.all()),
+            'identifiant': personne.user.username,
+            'mot_de_passe': mot_de_passe,
+        })
+
+    with transaction.atomic():
+        User.objects.bulk_update([personne.user for personne in personnes], ['password'], batch_size=500)
+        type(personnes[0]).objects.bulk_update(personnes, ['mot_de_passe_en_clair'], batch_size=500)
+    return lignes
+
+
+def ecrire_fiche_csv(lignes, fichier):
+    """Écrit la fiche des identifiants au format CSV dans un fichier texte ouvert"""
+    writer = csv.writer(fichier)
+    writer.writerow(EN_TETES_FICHE)
+    for ligne in lignes:
+        writer.writerow([ligne['nom'], ligne['prenom'], ligne['classes'], ligne['identifiant'], ligne['mot_de_passe']])
+
+
+def fiche_pdf(lignes, titre):
+    """
+    Contenu PDF de la fiche des identifiants, ou None si xhtml2pdf échoue.
+    La fiche contient des mots de passe : elle n'est pas mise en cache disque.
+    """
+    html = get_template(TEMPLATE_FICHE_PDF).render({'titre': titre, 'lignes': lignes, 'date': timezone.now()})
+    resultat = BytesIO()
+    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), resultat)
+    if pdf.err:
+        return None
+    return resultat.getvalue()
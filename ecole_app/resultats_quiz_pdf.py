@@ -0,0 +1,80 @@
+"""
+PDF des résultats de quiz : contexte du template, génération via le cache
+disque (`cache_pdf`), préparation en arrière-plan à la fin d'une tentative
+et archive ZIP des résultats d'une classe.
+"""
+import zipfile
+
+from django.utils import timezone
+
+from .cache_pdf import generer_pdf, planifier
+from .models_pedagogie import TentativeQuiz
+
+TEMPLATE_RESULTATS_QUIZ = 'ecole_app/cours_quiz/pdf_resultats_quiz.html'
+
+
+def contexte_resultats_quiz(tentative):
+    """Contexte du PDF des résultats d'une tentative (réponses, choix sélectionnés et corrects)"""
+    # Récupérer les réponses avec les questions, les choix sélectionnés et les choix des questions
+    reponses_eleve = tentative.reponses.all().select_related('question').prefetch_related(
+        'choix_selectionnes', 'question__choix'
+    )
+
+    # Préparer les données pour l'affichage
+    resultats = []
+    for reponse in reponses_eleve:
+        question = reponse.question
+        resultats.append({
+            'question': question,
+            'reponse': reponse,
+            'choix_selectionnes': list(reponse.choix_selectionnes.all()),
+            'choix_corrects': [choix for choix in question.choix.all() if choix.est_correct],
+        })
+
+    return {
+        'tentative': tentative,
+        'resultats': resultats,
+        'date_generation': timezone.now(),
+    }
+
+
+def nom_fichier_resultats_quiz(tentative):
+    return f"quiz_{tentative.quiz.titre.replace(' ', '_')}_{tentative.eleve.nom}_{tentative.eleve.prenom}_{timezone.now().strftime('%Y%m%d')}.pdf"
+
+
+def tentatives_avec_details():
+    return TentativeQuiz.objects.select_related('quiz', 'quiz__module', 'eleve')
+
+
+def generer_pdf_resultats_quiz(tentative_id):
+    """Génère (ou retrouve dans le cache) le PDF d'une tentative terminée"""
+    tentative = tentatives_avec_details().filter(id=tentative_id, terminee=True).first()
+    if tentative is None:
+        return None
+    return generer_pdf(TEMPLATE_RESULTATS_QUIZ, contexte_resultats_quiz(tentative))
+
+
+def planifier_pdf_resultats_quiz(tentative):
+    """Prépare en arrière-plan le PDF d'une tentative qui vient d'être terminée"""
+    planifier(generer_pdf_resultats_quiz, tentative.pk)
+
+
+def generer_bundle_resultats_classe(quiz, classe, destination):
+    """
+    Écrit dans `destination` (chemin ou fichier) une archive ZIP des PDF
+    des tentatives terminées du quiz par les élèves de la classe. Retourne
+    le nombre de PDF ajoutés.
+    """
+    tentatives = (tentatives_avec_details()
+                  .filter(quiz=quiz, terminee=True, eleve__classes=classe)
+                  .distinct().order_by('eleve__nom', 'eleve__prenom', 'date_fin'))
+    nombre = 0
+    with zipfile.ZipFile(destination, 'w', zipfile.ZIP_STORED) as archive:
+        for tentative in tentatives:
+            chemin = generer_pdf(TEMPLATE_RESULTATS_QUIZ, contexte_resultats_quiz(tentative))
+            if chemin is None:
+                continue
+            # Les PDF sont déjà compressés : stockage sans recompression
+            archive.write(chemin, f"{tentative.eleve.nom}_{tentative.eleve.prenom}_{tentative.pk}.pdf")
+            nombre += 1
+    return nombre
@@ -0,0 +1,196 @@
+"""
+État d'une tentative de quiz conservé dans la session de l'élève.
+
+L'ordre des questions, leurs points, les choix valides et corrects, les
+questions déjà répondues et le score en cours sont chargés une seule fois
+par tentative (deux requêtes) puis gardés dans la session. La recherche de
+la question suivante et la correction d'une réponse se font ensuite sans
+relire les questions ni les réponses.
+
+La session ne fait pas foi : avant d'enregistrer une réponse, la base est
+interrogée pour écarter un doublon (double envoi, seconde session), et le
+score final est calculé en base à partir des réponses enregistrées.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+
+from .models_pedagogie import Question, Reponse, TentativeQuiz
+from .resultats_quiz_pdf import planifier_pdf_resultats_quiz
+
+CLE_SESSION = 'quiz_tentatives'
+
+TYPES_CHOIX_UNIQUE = ('choix_unique', 'vrai_faux')
+
+
+class EtatTentative:
+    """Questions, réponses données et score en cours d'une tentative"""
+
+    def __init__(self, tentative_id, questions, repondues=(), points_obtenus=0, position=0):
+        self.tentative_id = tentative_id
+        # Liste ordonnée de dictionnaires {id, type, points, choix, corrects}
+        self.questions = questions
+        self.index = {question['id']: question for question in questions}
+        self.repondues = set(repondues)
+        self.points_obtenus = points_obtenus
+        # Rang de la première question non répondue (ne fait qu'avancer)
+        self.position = position
+
+    @classmethod
+    def construire(cls, tentative):
+        """Charge l'état d'une tentative depuis la base"""
+        questions = [
+            {
+                'id': question.pk,
+                'type': question.type,
+                'points': question.points,
+                'choix': [choix.pk for choix in question.choix.all()],
+                'corrects': [choix.pk for choix in question.choix.all() if choix.est_correct],
+            }
+            for question in Question.objects.filter(quiz_id=tentative.quiz_id)
+            .order_by('ordre', 'pk').prefetch_related('choix')
+        ]
+        etat = cls(tentative.pk, questions)
+        for question_id, est_correcte in Reponse.objects.filter(tentative=tentative).values_list(
+                'question_id', 'est_correcte'):
+            if question_id in etat.index and question_id not in etat.repondues:
+                etat.enregistrer(question_id, est_correcte)
+        return etat
+
+    @classmethod
+    def depuis_session(cls, tentative_id, donnees):
+        return cls(tentative_id, donnees['questions'], donnees['repondues'],
+                   donnees['points_obtenus'], donnees['position'])
+
+    def vers_session(self):
+        return {
+            'questions': self.questions,
+            'repondues': sorted(self.repondues),
+            'points_obtenus': self.points_obtenus,
+            'position': self.position,
+        }
+
+    @property
+    def total_questions(self):
+        return len(self.questions)
+
+    @property
+    def total_points(self):
+        return sum(question['points'] for question in self.questions)
+
+    @property
+    def score(self):
+        """Score en pourcentage des points obtenus"""
+        total = self.total_points
+        return (self.points_obtenus / total) * 100 if total > 0 else 0
+
+    def question(self, question_id):
+        return self.index.get(question_id)
+
+    def prochaine_question(self):
+        """Identifiant de la première question non répondue, ou None si tout est répondu"""
+        while self.position < len(self.questions) and self.questions[self.position]['id'] in self.repondues:
+            self.position += 1
+        if self.position < len(self.questions):
+            return self.questions[self.position]['id']
+        return None
+
+    def est_correcte(self, question_id, choix_ids):
+        """Corrige une sélection de choix à partir des choix corrects déjà chargés"""
+        question = self.index[question_id]
+        selection = set(choix_ids)
+        corrects = set(question['corrects'])
+        if question['type'] in TYPES_CHOIX_UNIQUE:
+            return len(selection) == 1 and selection <= corrects
+        if question['type'] == 'choix_multiple':
+            # Tous les choix corrects et aucun choix incorrect
+            return bool(selection) and selection == corrects
+        # Les réponses textuelles ne sont pas corrigées automatiquement
+        return False
+
+    def enregistrer(self, question_id, est_correcte):
+        self.repondues.add(question_id)
+        if est_correcte:
+            self.points_obtenus += self.index[question_id]['points']
+
+
+def charger_etat(request, tentative):
+    """État de la tentative, lu dans la session ou construit puis mémorisé"""
+    donnees = request.session.get(CLE_SESSION, {}).get(str(tentative.pk))
+    if donnees is not None:
+        return EtatTentative.depuis_session(tentative.pk, donnees)
+    etat = EtatTentative.construire(tentative)
+    sauvegarder_etat(request, etat)
+    return etat
+
+
+def sauvegarder_etat(request, etat):
+    etats = request.session.get(CLE_SESSION, {})
+    etats[str(etat.tentative_id)] = etat.vers_session()
+    request.session[CLE_SESSION] = etats
+
+
+def oublier_etat(request, tentative_id):
+    etats = request.session.get(CLE_SESSION, {})
+    if etats.pop(str(tentative_id), None) is not None:
+        request.session[CLE_SESSION] = etats
+
+
+def enregistrer_reponse(etat, tentative, question_id, choix_ids=(), texte_reponse=None):
+    """
+    Enregistre la réponse à une question et met à jour l'état. Lève
+    ValueError si un choix n'appartient pas à la question.
+    """
+    question = etat.index[question_id]
+    choix_ids = [int(choix_id) for choix_id in choix_ids]
+    if not set(choix_ids) <= set(question['choix']):
+        raise ValueError("Choix invalide pour cette question.")
+
+    est_correcte = etat.est_correcte(question_id, choix_ids)
+    with transaction.atomic():
+        # Le verrou sur la tentative sérialise les réponses concurrentes : une
+        # question déjà répondue en base (état de session périmé) n'est pas
+        # enregistrée une seconde fois
+        TentativeQuiz.objects.select_for_update().only('pk').get(pk=tentative.pk)
+        reponse = Reponse.objects.filter(tentative=tentative, question_id=question_id).first()
+        if reponse is not None:
+            etat.enregistrer(question_id, reponse.est_correcte)
+            return reponse
+        reponse = Reponse.objects.create(
+            tentative=tentative,
+            question_id=question_id,
+            texte_reponse=texte_reponse,
+            est_correcte=est_correcte,
+        )
+        if choix_ids:
+            Reponse.choix_selectionnes.through.objects.bulk_create([
+                Reponse.choix_selectionnes.through(reponse_id=reponse.pk, choix_id=choix_id)
+                for choix_id in set(choix_ids)
+            ])
+    etat.enregistrer(question_id, est_correcte)
+    return reponse
+
+
+def calculer_score(tentative):
+    """
+    Score en pourcentage d'une tentative, lu en base en une requête : points
+    des questions du quiz ayant une réponse correcte sur le total des points
+    """
+    correctes = Reponse.objects.filter(tentative=tentative, question_id=OuterRef('pk'), est_correcte=True)
+    points = Question.objects.filter(quiz_id=tentative.quiz_id).aggregate(
+        total=Sum('points'),
+        obtenus=Sum('points', filter=Q(Exists(correctes))),
+    )
+    if not points['total']:
+        return 0
+    return ((points['obtenus'] or 0) / points['total']) * 100
+
+
+def terminer_tentative(request, tentative):
+    """
+    Termine la tentative avec le score calculé en base puis libère la
+    session ; le PDF des résultats, qui ne changera plus, est préparé en
+    arrière-plan.
+    """
+    if tentative.terminer(calculer_score(tentative)):
+        planifier_pdf_resultats_quiz(tentative)
+    oublier_etat(request, tentative.pk)
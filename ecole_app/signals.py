@@ -1,7 +1,16 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import User, Group
-from .models import Eleve, Professeur, generer_identifiant, generer_mot_de_passe
+from .models import (Eleve, Professeur, Classe, Creneau, Paiement, Charge, Composante, ParametreSite, SiteConfig,
+                     PresenceEleve, Memorisation, generer_identifiant, generer_mot_de_passe)
+from .dashboard_stats import invalider_dashboard_stats
+from .grand_livre import invalider_grand_livre
+from .impayes import invalider_releve_impayes
+from .cache_parametres import invalider_parametres, invalider_roles
+from .models_pedagogie import TentativeQuiz
+from .presences import actualiser_cumuls, cle_cumul
+from .pages_memorisees import ajouter_pages, eleve_du_carnet, masque_plage, reconstruire_pages
+from .soldes import actualiser_soldes
 import re
 
 
@@ -92,3 +101,167 @@ def create_user_for_professeur(sender, instance, created, **kwargs):
         post_save.disconnect(create_user_for_professeur, sender=Professeur)
         instance.save()
         post_save.connect(create_user_for_professeur, sender=Professeur)
+
+
+@receiver(post_save, sender=Eleve)
+@receiver(post_delete, sender=Eleve)
+@receiver(post_save, sender=Classe)
+@receiver(post_delete, sender=Classe)
+@receiver(post_save, sender=Creneau)
+@receiver(post_delete, sender=Creneau)
+@receiver(post_save, sender=Paiement)
+@receiver(post_delete, sender=Paiement)
+def invalider_stats_composante(sender, instance, **kwargs):
+    """Invalide les statistiques du dashboard de la composante concernée"""
+    invalider_dashboard_stats(instance.composante_id)
+
+
+@receiver(post_save, sender=Paiement)
+@receiver(post_delete, sender=Paiement)
+@receiver(post_save, sender=Charge)
+@receiver(post_delete, sender=Charge)
+def invalider_grand_livre_operation(sender, instance, **kwargs):
+    """Invalide le grand livre après l'enregistrement ou la suppression d'un paiement ou d'une charge"""
+    invalider_grand_livre(instance.composante_id)
+
+
+@receiver(post_save, sender=Eleve)
+@receiver(post_delete, sender=Eleve)
+@receiver(post_save, sender=Paiement)
+@receiver(post_delete, sender=Paiement)
+def invalider_releve_impayes_composante(sender, instance, **kwargs):
+    """Invalide le relevé des impayés de la composante concernée"""
+    invalider_releve_impayes(instance.composante_id)
+
+
+@receiver(m2m_changed, sender=Professeur.composantes.through)
+def invalider_stats_composantes_professeur(sender, instance, action, pk_set, **kwargs):
+    """Invalide les statistiques quand les composantes d'un professeur changent"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if isinstance(instance, Professeur):
+        composante_ids = pk_set if action != 'pre_clear' else instance.composantes.values_list('id', flat=True)
+    else:
+        composante_ids = [instance.pk]
+    invalider_dashboard_stats(*composante_ids)
+
+
+@receiver(pre_delete, sender=Professeur)
+def invalider_stats_suppression_professeur(sender, instance, **kwargs):
+    """Invalide les statistiques des composantes d'un professeur supprimé"""
+    invalider_dashboard_stats(*instance.composantes.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=SiteConfig)
+@receiver(post_delete, sender=SiteConfig)
+@receiver(post_save, sender=ParametreSite)
+@receiver(post_delete, sender=ParametreSite)
+def invalider_cache_parametres(sender, instance, **kwargs):
+    """Invalide les paramètres du site mis en cache"""
+    invalider_parametres()
+
+
+@receiver(post_save, sender=Eleve)
+@receiver(post_delete, sender=Eleve)
+@receiver(post_save, sender=Professeur)
+@receiver(post_delete, sender=Professeur)
+def invalider_role_utilisateur(sender, instance, **kwargs):
+    """Invalide le rôle mis en cache de l'utilisateur lié à un élève ou un professeur"""
+    invalider_roles(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Professeur.composantes.through)
+def invalider_role_composantes_professeur(sender, instance, action, pk_set, **kwargs):
+    """Invalide le rôle des professeurs dont les composantes changent"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if isinstance(instance, Professeur):
+        invalider_roles(instance.user_id)
+    else:
+        professeurs = Professeur.objects.filter(pk__in=pk_set) if action != 'pre_clear' else instance.professeurs.all()
+        invalider_roles(*professeurs.values_list('user_id', flat=True))
+
+
+@receiver(pre_delete, sender=Composante)
+def invalider_role_suppression_composante(sender, instance, **kwargs):
+    """Invalide le rôle des professeurs d'une composante supprimée"""
+    invalider_roles(*instance.professeurs.values_list('user_id', flat=True))
+
+
+@receiver(pre_delete, sender=TentativeQuiz)
+def retirer_tentative_compteurs_quiz(sender, instance, **kwargs):
+    """Retire une tentative terminée des compteurs de son quiz avant sa suppression"""
+    if instance.terminee:
+        instance._appliquer_compteurs(-1)
+
+
+@receiver(pre_save, sender=PresenceEleve)
+def memoriser_jour_presence(sender, instance, raw=False, **kwargs):
+    """Retient le jour d'origine d'une présence modifiée pour actualiser son ancien cumul"""
+    instance._cle_cumul_initiale = None
+    if instance.pk and not raw:
+        ancienne = PresenceEleve.objects.filter(pk=instance.pk).values('composante_id', 'classe_id', 'date').first()
+        if ancienne:
+            instance._cle_cumul_initiale = cle_cumul(ancienne)
+
+
+@receiver(post_save, sender=PresenceEleve)
+@receiver(post_delete, sender=PresenceEleve)
+def actualiser_cumul_presence(sender, instance, raw=False, **kwargs):
+    """Actualise les cumuls journaliers après l'enregistrement ou la suppression d'une présence"""
+    if raw:
+        return
+    cles = {cle_cumul(instance), getattr(instance, '_cle_cumul_initiale', None)}
+    actualiser_cumuls(cles - {None})
+
+
+@receiver(pre_save, sender=Memorisation)
+def memoriser_plage_memorisation(sender, instance, raw=False, **kwargs):
+    """Retient le carnet et la plage d'origine d'une mémorisation modifiée"""
+    instance._plage_initiale = None
+    if instance.pk and not raw:
+        instance._plage_initiale = Memorisation.objects.filter(pk=instance.pk).values_list(
+            'carnet_id', 'debut_page', 'fin_page').first()
+
+
+@receiver(post_save, sender=Memorisation)
+def actualiser_pages_memorisation(sender, instance, raw=False, **kwargs):
+    """Ajoute la plage enregistrée aux pages mémorisées de l'élève"""
+    if raw:
+        return
+    eleve_id = eleve_du_carnet(instance.carnet_id)
+    initiale = getattr(instance, '_plage_initiale', None)
+    if initiale is not None:
+        carnet_id, debut, fin = initiale
+        ancien, nouveau = masque_plage(debut, fin), masque_plage(instance.debut_page, instance.fin_page)
+        if carnet_id != instance.carnet_id or ancien & ~nouveau:
+            # Des pages ont pu sortir du masque : recalcul depuis les mémorisations
+            reconstruire_pages({eleve_id, eleve_du_carnet(carnet_id)} - {None})
+            return
+    if eleve_id is not None:
+        ajouter_pages(eleve_id, instance.debut_page, instance.fin_page)
+
+
+@receiver(post_delete, sender=Memorisation)
+def retirer_pages_memorisation(sender, instance, **kwargs):
+    """Recalcule les pages mémorisées de l'élève après la suppression d'une mémorisation"""
+    eleve_id = eleve_du_carnet(instance.carnet_id)
+    if eleve_id is not None:
+        reconstruire_pages([eleve_id])
+
+
+@receiver(pre_save, sender=Paiement)
+def memoriser_eleve_paiement(sender, instance, raw=False, **kwargs):
+    """Retient l'élève d'origine d'un paiement modifié pour actualiser son ancien solde"""
+    instance._eleve_initial_id = None
+    if instance.pk and not raw:
+        instance._eleve_initial_id = Paiement.objects.filter(pk=instance.pk).values_list('eleve_id', flat=True).first()
+
+
+@receiver(post_save, sender=Paiement)
+@receiver(post_delete, sender=Paiement)
+def actualiser_solde_paiement(sender, instance, raw=False, **kwargs):
+    """Actualise le total payé de l'élève après l'enregistrement ou la suppression d'un paiement"""
+    if raw:
+        return
+    actualiser_soldes({instance.eleve_id, getattr(instance, '_eleve_initial_id', None)})
@@ -0,0 +1,129 @@
+"""
+Montants des paiements et soldes des élèves.
+
+Le montant d'un `Paiement` est la somme de ses `PaiementHistorique` : il est
+recalculé en base par un UPDATE avec sous-requête (`recalculer_paiement`),
+ou pour tous les paiements d'une composante en une seule requête
+(`recalculer_paiements`), sans charger les historiques.
+
+Le total payé de chaque élève est enregistré sur `Eleve.montant_paye` et
+recalculé en une requête UPDATE (somme des paiements en
+sous-requête) pour les élèves touchés à chaque enregistrement ou
+suppression d'un paiement, dans la transaction de l'écriture. Les listes
+lisent donc `montant_paye` et `montant_restant` sans agrégat par ligne.
+`Eleve.save()` n'écrit jamais ce champ après la création, pour qu'un élève
+chargé avant un paiement (formulaire, envoi des identifiants) ne remette
+pas un ancien solde en base.
+
+Le filet de sécurité est `reconcilier_soldes`, exposé par la commande
+`reconcilier_soldes_eleves` : elle compare les soldes enregistrés aux
+paiements et corrige les écarts (imports, `QuerySet.update()` ou SQL
+direct sur les paiements, écritures hors de l'ORM). À lancer après ce
+type d'opération, ou périodiquement.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, Exists, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .dashboard_stats import invalider_dashboard_stats
+from .grand_livre import invalider_grand_livre
+from .impayes import invalider_releve_impayes
+from .models import Eleve, Paiement, PaiementHistorique
+
+CHAMP_MONTANT = DecimalField(max_digits=10, decimal_places=2)
+
+
+def total_paiements():
+    """Expression : somme des paiements de l'élève courant (0 sans paiement)"""
+    totaux = (Paiement.objects.filter(eleve_id=OuterRef('pk')).order_by()
+              .values('eleve_id').annotate(total=Sum('montant')).values('total'))
+    return Coalesce(Subquery(totaux, output_field=CHAMP_MONTANT), Value(Decimal('0')), output_field=CHAMP_MONTANT)
+
+
+def total_historiques():
+    """Expression : somme des historiques du paiement courant (0 sans historique)"""
+    totaux = (PaiementHistorique.objects.filter(paiement_id=OuterRef('pk')).order_by()
+              .values('paiement_id').annotate(total=Sum('montant')).values('total'))
+    return Coalesce(Subquery(totaux, output_field=CHAMP_MONTANT), Value(Decimal('0')), output_field=CHAMP_MONTANT)
+
+
+def annoter_soldes(queryset, recalcul=False):
+    """
+    Ajoute `reste_a_payer` (montant_total - montant_paye) aux élèves du
+    queryset, pour filtrer ou trier par solde en base. Avec `recalcul`,
+    ajoute aussi `total_paiements`, la somme relue dans les paiements.
+    """
+    queryset = queryset.annotate(reste_a_payer=F('montant_total') - F('montant_paye'))
+    if recalcul:
+        queryset = queryset.annotate(total_paiements=total_paiements())
+    return queryset
+
+
+def actualiser_soldes(eleve_ids):
+    """Recalcule le total payé des élèves donnés, en une requête"""
+    eleve_ids = set(eleve_ids) - {None}
+    if eleve_ids:
+        Eleve.objects.filter(pk__in=eleve_ids).update(montant_paye=total_paiements())
+
+
+def reconcilier_soldes(eleve_ids=None, corriger=True):
+    """
+    Élèves dont le solde enregistré diffère de la somme de leurs paiements,
+    sous forme de triplets (eleve_id, enregistré, réel). Les écarts sont
+    corrigés sauf si `corriger` est faux.
+    """
+    eleves = Eleve.objects.all()
+    if eleve_ids is not None:
+        eleves = eleves.filter(pk__in=eleve_ids)
+    with transaction.atomic():
+        ecarts = list(annoter_soldes(eleves, recalcul=True).exclude(montant_paye=F('total_paiements'))
+                      .order_by('pk').values_list('pk', 'montant_paye', 'total_paiements'))
+        if corriger and ecarts:
+            actualiser_soldes(eleve_id for eleve_id, enregistre, reel in ecarts)
+    return ecarts
+
+
+def recalculer_paiement(paiement_id):
+    """
+    Recalcule en base le montant d'un paiement à partir de ses historiques,
+    puis le solde de son élève, dans une transaction. L'UPDATE verrouille la
+    ligne du paiement jusqu'à la fin de la transaction. Retourne le montant.
+    """
+    with transaction.atomic():
+        paiements = Paiement.objects.filter(pk=paiement_id)
+        paiements.update(montant=total_historiques())
+        montant, eleve_id, composante_id = paiements.values_list('montant', 'eleve_id', 'composante_id').get()
+        actualiser_soldes([eleve_id])
+    # Écriture faite par update() : les signaux de Paiement ne sont pas émis
+    invalider_dashboard_stats(composante_id)
+    invalider_grand_livre(composante_id)
+    invalider_releve_impayes(composante_id)
+    return montant
+
+
+def recalculer_paiements(composante_id=None):
+    """
+    Recalcule les montants de tous les paiements ayant des historiques (d'une
+    composante, ou de toutes), puis les soldes de leurs élèves : deux requêtes
+    quel que soit le nombre de paiements. Les paiements sans historique,
+    saisis directement, sont laissés tels quels. Retourne le nombre de
+    paiements recalculés.
+    """
+    historiques = PaiementHistorique.objects.filter(paiement_id=OuterRef('pk'))
+    paiements = Paiement.objects.filter(Exists(historiques))
+    if composante_id:
+        paiements = paiements.filter(composante_id=composante_id)
+    with transaction.atomic():
+        nombre = paiements.update(montant=total_historiques())
+        eleves = Eleve.objects.filter(Exists(paiements.filter(eleve_id=OuterRef('pk'))))
+        eleves.update(montant_paye=total_paiements())
+    if composante_id:
+        composante_ids = [composante_id]
+    else:
+        composante_ids = list(Paiement.objects.order_by().values_list('composante_id', flat=True).distinct())
+    invalider_dashboard_stats(*composante_ids)
+    invalider_grand_livre(*composante_ids)
+    invalider_releve_impayes(*composante_ids)
+    return nombre
@@ -1,8 +1,14 @@
 from django.db import models
 import csv
 import os
+from array import array
+from bisect import bisect_left, bisect_right
 from django.conf import settings
 
+NOMBRE_PAGES = 604
+# Valeur de PAGE_VERS_SOURATE pour une page hors du Mushaf
+AUCUNE_SOURATE = 255
+
 class Sourate:
     """Classe pour représenter une sourate et sa plage de pages"""
     def __init__(self, nom, page_debut, page_fin):
@@ -37,8 +43,26 @@ def charger_sourates():
     
     return sourates
 
+def construire_index(sourates):
+    """
+    Construit l'index des plages de pages des sourates.
+
+    Les sourates se suivent dans l'ordre du Mushaf : leurs pages de début et
+    de fin sont croissantes, ce qui permet des recherches par bisection. Le
+    tableau page → sourate (index 0 inutilisé) donne la première sourate
+    présente sur chaque page en accès direct.
+    """
+    debuts = [sourate.page_debut for sourate in sourates]
+    fins = [sourate.page_fin for sourate in sourates]
+    page_vers_sourate = array('B', [AUCUNE_SOURATE] * (NOMBRE_PAGES + 1))
+    for index in reversed(range(len(sourates))):
+        for page in range(max(debuts[index], 1), min(fins[index], NOMBRE_PAGES) + 1):
+            page_vers_sourate[page] = index
+    return debuts, fins, page_vers_sourate
+
 # Liste des sourates chargée au démarrage
 SOURATES = charger_sourates()
+DEBUTS_SOURATES, FINS_SOURATES, PAGE_VERS_SOURATE = construire_index(SOURATES)
 
 def get_sourates_choices():
     """Retourne les choix pour un champ de formulaire"""
@@ -63,9 +87,66 @@ def get_sourate_for_page(page_number):
     """
     try:
         page_number = int(page_number)
-        for i, sourate in enumerate(SOURATES):
-            if sourate.page_debut <= page_number <= sourate.page_fin:
-                return i
+    except (ValueError, TypeError):
         return None
+    if not 1 <= page_number <= NOMBRE_PAGES:
+        return None
+    index = PAGE_VERS_SOURATE[page_number]
+    return None if index == AUCUNE_SOURATE else index
+
+def get_sourates_for_range(debut_page, fin_page):
+    """Retourne les index des sourates dont la plage de pages recoupe [debut_page, fin_page]"""
+    debut_page, fin_page = sorted((debut_page, fin_page))
+    premiere = bisect_left(FINS_SOURATES, debut_page)
+    derniere = bisect_right(DEBUTS_SOURATES, fin_page)
+    return list(range(premiere, derniere))
+
+def get_sourate_for_range(debut_page, fin_page):
+    """Détermine la sourate d'une plage de pages
+    
+    Returns:
+        Un tuple (index, complete) : la première sourate contenant à la fois
+        les deux pages (complete=True), à défaut la sourate de la page de
+        début (complete=False), ou (None, False) si aucune ne correspond
+    """
+    try:
+        # Une plage saisie à l'envers (fin avant début) désigne les mêmes pages
+        debut_page, fin_page = sorted((int(debut_page), int(fin_page)))
     except (ValueError, TypeError):
+        return None, False
+    # Les sourates contenant la page de début sont contiguës dans l'index
+    for index in range(bisect_left(FINS_SOURATES, debut_page), bisect_right(DEBUTS_SOURATES, debut_page)):
+        if fin_page <= FINS_SOURATES[index]:
+            return index, True
+    return get_sourate_for_page(debut_page), False
+
+def get_sourates_for_plages(plages):
+    """Résout en un seul appel une liste de plages (debut_page, fin_page)
+    
+    Returns:
+        La liste des index de sourate (ou None), dans l'ordre des plages, selon
+        la même règle que get_sourate_for_range
+    """
+    resultats = []
+    cache = {}
+    for plage in plages:
+        if plage not in cache:
+            cache[plage] = get_sourate_for_range(*plage)[0]
+        resultats.append(cache[plage])
+    return resultats
+
+def get_nom_arabe(sourate_index):
+    """Retourne le nom arabe d'une sourate à partir de son index (0 = Al-Fatiha)"""
+    from .coran import get_corpus
+    try:
+        return get_corpus().sourates[int(sourate_index)]['nom_ar']
+    except (ValueError, TypeError, IndexError, KeyError):
         return None
+
+def get_versets_for_pages(debut_page, fin_page):
+    """Retourne les versets des sourates couvrant une plage de pages"""
+    from .coran import get_corpus
+    try:
+        return get_corpus().versets_pages(int(debut_page), int(fin_page))
+    except (ValueError, TypeError):
+        return []
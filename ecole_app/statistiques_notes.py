@@ -0,0 +1,167 @@
+"""
+Statistiques des notes d'examen calculées en une seule passe.
+
+Les notes concernées sont lues en une requête, puis toutes les statistiques
+(moyenne, médiane, quartiles, répartition par tranche, par type d'examen et
+par élève, dernière note) sont calculées en mémoire. La médiane et les
+centiles n'ont pas d'agrégat SQL portable (SQLite n'en fournit pas) : les
+calculer ici évite une requête par type d'examen et par élève.
+"""
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.db.models import Q
+
+from .models import Eleve, NoteExamen
+
+# Tranches de la répartition des notes (sur 20) : [borne_basse, borne_haute[
+TRANCHES_NOTES = [(0, 5), (5, 10), (10, 14), (14, 17), (17, None)]
+
+TYPES_EXAMEN = dict(NoteExamen.TYPE_EXAMEN_CHOICES)
+
+
+def _centile(valeurs_triees, p):
+    """Centile p (0-100) par interpolation linéaire entre les rangs"""
+    if not valeurs_triees:
+        return None
+    rang = (len(valeurs_triees) - 1) * Decimal(p) / 100
+    bas = int(rang)
+    haut = min(bas + 1, len(valeurs_triees) - 1)
+    return valeurs_triees[bas] + (valeurs_triees[haut] - valeurs_triees[bas]) * (rang - bas)
+
+
+class SerieNotes:
+    """Série de valeurs numériques accumulée au fil d'un parcours"""
+
+    def __init__(self, valeurs=()):
+        self.valeurs = []
+        self.derniere_note = None
+        for valeur in valeurs:
+            self.ajouter(valeur)
+
+    def ajouter(self, valeur, note=None):
+        self.valeurs.append(Decimal(valeur))
+        # Les notes sont parcourues de la plus récente à la plus ancienne
+        if note is not None and self.derniere_note is None:
+            self.derniere_note = note
+
+    def __len__(self):
+        return len(self.valeurs)
+
+    @property
+    def count(self):
+        return len(self.valeurs)
+
+    @property
+    def moyenne(self):
+        return sum(self.valeurs) / len(self.valeurs) if self.valeurs else 0
+
+    @property
+    def minimum(self):
+        return min(self.valeurs) if self.valeurs else None
+
+    @property
+    def maximum(self):
+        return max(self.valeurs) if self.valeurs else None
+
+    def centile(self, p):
+        return _centile(sorted(self.valeurs), p)
+
+    @property
+    def mediane(self):
+        return self.centile(50)
+
+    def resume(self):
+        """Dictionnaire des statistiques de la série (un seul tri)"""
+        triees = sorted(self.valeurs)
+        return {
+            'count': len(triees),
+            'moyenne': self.moyenne,
+            'mediane': _centile(triees, 50),
+            'premier_quartile': _centile(triees, 25),
+            'troisieme_quartile': _centile(triees, 75),
+            'min': triees[0] if triees else None,
+            'max': triees[-1] if triees else None,
+            'derniere_note': self.derniere_note,
+        }
+
+    def distribution(self, tranches=TRANCHES_NOTES):
+        """Nombre de valeurs par tranche, sous la forme [(libellé, nombre), ...]"""
+        comptes = OrderedDict(
+            (f"{bas}-{haut}" if haut is not None else f"{bas}+", 0) for bas, haut in tranches
+        )
+        for valeur in self.valeurs:
+            for (bas, haut), libelle in zip(tranches, comptes):
+                if valeur >= bas and (haut is None or valeur < haut):
+                    comptes[libelle] += 1
+                    break
+        return list(comptes.items())
+
+
+def analyser_notes(notes, eleve_ids=None):
+    """
+    Calcule en une passe les statistiques d'un ensemble de notes.
+
+    `notes` doit être trié de la plus récente à la plus ancienne pour que
+    `derniere_note` soit correcte. Si `eleve_ids` est fourni, seules les
+    notes de ces élèves sont prises en compte dans `notes_par_eleve`.
+    Retourne un dictionnaire avec le résumé global, la répartition, puis
+    `notes_par_type` (clé : libellé du type) et `notes_par_eleve`
+    (clé : identifiant de l'élève, avec l'objet `eleve`).
+    """
+    globale = SerieNotes()
+    par_type = {}
+    par_eleve = {}
+    eleves = {}
+
+    for note in notes:
+        globale.ajouter(note.note, note)
+        par_type.setdefault(note.type_examen, SerieNotes()).ajouter(note.note, note)
+        if eleve_ids is None or note.eleve_id in eleve_ids:
+            if note.eleve_id not in par_eleve:
+                par_eleve[note.eleve_id] = SerieNotes()
+                eleves[note.eleve_id] = note.eleve
+            par_eleve[note.eleve_id].ajouter(note.note, note)
+
+    # Types dans l'ordre des choix du modèle, élèves par nom puis prénom
+    notes_par_type = OrderedDict(
+        (TYPES_EXAMEN[code], par_type[code].resume()) for code in TYPES_EXAMEN if code in par_type
+    )
+    notes_par_eleve = OrderedDict()
+    for eleve_id in sorted(par_eleve, key=lambda i: (eleves[i].nom, eleves[i].prenom, i)):
+        notes_par_eleve[eleve_id] = dict(par_eleve[eleve_id].resume(), eleve=eleves[eleve_id])
+
+    resultat = globale.resume()
+    resultat.update({
+        'distribution': globale.distribution(),
+        'notes_par_type': notes_par_type,
+        'notes_par_eleve': notes_par_eleve,
+    })
+    return resultat
+
+
+def statistiques_classe(classe):
+    """
+    Statistiques des notes d'une classe, en deux requêtes : les notes
+    (avec leurs élèves) et les élèves actifs inscrits dans la classe.
+    """
+    notes = list(
+        NoteExamen.objects.filter(classe=classe)
+        .select_related('eleve')
+        .order_by('-date_examen', '-date_creation')
+    )
+    eleve_ids = set(
+        Eleve.objects.filter(Q(classe=classe) | Q(classes=classe), archive=False).values_list('id', flat=True)
+    )
+    return notes, analyser_notes(notes, eleve_ids)
+
+
+def statistiques_eleve(eleve):
+    """Notes d'un élève (de la plus récente à la plus ancienne) et leurs statistiques, en une requête"""
+    notes = list(
+        NoteExamen.objects.filter(eleve=eleve)
+        .select_related('professeur', 'classe')
+        .order_by('-date_examen', '-date_creation')
+    )
+    # Pas de détail par élève : toutes les notes sont les siennes
+    return notes, analyser_notes(notes, eleve_ids=())
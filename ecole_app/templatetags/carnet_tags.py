@@ -1,5 +1,5 @@
 from django import template
-from ..sourate import SOURATES
+from ..sourate import SOURATES, get_sourate_for_page
 
 register = template.Library()
 
@@ -12,11 +12,8 @@ def get_sourate_from_pages(page_debut, page_fin):
         return "-"
     
     # Rechercher la sourate correspondant à la page de début
-    for sourate in SOURATES:
-        if sourate.page_debut <= page_debut <= sourate.page_fin:
-            return sourate.nom
-    
-    return "-"
+    index = get_sourate_for_page(page_debut)
+    return SOURATES[index].nom if index is not None else "-"
 
 @register.filter
 def get_sourate_for_memo(memo):
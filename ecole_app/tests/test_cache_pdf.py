@@ -0,0 +1,57 @@
+import os
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from ecole_app import cache_pdf
+
+TEMPLATE = 'ecole_app/fiche_identifiants_pdf.html'
+
+
+class CachePdfTestCase(SimpleTestCase):
+    """Tests pour le cache disque des PDF générés"""
+
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        self.dossier = Path(dossier.name)
+        patch = mock.patch.object(cache_pdf, 'PDF_CACHE_DIR', self.dossier)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.contexte = {'titre': 'Fiche', 'date': timezone.now(), 'lignes': [
+            {'nom': 'Dupont', 'prenom': 'Jean', 'classes': 'Hifz 1', 'identifiant': 'jdupont', 'mot_de_passe': 'secret'},
+        ]}
+
+    def test_cle_stable(self):
+        """La clé ne dépend que du template et du HTML rendu"""
+        cle = cache_pdf.cle_pdf(TEMPLATE, '<p>A</p>')
+        self.assertEqual(cle, cache_pdf.cle_pdf(TEMPLATE, '<p>A</p>'))
+        self.assertNotEqual(cle, cache_pdf.cle_pdf(TEMPLATE, '<p>B</p>'))
+        self.assertNotEqual(cle, cache_pdf.cle_pdf('autre.html', '<p>A</p>'))
+        self.assertEqual(cache_pdf.chemin_pdf(cle), self.dossier / cle[:2] / f'{cle}.pdf')
+
+    def test_pdf_servi_depuis_le_cache(self):
+        """Le PDF est écrit par renommage d'un fichier temporaire, puis relu sans nouveau rendu"""
+        with mock.patch.object(cache_pdf.os, 'replace', wraps=os.replace) as remplacer, \
+                mock.patch.object(cache_pdf.pisa, 'pisaDocument', wraps=cache_pdf.pisa.pisaDocument) as rendu:
+            chemin = cache_pdf.generer_pdf(TEMPLATE, self.contexte)
+            self.assertEqual(cache_pdf.generer_pdf(TEMPLATE, self.contexte), chemin)
+        self.assertEqual(rendu.call_count, 1)
+        temporaire, destination = remplacer.call_args.args
+        self.assertEqual((Path(temporaire).parent, Path(temporaire).suffix, destination), (chemin.parent, '.tmp', chemin))
+        self.assertTrue(chemin.read_bytes().startswith(b'%PDF'))
+        self.assertEqual(list(self.dossier.glob('*/*.tmp')), [])
+
+    def test_eviction(self):
+        """Les PDF trop anciens sont supprimés, puis les moins récents au-delà de la taille maximale"""
+        maintenant = time.time()
+        for nom, age in [('ancien', 100), ('a', 30), ('b', 20), ('c', 10)]:
+            chemin = self.dossier / 'ab' / f'{nom}.pdf'
+            chemin.parent.mkdir(exist_ok=True)
+            chemin.write_bytes(b'x' * 10)
+            os.utime(chemin, (maintenant - age, maintenant - age))
+        cache_pdf.evincer(taille_max=20, age_max=50)
+        self.assertEqual(sorted(chemin.stem for chemin in self.dossier.glob('*/*.pdf')), ['b', 'c'])
@@ -0,0 +1,45 @@
+import datetime
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+from ecole_app.carnet import COMPETENCES_MAPPING, CatalogueCompetences, LectureCarnet
+from ecole_app.models import CompetenceLivre, EvaluationCompetence, Memorisation
+
+
+class LectureCarnetTestCase(SimpleTestCase):
+    """Tests pour la lecture du carnet à partir des données déjà chargées"""
+
+    def setUp(self):
+        self.competences = [
+            CompetenceLivre(pk=1, lecon=1, ordre=1, description=COMPETENCES_MAPPING['1_1']),
+            CompetenceLivre(pk=2, lecon=4, ordre=1, description=COMPETENCES_MAPPING['3_6']),
+            CompetenceLivre(pk=3, lecon=0, ordre=1, description=COMPETENCES_MAPPING['regles_1']),
+        ]
+        self.carnet = SimpleNamespace(
+            ecoutes_mois=[],
+            memorisations_mois=[Memorisation(pk=1, date=datetime.date(2025, 3, 1), debut_page=1, fin_page=1)],
+            revisions_mois=[],
+            repetitions_mois=[],
+        )
+
+    def lecture(self, evaluations):
+        return LectureCarnet(None, self.carnet, 3, 2025, CatalogueCompetences(self.competences), evaluations)
+
+    def test_competences_statiques(self):
+        """Les cases du livre pointent vers les compétences de même description"""
+        lecture = self.lecture([EvaluationCompetence(competence_id=2, statut='en_cours')])
+        self.assertEqual(lecture.competences_id_mapping, {'1_1': 1, '3_1': 1, '7_4': 1, '3_6': 2, 'regles_1': 3})
+        self.assertEqual(lecture.competences_status, {'3_6': 'en_cours'})
+        self.assertEqual(lecture.memorisations[0].sourate_nom, 'Al-Fatiha')
+
+    def test_dates_annotation(self):
+        """Les leçons regroupées dans un même tableau partagent la date d'évaluation"""
+        lecture = self.lecture([
+            EvaluationCompetence(competence_id=1, date_evaluation=datetime.date(2025, 1, 5)),
+            EvaluationCompetence(competence_id=2, date_evaluation=datetime.date(2025, 2, 5)),
+            EvaluationCompetence(competence_id=3, date_evaluation=datetime.date(2025, 3, 5)),
+        ])
+        dates = lecture.dates_annotation
+        self.assertEqual(dates[2], datetime.date(2025, 1, 5))
+        self.assertEqual(dates[3], datetime.date(2025, 2, 5))
+        self.assertEqual(dates['regles'], datetime.date(2025, 3, 5))
@@ -0,0 +1,187 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.test import SimpleTestCase
+from cloudflare_d1 import CloudflareD1Client, CloudflareD1Error
+
+MOTIF_QUERY = re.compile(r'^/accounts/[^/]+/d1/database/[^/]+/query$')
+
+
+class ServeurD1Local(ThreadingHTTPServer):
+    """
+    Imitation locale de l'API de requêtes D1 sur une base SQLite en mémoire :
+    requête simple (`sql`, `params`) ou lot transactionnel (`batch`).
+    `pannes` liste des statuts HTTP à renvoyer avant de traiter les requêtes.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), GestionnaireD1)
+        self.base = sqlite3.connect(':memory:', check_same_thread=False, isolation_level=None)
+        self.base.row_factory = sqlite3.Row
+        self.verrou = threading.Lock()
+        self.pannes = []
+        self.appels = 0
+        self.connexions = 0
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}/accounts/compte/d1/database/base"
+
+    def executer(self, requetes):
+        with self.verrou:
+            self.base.execute('BEGIN')
+            try:
+                resultats = []
+                for requete in requetes:
+                    curseur = self.base.execute(requete['sql'], requete.get('params', []))
+                    resultats.append({
+                        'results': [dict(ligne) for ligne in curseur.fetchall()],
+                        'success': True,
+                        'meta': {'changes': curseur.rowcount, 'last_row_id': curseur.lastrowid},
+                    })
+            except sqlite3.Error:
+                self.base.execute('ROLLBACK')
+                raise
+            self.base.execute('COMMIT')
+            return resultats
+
+
+class GestionnaireD1(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connexions += 1
+
+    def log_message(self, *args):
+        pass
+
+    def repondre(self, statut, donnees):
+        corps = json.dumps(donnees).encode('utf-8')
+        self.send_response(statut)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corps)))
+        self.end_headers()
+        self.wfile.write(corps)
+
+    def do_POST(self):
+        corps = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.server.appels += 1
+        if not MOTIF_QUERY.match(self.path) or self.headers.get('Authorization') != 'Bearer jeton':
+            return self.repondre(404, {'success': False, 'errors': [{'code': 7003, 'message': 'Introuvable'}]})
+        if self.server.pannes:
+            return self.repondre(self.server.pannes.pop(0), {'success': False, 'errors': []})
+        try:
+            resultats = self.server.executer(corps['batch'] if 'batch' in corps else [corps])
+        except sqlite3.Error as e:
+            return self.repondre(400, {'success': False, 'errors': [{'code': 7500, 'message': str(e)}]})
+        self.repondre(200, {'result': resultats, 'success': True, 'errors': [], 'messages': []})
+
+
+class CloudflareD1TestCase(SimpleTestCase):
+    """Tests du client D1 et de l'import contre une imitation locale de l'API"""
+
+    def setUp(self):
+        self.serveur = ServeurD1Local()
+        threading.Thread(target=self.serveur.serve_forever, daemon=True).start()
+        self.attentes = []
+        self.client = CloudflareD1Client('compte', 'base', 'jeton', base_url=self.serveur.base_url,
+                                         attendre=self.attentes.append)
+        self.client.execute_query("CREATE TABLE eleve (id INTEGER PRIMARY KEY, nom TEXT, prenom TEXT)")
+
+    def tearDown(self):
+        self.client.close()
+        self.serveur.shutdown()
+        self.serveur.server_close()
+
+    def test_connexion_reutilisee(self):
+        """Les requêtes successives passent par la même connexion"""
+        for i in range(5):
+            self.client.execute_query("INSERT INTO eleve (nom) VALUES (?)", [f"N{i}"])
+        resultat = self.client.execute_query("SELECT COUNT(*) AS total FROM eleve")
+        self.assertEqual(resultat['result'][0]['results'], [{'total': 5}])
+        self.assertEqual(self.serveur.connexions, 1)
+
+    def test_batch_transactionnel(self):
+        """Un lot est exécuté en un appel et annulé entièrement en cas d'erreur"""
+        resultats = self.client.execute_batch([
+            ("INSERT INTO eleve (nom) VALUES (?)", ['A']),
+            "SELECT nom FROM eleve",
+        ])
+        self.assertEqual(resultats[1]['results'], [{'nom': 'A'}])
+        with self.assertRaises(CloudflareD1Error) as erreur:
+            self.client.execute_batch([("INSERT INTO eleve (nom) VALUES (?)", ['B']), "INSERT INTO absente VALUES (1)"])
+        self.assertEqual(erreur.exception.status_code, 400)
+        total = self.client.execute_query("SELECT COUNT(*) AS total FROM eleve")['result'][0]['results']
+        self.assertEqual(total, [{'total': 1}])
+
+    def test_nouvelles_tentatives(self):
+        """Les erreurs transitoires sont réessayées avec un délai croissant"""
+        self.serveur.pannes = [503, 429]
+        self.client.execute_query("SELECT 1")
+        self.assertEqual(len(self.attentes), 2)
+        self.assertLessEqual(self.attentes[0], self.client.DELAI_INITIAL)
+        self.assertGreater(self.attentes[1], self.client.DELAI_INITIAL / 2)
+
+        self.serveur.pannes = [503] * self.client.tentatives_max
+        with self.assertRaises(CloudflareD1Error):
+            self.client.execute_query("SELECT 1")
+
+    def test_ecritures_non_rejouees(self):
+        """Une écriture n'est réessayée que si D1 n'a pas pu l'exécuter"""
+        self.serveur.pannes = [502]
+        with self.assertRaises(CloudflareD1Error) as erreur:
+            self.client.execute_batch([("INSERT INTO eleve (nom) VALUES (?)", ['A'])])
+        self.assertEqual((erreur.exception.status_code, self.attentes), (502, []))
+
+        self.serveur.pannes = [429]
+        self.client.execute_query("INSERT INTO eleve (nom) VALUES (?)", ['B'])
+        self.assertEqual(len(self.attentes), 1)
+
+        # Connexion refusée : la requête n'a pas quitté le client
+        port_ferme = ServeurD1Local()
+        port_ferme.server_close()
+        with CloudflareD1Client('compte', 'base', 'jeton', base_url=port_ferme.base_url,
+                                attendre=self.attentes.append) as client:
+            with self.assertRaises(CloudflareD1Error):
+                client.execute_query("INSERT INTO eleve (nom) VALUES ('C')")
+        self.assertEqual(len(self.attentes), 1 + client.tentatives_max - 1)
+
+    def test_import_ignore_les_lignes_en_erreur(self):
+        """Un lot refusé est renvoyé ligne par ligne et l'import continue"""
+        self.client.execute_query("INSERT INTO eleve (id, nom) VALUES (5, 'Existant')")
+        with mock.patch.dict(os.environ), mock.patch('builtins.print'):
+            from scripts.import_to_d1 import CloudflareD1Importer
+
+            lignes = [[i, f'N{i}', 'P'] for i in range(1, 11)]
+            self.assertEqual(CloudflareD1Importer(client=self.client).inserer_lignes('eleve', ['id', 'nom', 'prenom'], lignes), 1)
+
+        total = self.client.execute_query("SELECT COUNT(*) AS total FROM eleve WHERE nom = 'Existant'")['result'][0]
+        self.assertEqual(total['results'], [{'total': 1}])
+        total = self.client.execute_query("SELECT COUNT(*) AS total FROM eleve")['result'][0]
+        self.assertEqual(total['results'], [{'total': 10}])
+
+    def test_import_multi_lignes(self):
+        """L'import regroupe les lignes en INSERT multi-lignes envoyés par lots"""
+        with mock.patch.dict(os.environ), mock.patch('builtins.print'):
+            from scripts.import_to_d1 import CloudflareD1Importer, inserts_multi_lignes
+
+            self.assertEqual(len(list(inserts_multi_lignes('eleve', ['id', 'nom', 'prenom'], [[1, 'a', 'b']] * 100))), 4)
+
+            donnees = {'ecole_app.eleve': [{'pk': i, 'fields': {'nom': f'N{i}', 'prenom': 'P'}} for i in range(1, 1001)]}
+            fichier = mock.MagicMock()
+            fichier.exists.return_value = True
+            appels = self.serveur.appels
+            with mock.patch('builtins.open', mock.mock_open(read_data=json.dumps(donnees))):
+                self.assertTrue(CloudflareD1Importer(client=self.client).import_data_from_json(fichier))
+
+        # 1000 lignes de 3 colonnes : 31 INSERT de 33 lignes au plus, envoyés en un seul lot
+        self.assertEqual(self.serveur.appels - appels, 1)
+        total = self.client.execute_query("SELECT COUNT(*) AS total, MAX(nom) AS dernier FROM eleve")['result'][0]
+        self.assertEqual(total['results'], [{'total': 1000, 'dernier': 'N999'}])
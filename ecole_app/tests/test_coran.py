@@ -0,0 +1,31 @@
+from django.test import SimpleTestCase
+from ecole_app.coran import get_corpus
+
+
+class CorpusCoranTestCase(SimpleTestCase):
+    """Tests pour l'index en mémoire du texte coranique"""
+
+    def setUp(self):
+        self.corpus = get_corpus()
+
+    def test_nombre_total_versets(self):
+        """Le corpus contient les 6236 versets répartis sur 114 sourates"""
+        total = sum(self.corpus.nombre_versets(sura) for sura in range(1, 115))
+        self.assertEqual(total, 6236)
+        self.assertEqual(self.corpus.nombre_versets(2), 286)
+
+    def test_verset(self):
+        """Recherche d'un verset par (sourate, aya)"""
+        verset = self.corpus.verset(114, 6)
+        self.assertEqual((verset.sura, verset.aya), (114, 6))
+        self.assertIsNone(self.corpus.verset(1, 8))
+        self.assertIsNone(self.corpus.verset(115, 1))
+
+    def test_versets_sourate_invalide(self):
+        """Une sourate hors bornes ne renvoie aucun verset"""
+        self.assertEqual(self.corpus.versets_sourate(0), [])
+
+    def test_versets_pages(self):
+        """Les pages 1 à 2 couvrent Al-Fatiha et Al-Baqara"""
+        self.assertEqual(self.corpus.sourates_pages(1, 2), [1, 2])
+        self.assertEqual(len(self.corpus.versets_pages(1, 2)), 7 + 286)
@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+from django.test import RequestFactory, SimpleTestCase
+from ecole_app.fichiers import etag_fichier, lire_plage, servir_fichier
+
+
+class ServirFichierTestCase(SimpleTestCase):
+    """Tests pour l'envoi de fichiers avec plages d'octets et requêtes conditionnelles"""
+
+    def setUp(self):
+        dossier = tempfile.TemporaryDirectory()
+        self.addCleanup(dossier.cleanup)
+        self.chemin = os.path.join(dossier.name, 'cours.pdf')
+        with open(self.chemin, 'wb') as fichier:
+            fichier.write(b'0123456789')
+        self.etag = etag_fichier(os.stat(self.chemin))
+        self.factory = RequestFactory()
+
+    def servir(self, en_tetes):
+        reponse = servir_fichier(self.factory.get('/', headers=en_tetes), self.chemin)
+        contenu = b''.join(reponse.streaming_content) if reponse.streaming else reponse.content
+        return reponse, contenu
+
+    def test_plage(self):
+        """Une plage bornée ou suffixe renvoie un contenu partiel"""
+        reponse, contenu = self.servir({'Range': 'bytes=2-4'})
+        self.assertEqual((reponse.status_code, contenu, reponse['Content-Range']), (206, b'234', 'bytes 2-4/10'))
+        reponse, contenu = self.servir({'Range': 'bytes=-3'})
+        self.assertEqual((reponse.status_code, contenu, reponse['Content-Length']), (206, b'789', '3'))
+
+    def test_plage_hors_fichier(self):
+        """Une plage hors du fichier, ou toute plage d'un fichier vide, est refusée"""
+        reponse, _ = self.servir({'Range': 'bytes=20-30'})
+        self.assertEqual((reponse.status_code, reponse['Content-Range']), (416, 'bytes */10'))
+        self.assertIs(lire_plage('bytes=-5', 0), False)
+        self.assertIs(lire_plage('bytes=0-', 0), False)
+
+    def test_plages_multiples(self):
+        """Les requêtes à plusieurs plages reçoivent le fichier entier"""
+        reponse, contenu = self.servir({'Range': 'bytes=0-1,4-5'})
+        self.assertEqual((reponse.status_code, contenu), (200, b'0123456789'))
+
+    def test_requetes_conditionnelles(self):
+        """If-None-Match à jour donne 304 ; If-Range périmé renvoie tout le fichier"""
+        reponse, _ = self.servir({'If-None-Match': self.etag})
+        self.assertEqual((reponse.status_code, reponse['ETag']), (304, self.etag))
+        reponse, contenu = self.servir({'Range': 'bytes=2-4', 'If-Range': '"ancien"'})
+        self.assertEqual((reponse.status_code, contenu), (200, b'0123456789'))
+        reponse, contenu = self.servir({'Range': 'bytes=2-4', 'If-Range': self.etag})
+        self.assertEqual((reponse.status_code, contenu), (206, b'234'))
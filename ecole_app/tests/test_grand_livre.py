@@ -0,0 +1,49 @@
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from ecole_app.grand_livre import GrandLivre, get_grand_livre, mois_entre
+from ecole_app.models import Composante, Eleve, Paiement
+
+
+class GrandLivreTestCase(SimpleTestCase):
+    """Tests pour la lecture du grand livre mensuel"""
+
+    def setUp(self):
+        self.livre = GrandLivre({
+            'entrees': {datetime.date(2024, 12, 1): (Decimal('300'), 3), datetime.date(2025, 1, 1): (Decimal('100'), 1)},
+            'charges': {datetime.date(2025, 1, 1): (Decimal('40'), 2)},
+            'indemnisations': {datetime.date(2024, 12, 1): (Decimal('50'), 1)},
+        })
+
+    def test_mois_entre(self):
+        """Les mois de la période franchissent le changement d'année"""
+        mois = list(mois_entre(datetime.date(2024, 11, 15), datetime.date(2025, 2, 3)))
+        self.assertEqual([(m.year, m.month) for m in mois], [(2024, 11), (2024, 12), (2025, 1), (2025, 2)])
+
+    def test_totaux_et_serie(self):
+        """Totaux, mois détaillés et solde mensuel sont lus dans les mêmes groupes"""
+        self.assertEqual(self.livre.total('entrees'), Decimal('400'))
+        self.assertEqual(self.livre.nombre('charges'), 2)
+        self.assertEqual(self.livre.total('charges', datetime.date(2024, 12, 1)), 0)
+        self.assertEqual(self.livre.par_mois('entrees')[0], {'mois': datetime.date(2025, 1, 1), 'total': Decimal('100'), 'count': 1})
+        serie = self.livre.serie(datetime.date(2024, 11, 1), datetime.date(2025, 1, 31))
+        self.assertEqual([ligne['solde'] for ligne in serie], [0, Decimal('250'), Decimal('60')])
+
+
+class InvalidationGrandLivreTestCase(TestCase):
+    """Tests pour l'invalidation du grand livre en cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.composante = Composante.objects.create(nom='Composante')
+        self.eleve = Eleve.objects.create(nom='Eleve', prenom='Test', composante=self.composante)
+
+    def test_invalidation_apres_validation(self):
+        """Le grand livre en cache reste valable jusqu'à la validation de la transaction"""
+        self.assertEqual(get_grand_livre(self.composante.id).total('entrees'), 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            Paiement.objects.create(eleve=self.eleve, montant=Decimal('80'), composante=self.composante, date=datetime.date(2024, 10, 1))
+            self.assertEqual(get_grand_livre(self.composante.id).total('entrees'), 0)
+        self.assertEqual(get_grand_livre(self.composante.id).total('entrees'), Decimal('80'))
@@ -0,0 +1,61 @@
+import datetime
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from ecole_app.impayes import calculer_releve, echeances, tranche
+from ecole_app.models import AnneeScolaire, Composante, Eleve, Paiement, PaiementHistorique
+
+
+class EcheancesTestCase(SimpleTestCase):
+    """Tests pour le calendrier des échéances du relevé des impayés"""
+
+    def test_echeances_echues(self):
+        """Une échéance est exigible le 1er de chaque mois de l'année scolaire"""
+        annee = AnneeScolaire(date_debut=datetime.date(2024, 9, 1), date_fin=datetime.date(2025, 6, 30))
+        self.assertEqual(echeances(annee, datetime.date(2024, 8, 31)), (0, 10))
+        self.assertEqual(echeances(annee, datetime.date(2024, 12, 1)), (4, 10))
+        self.assertEqual(echeances(annee, datetime.date(2025, 9, 1)), (10, 10))
+        self.assertEqual(echeances(None, datetime.date(2024, 12, 1)), (1, 1))
+
+    def test_tranches(self):
+        self.assertEqual([tranche(nombre) for nombre in (1, 2, 3, 7)], [1, 2, 3, 3])
+
+
+class ReleveImpayesTestCase(TestCase):
+    """Tests pour le relevé des impayés calculé en base"""
+
+    def setUp(self):
+        self.composante = Composante.objects.create(nom='Composante test')
+        # Trois échéances de 66,67 € environ (200 € ne se divise pas par 3)
+        self.annee = AnneeScolaire(date_debut=datetime.date(2024, 9, 1), date_fin=datetime.date(2024, 11, 30))
+        self.eleve = Eleve.objects.create(nom='Verse', prenom='Eleve', composante=self.composante, montant_total=200)
+        # Un seul Paiement par élève : montant cumulé, date du dernier versement
+        paiement = Paiement.objects.create(eleve=self.eleve, composante=self.composante, montant=140,
+                                           date=datetime.date(2024, 11, 5))
+        for jour, montant in ((datetime.date(2024, 9, 2), 70), (datetime.date(2024, 11, 5), 70)):
+            PaiementHistorique.objects.create(paiement=paiement, montant=montant, date=jour, methode='especes')
+        saisi = Eleve.objects.create(nom='Saisi', prenom='Eleve', composante=self.composante, montant_total=200)
+        Paiement.objects.create(eleve=saisi, composante=self.composante, montant=50, date=datetime.date(2024, 10, 1))
+
+    def ligne(self, date, nom):
+        releve = calculer_releve(self.composante.id, self.annee, date)
+        return next((ligne for ligne in releve['eleves'] if ligne['nom'] == nom), None)
+
+    def test_versements_a_leur_date(self):
+        """Seuls les versements antérieurs à la date du relevé sont comptés"""
+        ligne = self.ligne(datetime.date(2024, 10, 15), 'Verse')
+        self.assertEqual((ligne['du'], ligne['paye'], ligne['retard']),
+                         (Decimal('133.33'), Decimal('70'), Decimal('63.33')))
+        self.assertEqual(ligne['echeances_retard'], 1)
+        self.assertEqual(ligne['dernier_paiement'], datetime.date(2024, 9, 2))
+        ligne = self.ligne(datetime.date(2024, 11, 15), 'Verse')
+        self.assertEqual((ligne['du'], ligne['paye'], ligne['retard']),
+                         (Decimal('200.00'), Decimal('140'), Decimal('60')))
+
+    def test_paiement_sans_historique(self):
+        """Un paiement saisi directement compte pour son montant à sa date"""
+        self.assertEqual(self.ligne(datetime.date(2024, 9, 15), 'Saisi')['du'], Decimal('66.67'))
+        self.assertEqual(self.ligne(datetime.date(2024, 9, 15), 'Saisi')['paye'], 0)
+        ligne = self.ligne(datetime.date(2024, 10, 15), 'Saisi')
+        self.assertEqual((ligne['paye'], ligne['retard'], ligne['echeances_retard']),
+                         (Decimal('50'), Decimal('83.33'), 2))
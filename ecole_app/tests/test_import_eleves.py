@@ -0,0 +1,59 @@
+import datetime
+import io
+
+import openpyxl
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+
+from ecole_app.import_eleves import attribuer_identifiants, importer_eleves, lire_fichier
+from ecole_app.models import Classe, Composante, Eleve
+
+
+def fichier_excel(lignes):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(['Nom', 'Prénom', 'Classe', 'Date de naissance'])
+    for ligne in lignes:
+        ws.append(list(ligne))
+    contenu = io.BytesIO()
+    wb.save(contenu)
+    return SimpleUploadedFile('eleves.xlsx', contenu.getvalue())
+
+
+class ImportElevesTestCase(TestCase):
+    """Tests pour l'import groupé d'élèves"""
+
+    def setUp(self):
+        self.composante = Composante.objects.create(nom='Composante test')
+        self.classe = Classe.objects.create(nom='Hifz 1', composante=self.composante)
+        Eleve.objects.create(nom='Existe', prenom='Deja', composante=self.composante,
+                             date_naissance=datetime.date(2010, 1, 1))
+        self.lignes = lire_fichier(fichier_excel([
+            ('Dupont', 'Jean', 'hifz 1', datetime.datetime(2012, 3, 4)),
+            ('existe', 'DEJA', None, '01/01/2010'),
+            ('', 'Sans nom', None, None),
+        ]))
+
+    def test_simulation(self):
+        """La simulation produit le rapport sans rien écrire en base"""
+        rapport = importer_eleves(self.lignes, self.composante.id, simulation=True)
+        self.assertEqual((rapport['crees'], rapport['ignores']), (1, 2))
+        self.assertEqual(Eleve.objects.count(), 1)
+
+    def test_import(self):
+        """Les élèves valides sont créés avec leur compte et leur classe"""
+        rapport = importer_eleves(self.lignes, self.composante.id)
+        self.assertEqual(rapport['crees'], 1)
+        eleve = Eleve.objects.get(nom='Dupont')
+        self.assertEqual(eleve.classe, self.classe)
+        self.assertEqual(list(eleve.classes.all()), [self.classe])
+        self.assertTrue(eleve.user.check_password(eleve.mot_de_passe_en_clair))
+
+    def test_identifiants_uniques(self):
+        """Les identifiants déjà pris reçoivent un suffixe numérique"""
+        User.objects.create_user('dupontjean.eleve', password='x')
+        self.assertEqual(
+            attribuer_identifiants(['dupontjean.eleve', 'dupontjean.eleve', 'aliben.eleve']),
+            ['dupontjean.eleve1', 'dupontjean.eleve2', 'aliben.eleve'],
+        )
@@ -0,0 +1,29 @@
+from django.test import SimpleTestCase
+from ecole_app.pages_memorisees import (MASQUES_HIZB, MASQUES_JUZ, avancement_juz, carte_juz, carte_pages,
+                                        depuis_octets, juz_complets, masque_plage, pourcentage, vers_octets)
+
+
+class PagesMemoriseesTestCase(SimpleTestCase):
+    """Tests pour le masque de bits des pages mémorisées"""
+
+    def test_sections(self):
+        """Les juz et les hizb couvrent les 604 pages sans chevauchement"""
+        self.assertEqual((len(MASQUES_JUZ), len(MASQUES_HIZB)), (30, 60))
+        self.assertEqual(sum(masque.bit_count() for masque in MASQUES_JUZ), 604)
+        self.assertEqual(sum(masque.bit_count() for masque in MASQUES_HIZB), 604)
+
+    def test_masque(self):
+        """Plages bornées au Mushaf, couverture et juz complets"""
+        masque = masque_plage(1, 21) | masque_plage(600, 700)
+        self.assertEqual(masque.bit_count(), 26)
+        self.assertEqual(depuis_octets(vers_octets(masque)), masque)
+        self.assertEqual(juz_complets(masque), [1])
+        self.assertEqual(pourcentage(masque), round(26 / 604 * 100, 2))
+        self.assertEqual(avancement_juz(masque)[1], 0)
+
+    def test_carte_classe(self):
+        """Nombre d'élèves par page et moyenne par juz"""
+        masques = [masque_plage(1, 21), masque_plage(1, 41)]
+        carte = carte_pages(masques)
+        self.assertEqual((int(carte[0]), int(carte[30]), int(carte[603])), (2, 1, 0))
+        self.assertEqual(carte_juz(masques)[:3], [100.0, 50.0, 0.0])
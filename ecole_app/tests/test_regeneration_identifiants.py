@@ -0,0 +1,32 @@
+import io
+
+from django.test import TestCase
+
+from ecole_app.models import Classe, Composante, Eleve
+from ecole_app.regeneration_identifiants import ecrire_fiche_csv, regenerer_mots_de_passe
+
+
+class RegenerationIdentifiantsTestCase(TestCase):
+    """Tests pour la régénération groupée des mots de passe"""
+
+    def setUp(self):
+        composante = Composante.objects.create(nom='Composante test')
+        classe = Classe.objects.create(nom='Hifz 1', composante=composante)
+        for nom in ('Alpha', 'Beta'):
+            Eleve.objects.create(nom=nom, prenom='Test', composante=composante).classes.add(classe)
+        Eleve.objects.filter(nom='Beta').update(user=None)
+
+    def test_regeneration_et_fiche(self):
+        """Seuls les comptes existants sont régénérés ; la fiche reprend les mêmes mots de passe"""
+        eleves = Eleve.objects.order_by('nom').select_related('user').prefetch_related('classes')
+        lignes = regenerer_mots_de_passe(eleves, generer=lambda eleve: f"{eleve.nom.lower()}.nouveau")
+        self.assertEqual([(ligne['nom'], ligne['classes'], ligne['mot_de_passe']) for ligne in lignes],
+                         [('Alpha', 'Hifz 1', 'alpha.nouveau')])
+
+        eleve = Eleve.objects.select_related('user').get(nom='Alpha')
+        self.assertEqual(eleve.mot_de_passe_en_clair, 'alpha.nouveau')
+        self.assertTrue(eleve.user.check_password('alpha.nouveau'))
+
+        fiche = io.StringIO()
+        ecrire_fiche_csv(lignes, fiche)
+        self.assertEqual(fiche.getvalue().splitlines()[1], f"Alpha,Test,Hifz 1,{eleve.user.username},alpha.nouveau")
@@ -0,0 +1,48 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.test import TestCase
+from ecole_app.models import Composante, Eleve
+from ecole_app.models_pedagogie import Choix, Module, Question, Quiz, Reponse, TentativeQuiz
+from ecole_app.session_quiz import charger_etat, enregistrer_reponse, terminer_tentative
+
+
+class SessionQuizTestCase(TestCase):
+    """Tests pour l'enregistrement des réponses et le score d'une tentative"""
+
+    def setUp(self):
+        composante = Composante.objects.create(nom='Composante')
+        eleve = Eleve.objects.create(nom='Eleve', prenom='Test', composante=composante)
+        quiz = Quiz.objects.create(module=Module.objects.create(titre='Module'), titre='Quiz')
+        self.questions = []
+        for ordre, points in enumerate([1, 2, 3]):
+            question = Question.objects.create(quiz=quiz, texte=f'Q{ordre}', points=points, ordre=ordre)
+            bon = Choix.objects.create(question=question, texte='Oui', est_correct=True)
+            mauvais = Choix.objects.create(question=question, texte='Non')
+            self.questions.append((question.pk, bon.pk, mauvais.pk))
+        self.tentative = TentativeQuiz.objects.create(quiz=quiz, eleve=eleve)
+
+    def test_reponse_deja_enregistree(self):
+        """Une question déjà répondue en base n'est pas enregistrée une seconde fois"""
+        question_id, bon, mauvais = self.questions[0]
+        enregistrer_reponse(charger_etat(SimpleNamespace(session={}), self.tentative), self.tentative,
+                            question_id, choix_ids=[bon])
+        # Seconde session dont l'état a été chargé avant la première réponse
+        etat = charger_etat(SimpleNamespace(session={}), self.tentative)
+        etat.repondues.discard(question_id)
+        reponse = enregistrer_reponse(etat, self.tentative, question_id, choix_ids=[mauvais])
+        self.assertTrue(reponse.est_correcte)
+        self.assertEqual(Reponse.objects.filter(tentative=self.tentative).count(), 1)
+        self.assertIn(question_id, etat.repondues)
+
+    def test_score_calcule_en_base(self):
+        """Le score final est lu dans les réponses enregistrées, pas dans la session"""
+        request = SimpleNamespace(session={})
+        etat = charger_etat(request, self.tentative)
+        (q1, bon1, _), (q2, _, mauvais2), (q3, bon3, _) = self.questions
+        enregistrer_reponse(etat, self.tentative, q1, choix_ids=[bon1])
+        enregistrer_reponse(etat, self.tentative, q2, choix_ids=[mauvais2])
+        Reponse.objects.create(tentative=self.tentative, question_id=q3, est_correcte=True)
+        terminer_tentative(request, self.tentative)
+        self.tentative.refresh_from_db()
+        self.assertEqual(self.tentative.score, Decimal('66.67'))
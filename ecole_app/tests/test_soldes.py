@@ -0,0 +1,65 @@
+import datetime
+from decimal import Decimal
+
+from django.test import TestCase
+
+from ecole_app.models import Eleve, Paiement, PaiementHistorique
+from ecole_app.soldes import annoter_soldes, recalculer_paiement, recalculer_paiements, reconcilier_soldes
+
+
+class SoldesTestCase(TestCase):
+    """Tests pour le total payé enregistré sur l'élève"""
+
+    def setUp(self):
+        self.eleve = Eleve.objects.create(nom='Solde', prenom='Eleve', montant_total=200)
+        self.autre = Eleve.objects.create(nom='Autre', prenom='Eleve')
+
+    def test_paiements_actualisent_le_solde(self):
+        """Création, changement d'élève et suppression d'un paiement mettent à jour les soldes"""
+        paiement = Paiement.objects.create(eleve=self.eleve, montant=80)
+        self.eleve.refresh_from_db()
+        self.assertEqual(self.eleve.montant_paye, Decimal('80'))
+        self.assertEqual(self.eleve.montant_restant, Decimal('120'))
+
+        paiement.eleve = self.autre
+        paiement.save()
+        self.assertEqual(list(Eleve.objects.order_by('pk').values_list('montant_paye', flat=True)), [0, 80])
+
+        paiement.delete()
+        self.autre.refresh_from_db()
+        self.assertEqual(self.autre.montant_paye, 0)
+
+    def test_sauvegarde_sans_ecraser_le_solde(self):
+        """Sauvegarder un élève chargé avant un paiement ne remet pas l'ancien solde"""
+        perime = Eleve.objects.get(pk=self.eleve.pk)
+        Paiement.objects.create(eleve=self.eleve, montant=50)
+        perime.mot_de_passe_en_clair = 'nouveau'
+        perime.save()
+        self.eleve.refresh_from_db()
+        self.assertEqual((self.eleve.montant_paye, self.eleve.mot_de_passe_en_clair), (Decimal('50'), 'nouveau'))
+
+    def test_reconciliation(self):
+        """Les soldes modifiés hors de l'ORM sont détectés puis corrigés"""
+        Paiement.objects.create(eleve=self.eleve, montant=10)
+        Eleve.objects.filter(pk=self.eleve.pk).update(montant_paye=999)
+        self.assertEqual(reconcilier_soldes(corriger=False), [(self.eleve.pk, Decimal('999'), Decimal('10'))])
+        reconcilier_soldes()
+        self.assertEqual(reconcilier_soldes(), [])
+        self.assertEqual(annoter_soldes(Eleve.objects.filter(pk=self.eleve.pk)).get().reste_a_payer, Decimal('190'))
+
+    def test_recalcul_depuis_historiques(self):
+        """Les montants sont relus dans les historiques ; un paiement sans historique est conservé"""
+        paiement = Paiement.objects.create(eleve=self.eleve, montant=0)
+        saisi = Paiement.objects.create(eleve=self.autre, montant=15)
+        for montant in (20, 30):
+            PaiementHistorique.objects.create(paiement=paiement, montant=montant, date=datetime.date.today(),
+                                              methode='especes')
+        self.assertEqual(recalculer_paiement(paiement.pk), Decimal('50'))
+        self.eleve.refresh_from_db()
+        self.assertEqual(self.eleve.montant_paye, Decimal('50'))
+
+        PaiementHistorique.objects.filter(paiement=paiement).update(montant=5)
+        self.assertEqual(recalculer_paiements(), 1)
+        saisi.refresh_from_db()
+        self.assertEqual(saisi.montant, Decimal('15'))
+        self.assertEqual(list(Eleve.objects.order_by('pk').values_list('montant_paye', flat=True)), [10, 15])
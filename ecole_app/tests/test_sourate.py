@@ -0,0 +1,25 @@
+from django.test import SimpleTestCase
+from ecole_app.sourate import (SOURATES, get_sourate_for_page, get_sourate_for_range,
+                               get_sourates_for_plages, get_sourates_for_range)
+
+
+class IndexSouratesTestCase(SimpleTestCase):
+    """Tests pour l'index des plages de pages des sourates"""
+
+    def test_page_vers_sourate(self):
+        """Chaque page renvoie la première sourate qui la contient"""
+        for page in range(1, 605):
+            attendu = next(i for i, s in enumerate(SOURATES) if s.page_debut <= page <= s.page_fin)
+            self.assertEqual(get_sourate_for_page(page), attendu)
+        self.assertIsNone(get_sourate_for_page(0))
+        self.assertIsNone(get_sourate_for_page(605))
+        self.assertIsNone(get_sourate_for_page('abc'))
+
+    def test_plages(self):
+        """Résolution d'une plage, des sourates recoupées et d'un lot de plages"""
+        self.assertEqual(get_sourate_for_range(2, 10), (1, True))
+        self.assertEqual(get_sourate_for_range(48, 51), (1, False))
+        self.assertEqual(get_sourate_for_range(51, 48), (1, False))
+        self.assertEqual(get_sourate_for_range(10, 2), (1, True))
+        self.assertEqual(get_sourates_for_range(604, 604), [111, 112, 113])
+        self.assertEqual(get_sourates_for_plages([(2, 10), (604, 604), (700, 700)]), [1, 111, None])
@@ -0,0 +1,24 @@
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from ecole_app.statistiques_notes import SerieNotes
+
+
+class SerieNotesTestCase(SimpleTestCase):
+    """Tests pour les statistiques calculées en une passe"""
+
+    def test_resume(self):
+        """Moyenne, médiane et quartiles par interpolation entre les rangs"""
+        resume = SerieNotes([4, 1, 3, 2]).resume()
+        self.assertEqual(resume['count'], 4)
+        self.assertEqual(resume['moyenne'], Decimal('2.5'))
+        self.assertEqual(resume['mediane'], Decimal('2.5'))
+        self.assertEqual(resume['premier_quartile'], Decimal('1.75'))
+        self.assertEqual((resume['min'], resume['max']), (1, 4))
+        self.assertIsNone(SerieNotes().resume()['mediane'])
+
+    def test_distribution(self):
+        """Chaque note est comptée dans une seule tranche"""
+        serie = SerieNotes([0, 4.5, 5, 13.75, 14, 20])
+        self.assertEqual(serie.distribution(),
+                         [('0-5', 2), ('5-10', 1), ('10-14', 1), ('14-17', 1), ('17+', 1)])
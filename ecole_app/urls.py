@@ -3,7 +3,7 @@ from . import main_views, views_anneescolaire, views_auth, views_presence, views
 from . import views_carnet_pedagogique, views_api, views_parametres, views_transfert_eleves, views_notes_export
 from .views import api, views_carnet_edit
 from . import views_site
-from .views.api import get_sourate_pages, find_sourate_by_page
+from .views.api import get_sourate_pages, find_sourate_by_page, get_versets
 from .views_api import increment_repetition, decrement_repetition
 from . import urls_cours_quiz
 
@@ -38,6 +38,7 @@ urlpatterns = [
     path('eleves/home/', main_views.eleve_home, name='eleve_home'),
     path('eleves/', main_views.liste_eleves, name='liste_eleves'),
     path('eleves/archives/', main_views.archives_eleves, name='archives_eleves'),
+    path('eleves/recherche/', main_views.recherche_eleves, name='recherche_eleves'),
     path('eleves/attente/', main_views.liste_attente, name='liste_attente'),
     path('eleves/attente/ajouter-definitivement/', main_views.ajouter_definitivement, name='ajouter_definitivement'),
     path('eleves/attente/<int:eleve_id>/modifier/', main_views.modifier_eleve_attente, name='modifier_eleve_attente'),
@@ -52,6 +53,7 @@ urlpatterns = [
     path('eleves/<int:eleve_id>/regenerer-password/', main_views.regenerer_password_eleve, name='regenerer_password_eleve'),
     path('eleves/ajout-rapide/', main_views.ajout_rapide_eleve, name='ajout_rapide_eleve'),
     path('eleves/envoyer-tous-identifiants/', main_views.envoyer_tous_identifiants, name='envoyer_tous_identifiants'),
+    path('eleves/envoyer-tous-identifiants/<int:envoi_id>/progression/', main_views.progression_envoi_identifiants, name='progression_envoi_identifiants'),
     
     # Professeurs
     path('professeurs/', main_views.liste_professeurs, name='liste_professeurs'),
@@ -137,6 +139,8 @@ urlpatterns = [
     
     # Comptabilité - Paiements manquants
     path('comptabilite/paiements-manquants/', views_comptabilite.paiements_manquants, name='paiements_manquants'),
+    path('comptabilite/impayes/', views_comptabilite.releve_impayes, name='releve_impayes'),
+    path('comptabilite/impayes/export/', views_comptabilite.export_releve_impayes, name='export_releve_impayes'),
     
     # Comptabilité - Bilan financier
     path('comptabilite/bilan-financier/', views_bilan_financier.bilan_financier, name='bilan_financier'),
@@ -175,6 +179,7 @@ urlpatterns = [
     # API
     path('api/sourate-pages/', get_sourate_pages, name='api_sourate_pages'),
     path('api/sourate-pages/find-sourate/', find_sourate_by_page, name='api_find_sourate'),
+    path('api/versets/', get_versets, name='api_versets'),
     path('api/carnet/<int:eleve_id>/data/', views_api.api_carnet_data, name='api_carnet_data'),
     path('api/eleves-par-classe/<int:classe_id>/', views_api.eleves_par_classe, name='api_eleves_par_classe'),
     path('api/repetition/<int:repetition_id>/increment/', increment_repetition, name='increment_repetition'),
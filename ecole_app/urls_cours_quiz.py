@@ -27,4 +27,5 @@ urlpatterns = [
     re_path(r'^quiz/repondre/(?P<tentative_id>[0-9]+)(?:/(?P<question_id>[0-9]+))?/$', views_cours_quiz.repondre_quiz, name='repondre_quiz'),
     path('quiz/resultats/<int:tentative_id>/', views_cours_quiz.resultats_quiz, name='resultats_quiz'),
     path('quiz/resultats/<int:tentative_id>/pdf/', views_pdf.telecharger_resultats_quiz_pdf, name='telecharger_resultats_quiz_pdf'),
+    path('quiz/<int:quiz_id>/classe/<int:classe_id>/resultats-pdf/', views_pdf.telecharger_resultats_classe_pdf, name='telecharger_resultats_classe_pdf'),
 ]
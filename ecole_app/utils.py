@@ -1,16 +1,13 @@
-from io import BytesIO
-from django.http import HttpResponse
-from django.template.loader import get_template
-from xhtml2pdf import pisa
+from django.http import FileResponse
+
+from .cache_pdf import generer_pdf
 
 def render_to_pdf(template_src, context_dict={}):
     """
     Génère un PDF à partir d'un template HTML et d'un contexte
+    (servi depuis le cache disque si le même contenu a déjà été rendu)
     """
-    template = get_template(template_src)
-    html = template.render(context_dict)
-    result = BytesIO()
-    pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
-    if not pdf.err:
-        return HttpResponse(result.getvalue(), content_type='application/pdf')
+    chemin = generer_pdf(template_src, context_dict)
+    if chemin is not None:
+        return FileResponse(open(chemin, 'rb'), content_type='application/pdf')
     return None
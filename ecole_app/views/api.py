@@ -1,6 +1,8 @@
 from django.http import JsonResponse
 from django.views.decorators.http import require_GET
-from ..sourate import get_pages_for_sourate, SOURATES
+from ..sourate import (get_pages_for_sourate, get_nom_arabe, get_sourate_for_page,
+                       get_sourate_for_range, get_sourates_for_plages, SOURATES)
+from ..coran import get_corpus
 
 @require_GET
 def get_sourate_pages(request):
@@ -39,9 +41,11 @@ def get_sourate_pages(request):
             'pages': pages,
             'sourate_info': {
                 'nom': SOURATES[sourate_index].nom,
+                'nom_ar': get_nom_arabe(sourate_index),
                 'page_debut': SOURATES[sourate_index].page_debut,
                 'page_fin': SOURATES[sourate_index].page_fin,
-                'page_count': len(pages)
+                'page_count': len(pages),
+                'verset_count': get_corpus().nombre_versets(sourate_index + 1)
             }
         })
     except ValueError:
@@ -55,57 +59,88 @@ def get_sourate_pages(request):
 
 @require_GET
 def find_sourate_by_page(request):
-    """API pour trouver la sourate correspondant à une page ou plage de pages"""
+    """API pour trouver la sourate correspondant à une page, une plage de pages ou plusieurs plages"""
     page = request.GET.get('page')
     debut_page = request.GET.get('debut_page')
     fin_page = request.GET.get('fin_page')
+    plages = request.GET.get('plages')
+    
+    # Plusieurs plages en un seul appel, au format "1-5,10-12"
+    if plages:
+        try:
+            plages = [tuple(int(p) for p in plage.split('-', 1)) for plage in plages.split(',')]
+            plages = [plage if len(plage) == 2 else (plage[0], plage[0]) for plage in plages]
+        except ValueError:
+            return JsonResponse({'error': 'Format attendu pour plages: debut-fin,debut-fin'}, status=400)
+        resultats = []
+        for (debut, fin), index in zip(plages, get_sourates_for_plages(plages)):
+            resultat = {'debut_page': debut, 'fin_page': fin, 'sourate_index': index}
+            if index is not None:
+                resultat['sourate_nom'] = SOURATES[index].nom
+            resultats.append(resultat)
+        return JsonResponse({'resultats': resultats})
     
     # Si on a une seule page
     if page:
         try:
-            page_num = int(page)
-            for i, sourate in enumerate(SOURATES):
-                if sourate.page_debut <= page_num <= sourate.page_fin:
-                    return JsonResponse({
-                        'sourate_index': i,
-                        'sourate_nom': sourate.nom,
-                        'page_debut': sourate.page_debut,
-                        'page_fin': sourate.page_fin
-                    })
-            return JsonResponse({'error': 'Aucune sourate trouvée pour cette page'}, status=404)
+            index = get_sourate_for_page(int(page))
         except ValueError:
             return JsonResponse({'error': 'Le numéro de page doit être un entier'}, status=400)
+        if index is None:
+            return JsonResponse({'error': 'Aucune sourate trouvée pour cette page'}, status=404)
+        return JsonResponse(_sourate_json(index))
     
     # Si on a une plage de pages
     elif debut_page and fin_page:
         try:
-            debut = int(debut_page)
-            fin = int(fin_page)
-            
-            # On cherche la sourate qui contient à la fois la page de début et la page de fin
-            for i, sourate in enumerate(SOURATES):
-                if sourate.page_debut <= debut <= sourate.page_fin and sourate.page_debut <= fin <= sourate.page_fin:
-                    return JsonResponse({
-                        'sourate_index': i,
-                        'sourate_nom': sourate.nom,
-                        'page_debut': sourate.page_debut,
-                        'page_fin': sourate.page_fin
-                    })
-            
-            # Si on n'a pas trouvé, on retourne la sourate de la page de début
-            for i, sourate in enumerate(SOURATES):
-                if sourate.page_debut <= debut <= sourate.page_fin:
-                    return JsonResponse({
-                        'sourate_index': i,
-                        'sourate_nom': sourate.nom,
-                        'page_debut': sourate.page_debut,
-                        'page_fin': sourate.page_fin,
-                        'warning': 'La plage de pages s\'étend sur plusieurs sourates'
-                    })
-            
-            return JsonResponse({'error': 'Aucune sourate trouvée pour cette plage de pages'}, status=404)
+            index, complete = get_sourate_for_range(int(debut_page), int(fin_page))
         except ValueError:
             return JsonResponse({'error': 'Les numéros de page doivent être des entiers'}, status=400)
+        if index is None:
+            return JsonResponse({'error': 'Aucune sourate trouvée pour cette plage de pages'}, status=404)
+        data = _sourate_json(index)
+        if not complete:
+            # La sourate retournée est celle de la page de début
+            data['warning'] = 'La plage de pages s\'étend sur plusieurs sourates'
+        return JsonResponse(data)
     
     else:
-        return JsonResponse({'error': 'Paramètres requis: soit page, soit debut_page ET fin_page'}, status=400)
+        return JsonResponse({'error': 'Paramètres requis: soit page, soit debut_page ET fin_page, soit plages'}, status=400)
+
+def _sourate_json(index):
+    sourate = SOURATES[index]
+    return {
+        'sourate_index': index,
+        'sourate_nom': sourate.nom,
+        'page_debut': sourate.page_debut,
+        'page_fin': sourate.page_fin
+    }
+
+@require_GET
+def get_versets(request):
+    """API pour récupérer le texte des versets d'une sourate, d'un verset ou d'une plage de pages"""
+    corpus = get_corpus()
+    sourate = request.GET.get('sourate')
+    aya = request.GET.get('aya')
+    debut_page = request.GET.get('debut_page')
+    fin_page = request.GET.get('fin_page')
+
+    try:
+        if sourate:
+            sourate = int(sourate)
+            if aya:
+                verset = corpus.verset(sourate, int(aya))
+                if verset is None:
+                    return JsonResponse({'error': 'Verset introuvable'}, status=404)
+                return JsonResponse({'versets': [verset._asdict()]})
+            versets = corpus.versets_sourate(sourate)
+            if not versets:
+                return JsonResponse({'error': f'Sourate invalide: {sourate}'}, status=404)
+        elif debut_page and fin_page:
+            versets = corpus.versets_pages(int(debut_page), int(fin_page))
+        else:
+            return JsonResponse({'error': 'Paramètres requis: soit sourate (et aya), soit debut_page ET fin_page'}, status=400)
+    except ValueError:
+        return JsonResponse({'error': 'Les paramètres doivent être des entiers'}, status=400)
+
+    return JsonResponse({'versets': [v._asdict() for v in versets]})
@@ -7,6 +7,7 @@ from django.shortcuts import get_object_or_404
 from .models import (Eleve, CarnetPedagogique, EcouteAvantMemo, 
                     Memorisation, Revision, Repetition, Classe)
 from .views_carnet import check_eleve_access
+from .carnet import lire_carnet, periode_demandee
 
 @login_required
 def eleves_par_classe(request, classe_id):
@@ -42,107 +43,9 @@ def api_carnet_data(request, eleve_id=None):
     if not has_access:
         return JsonResponse({'error': "Vous n'avez pas accès au carnet de cet élève."}, status=403)
     
-    # Récupérer le carnet pédagogique
-    carnet, created = CarnetPedagogique.objects.get_or_create(eleve=eleve)
-    
-    # Récupérer le mois et l'année depuis les paramètres GET
-    date_actuelle = timezone.now()
-    try:
-        mois = int(request.GET.get('mois', date_actuelle.month))
-        annee = int(request.GET.get('annee', date_actuelle.year))
-        
-        # Vérifier que les valeurs sont dans des plages valides
-        if mois < 1 or mois > 12:
-            mois = date_actuelle.month
-        if annee < 2000 or annee > 2100:  # Plage raisonnable pour les années
-            annee = date_actuelle.year
-    except (ValueError, TypeError):
-        # En cas d'erreur de conversion, utiliser les valeurs par défaut
-        mois = date_actuelle.month
-        annee = date_actuelle.year
-    
-    # Filtrer les données par mois et année
-    ecoutes = EcouteAvantMemo.objects.filter(
-        carnet=carnet,
-        date__month=mois,
-        date__year=annee
-    ).order_by('-date')
-    
-    memorisations = Memorisation.objects.filter(
-        carnet=carnet,
-        date__month=mois,
-        date__year=annee
-    ).order_by('-date')
-    
-    revisions = Revision.objects.filter(
-        carnet=carnet,
-        date__month=mois,
-        date__year=annee
-    ).order_by('-date')
-    
-    repetitions = Repetition.objects.filter(
-        carnet=carnet,
-        derniere_date__month=mois,
-        derniere_date__year=annee
-    ).order_by('-derniere_date')
-    
-    # Calculer les statistiques
-    total_pages_memo = memorisations.aggregate(Sum('fin_page'))['fin_page__sum'] or 0
-    
-    # Préparer les données pour le JSON
-    ecoutes_data = [{
-        'id': e.id,
-        'date': e.date.strftime('%d/%m/%Y'),
-        'duree': e.duree,
-        'sourate': e.sourate,
-        'debut_verset': e.debut_verset,
-        'fin_verset': e.fin_verset,
-        'enseignant': e.enseignant.nom if e.enseignant else 'Non spécifié',
-        'commentaire': e.commentaire
-    } for e in ecoutes]
-    
-    memorisations_data = [{
-        'id': m.id,
-        'date': m.date.strftime('%d/%m/%Y'),
-        'sourate': m.sourate,
-        'debut_page': m.debut_page,
-        'fin_page': m.fin_page,
-        'enseignant': m.enseignant.nom if m.enseignant else 'Non spécifié',
-        'commentaire': m.commentaire
-    } for m in memorisations]
-    
-    revisions_data = [{
-        'id': r.id,
-        'date': r.date.strftime('%d/%m/%Y'),
-        'semaine': r.semaine,
-        'sourate': r.sourate,
-        'debut_page': r.debut_page,
-        'fin_page': r.fin_page,
-        'enseignant': r.enseignant.nom if r.enseignant else 'Non spécifié',
-        'commentaire': r.commentaire
-    } for r in revisions]
-    
-    repetitions_data = [{
-        'id': r.id,
-        'derniere_date': r.derniere_date.strftime('%d/%m/%Y'),
-        'sourate': r.sourate,
-        'page': r.page,
-        'nombre_repetitions': r.nombre_repetitions
-    } for r in repetitions]
-    
-    # Renvoyer les données au format JSON
-    return JsonResponse({
-        'stats': {
-            'memorisations_count': memorisations.count(),
-            'total_pages_memo': total_pages_memo,
-            'revisions_count': revisions.count(),
-            'repetitions_count': repetitions.count()
-        },
-        'ecoutes': ecoutes_data,
-        'memorisations': memorisations_data,
-        'revisions': revisions_data,
-        'repetitions': repetitions_data
-    })
+    # Séances du mois demandé, lues comme pour la page du carnet
+    mois, annee = periode_demandee(request)
+    return JsonResponse(lire_carnet(eleve, mois, annee).donnees_json())
 
 @login_required
 @require_POST
@@ -6,6 +6,7 @@ from django.utils import timezone
 from django.db import transaction
 from django.urls import reverse
 from .models import Eleve, PresenceEleve, Classe, Professeur
+from .presences import charger_presences, enregistrer_presences
 import datetime
 import json
 
@@ -100,18 +101,11 @@ def appel_rapide_professeur(request):
             selected_classe = classes.get(id=classe_id)
             # Récupérer les élèves de la classe avec leurs présences
             eleves = selected_classe.eleves.all().order_by('nom', 'prenom')
+            # Charger toutes les présences de la classe pour la date en une seule requête
+            presences = charger_presences(selected_classe, selected_date)
             
             for eleve in eleves:
-                try:
-                    presence = PresenceEleve.objects.get(
-                        eleve=eleve,
-                        date=selected_date,
-                        classe=selected_classe
-                    )
-                except PresenceEleve.DoesNotExist:
-                    presence = None
-                
-                eleves_with_presence.append((eleve, presence))
+                eleves_with_presence.append((eleve, presences.get(eleve.id)))
                 
         except Classe.DoesNotExist:
             messages.error(request, "Classe non trouvée.")
@@ -166,45 +160,24 @@ def handle_save_all_presences(request, selected_classe, selected_date):
                 'message': 'La classe sélectionnée n\'a pas de composante associée.'
             }, status=400)
         
-        # Récupérer tous les élèves de la classe
-        eleves = selected_classe.eleves.all()
-        saved_count = 0
+        # Récupérer les identifiants des élèves de la classe
+        eleve_ids = set(selected_classe.eleves.values_list('id', flat=True))
         
         # Récupérer les données de présence du formulaire
-        presence_data = {}
+        saisies = {}
         for key, value in request.POST.items():
             if key.startswith('presence_'):
                 eleve_id = key.split('_')[1]
-                presence_data[eleve_id] = {
-                    'status': value,
-                    'comment': request.POST.get(f'comment_{eleve_id}', '')
-                }
-        
-        # Traiter chaque élève
-        for eleve in eleves:
-            eleve_id = str(eleve.id)
-            if eleve_id in presence_data:
-                data = presence_data[eleve_id]
-                status = data['status']
-                commentaire = data['comment']
-                
+                if not eleve_id.isdigit() or int(eleve_id) not in eleve_ids:
+                    continue
                 # Déterminer le statut de présence
-                present = status == 'present'
-                justifie = status == 'absent-justified'
-                
-                # Créer ou mettre à jour l'enregistrement de présence
-                PresenceEleve.objects.update_or_create(
-                    eleve=eleve,
-                    date=selected_date,
-                    classe=selected_classe,
-                    defaults={
-                        'present': present,
-                        'justifie': justifie,
-                        'commentaire': commentaire,
-                        'composante': composante
-                    }
-                )
-                saved_count += 1
+                present = value == 'present'
+                justifie = value == 'absent-justified'
+                saisies[int(eleve_id)] = (present, justifie, request.POST.get(f'comment_{eleve_id}', ''))
+        
+        # Enregistrer toutes les présences en lot dans une seule transaction
+        enregistrer_presences(selected_classe, selected_date, saisies, composante.id)
+        saved_count = len(saisies)
         
         return JsonResponse({
             'success': True,
@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.db.models import Sum, Count, F, Q
 from django.db.models.functions import TruncMonth, ExtractMonth, ExtractYear
 from .models import Charge, AnneeScolaire, Paiement
+from .grand_livre import get_grand_livre
 import datetime
 import json
 import calendar
@@ -42,20 +43,21 @@ def bilan_financier(request):
             if annees.exists():
                 annee_active = annees.first()
     
-    # Initialiser les queryset de base
+    # Grand livre mensuel de l'année, toutes composantes (les charges saisies
+    # ne sont pas rattachées à une composante)
+    livre = get_grand_livre(annee_id=annee_active.id if annee_active else None)
+    
+    # Initialiser les queryset de base (répartitions par catégorie et par méthode)
     charges_qs = Charge.objects.exclude(categorie='indemnisation')
-    indemnisations_qs = Charge.objects.filter(categorie='indemnisation')
     paiements_qs = Paiement.objects.all()
     
     # Appliquer le filtre d'année scolaire
     if annee_active:
         charges_qs = charges_qs.filter(annee_scolaire=annee_active)
-        indemnisations_qs = indemnisations_qs.filter(annee_scolaire=annee_active)
         paiements_qs = paiements_qs.filter(annee_scolaire=annee_active)
     
     # Appliquer les filtres de période
-    date_debut = None
-    date_fin = None
+    mois_selectionne = None
     
     if periode == 'mois':
         # Filtrer par mois
@@ -67,22 +69,17 @@ def bilan_financier(request):
             else:  # Sinon on est dans la deuxième partie
                 annee_courante = annee_active.date_fin.year
         
-        date_debut = datetime.date(annee_courante, mois, 1)
+        mois_selectionne = datetime.date(annee_courante, mois, 1)
         # Dernier jour du mois
         dernier_jour = calendar.monthrange(annee_courante, mois)[1]
         date_fin = datetime.date(annee_courante, mois, dernier_jour)
-        
-
-    # Appliquer les filtres de date si nécessaire
-    if date_debut and date_fin:
-        charges_qs = charges_qs.filter(date__gte=date_debut, date__lte=date_fin)
-        indemnisations_qs = indemnisations_qs.filter(date__gte=date_debut, date__lte=date_fin)
-        paiements_qs = paiements_qs.filter(date__gte=date_debut, date__lte=date_fin)
-    
-    # Calculer les totaux
-    total_charges = charges_qs.aggregate(total=Sum('montant')).get('total') or 0
-    total_indemnisations = indemnisations_qs.aggregate(total=Sum('montant')).get('total') or 0
-    total_entrees = paiements_qs.aggregate(total=Sum('montant')).get('total') or 0
+        charges_qs = charges_qs.filter(date__gte=mois_selectionne, date__lte=date_fin)
+        paiements_qs = paiements_qs.filter(date__gte=mois_selectionne, date__lte=date_fin)
+    
+    # Totaux lus dans le grand livre (sur le mois sélectionné ou toute l'année)
+    total_charges = livre.total('charges', mois_selectionne)
+    total_indemnisations = livre.total('indemnisations', mois_selectionne)
+    total_entrees = livre.total('entrees', mois_selectionne)
     solde = total_entrees - (total_charges + total_indemnisations)
     
     # Répartition des charges par catégorie
@@ -117,13 +114,6 @@ def bilan_financier(request):
             'pourcentage': pourcentage
         })
     
-    # Données pour le graphique d'évolution mensuelle
-    mois_labels = []
-    donnees_entrees = []
-    donnees_charges = []
-    donnees_indemnisations = []
-    donnees_solde = []
-    
     # Déterminer la période pour l'évolution mensuelle
     if annee_active:
         date_debut_graph = annee_active.date_debut
@@ -134,47 +124,13 @@ def bilan_financier(request):
         date_debut_graph = datetime.date(annee_courante, 1, 1)
         date_fin_graph = datetime.date(annee_courante, 12, 31)
     
-    # Générer les données mensuelles
-    current_date = date_debut_graph
-    while current_date <= date_fin_graph:
-        month_name = current_date.strftime("%b %Y")
-        mois_labels.append(month_name)
-        
-        month_start = datetime.date(current_date.year, current_date.month, 1)
-        month_end = datetime.date(
-            current_date.year, 
-            current_date.month, 
-            calendar.monthrange(current_date.year, current_date.month)[1]
-        )
-        
-        # Calculer les totaux pour ce mois
-        entrees_mois = paiements_qs.filter(
-            date__gte=month_start, 
-            date__lte=month_end
-        ).aggregate(total=Sum('montant')).get('total') or 0
-        
-        charges_mois = charges_qs.filter(
-            date__gte=month_start, 
-            date__lte=month_end
-        ).aggregate(total=Sum('montant')).get('total') or 0
-        
-        indemnisations_mois = indemnisations_qs.filter(
-            date__gte=month_start, 
-            date__lte=month_end
-        ).aggregate(total=Sum('montant')).get('total') or 0
-        
-        solde_mois = entrees_mois - (charges_mois + indemnisations_mois)
-        
-        donnees_entrees.append(entrees_mois)
-        donnees_charges.append(charges_mois)
-        donnees_indemnisations.append(indemnisations_mois)
-        donnees_solde.append(solde_mois)
-        
-        # Passer au mois suivant
-        if current_date.month == 12:
-            current_date = datetime.date(current_date.year + 1, 1, 1)
-        else:
-            current_date = datetime.date(current_date.year, current_date.month + 1, 1)
+    # Données pour le graphique d'évolution mensuelle
+    serie = livre.serie(date_debut_graph, date_fin_graph)
+    mois_labels = [ligne['mois'].strftime("%b %Y") for ligne in serie]
+    donnees_entrees = [ligne['entrees'] for ligne in serie]
+    donnees_charges = [ligne['charges'] for ligne in serie]
+    donnees_indemnisations = [ligne['indemnisations'] for ligne in serie]
+    donnees_solde = [ligne['solde'] for ligne in serie]
     
     context = {
         'annees': annees,
@@ -12,6 +12,7 @@ from .models import (Eleve, Professeur, CarnetPedagogique, EcouteAvantMemo,
                     Memorisation, Revision, Repetition, Creneau, CompetenceLivre, EvaluationCompetence)
 from .forms import (CarnetPedagogiqueForm, EcouteAvantMemoForm, MemorisationForm,
                     RevisionForm, RepetitionForm)
+from .carnet import lire_carnet, periode_demandee
 
 def check_eleve_access(request, eleve_id=None):
     """Vérifier si l'utilisateur a accès à l'élève spécifié"""
@@ -56,159 +57,16 @@ def carnet_pedagogique(request, eleve_id=None):
             messages.error(request, "Vous n'avez pas accès au carnet de cet élève.")
             return redirect('dashboard')
     
-    # Récupérer ou créer le carnet pédagogique de l'élève
-    carnet, created = CarnetPedagogique.objects.get_or_create(eleve=eleve)
-    
-    # Récupérer le mois et l'année depuis les paramètres GET ou utiliser la date actuelle
+    # Mois et année demandés (mois courant par défaut)
+    mois, annee = periode_demandee(request)
     date_actuelle = timezone.now()
-    try:
-        mois = int(request.GET.get('mois', date_actuelle.month))
-        annee = int(request.GET.get('annee', date_actuelle.year))
-        
-        # Vérifier que les valeurs sont dans des plages valides
-        if mois < 1 or mois > 12:
-            mois = date_actuelle.month
-        if annee < 2000 or annee > 2100:  # Plage raisonnable pour les années
-            annee = date_actuelle.year
-    except (ValueError, TypeError):
-        # En cas d'erreur de conversion, utiliser les valeurs par défaut
-        mois = date_actuelle.month
-        annee = date_actuelle.year
-    
-    # Récupérer les données du carnet
-    ecoutes = EcouteAvantMemo.objects.filter(carnet=carnet).order_by('-date')
-    memorisations = Memorisation.objects.filter(carnet=carnet).order_by('-date')
-    
-    # Utiliser values() pour sélectionner uniquement les champs nécessaires et éviter l'erreur de colonne manquante
-    revisions = Revision.objects.filter(carnet=carnet).values('id', 'carnet_id', 'semaine', 'date', 'jour', 'nombre_hizb').order_by('-date')
-    repetitions = Repetition.objects.filter(carnet=carnet).order_by('-derniere_date')
-    
-    # Statistiques
-    total_pages_memo = memorisations.aggregate(Sum('fin_page'))['fin_page__sum'] or 0
-    
-    # Récupérer les compétences du livre et leurs évaluations
-    competences = CompetenceLivre.objects.all().order_by('lecon', 'ordre')
-    evaluations = EvaluationCompetence.objects.filter(eleve=eleve).select_related('competence')
-    
-    # Créer un dictionnaire des évaluations par competence_id pour un accès plus rapide
-    evaluations_dict = {eval.competence_id: eval for eval in evaluations}
-    
-    # Organiser les compétences par leçon avec leurs évaluations
-    competences_par_lecon = {}
-    competences_status = {}
-    dates_annotation = {}
-    
-    for competence in competences:
-        if competence.lecon not in competences_par_lecon:
-            competences_par_lecon[competence.lecon] = []
-        
-        # Récupérer l'évaluation pour cette compétence
-        evaluation = evaluations_dict.get(competence.id)
-        
-        # Ajouter le statut de la compétence au dictionnaire avec l'ID réel
-        if evaluation:
-            competences_status[str(competence.id)] = evaluation.statut
-            # Sauvegarder la date d'évaluation par leçon
-            if competence.lecon not in dates_annotation:
-                dates_annotation[competence.lecon] = evaluation.date_evaluation
-        
-        competences_par_lecon[competence.lecon].append({
-            'competence': competence,
-            'evaluation': evaluation
-        })
-    
-    # Ajouter des mappings spéciaux pour les tableaux qui regroupent plusieurs leçons
-    # Tableau 1: Leçons 1-2 -> utiliser leçon 1 ou 2 selon disponibilité
-    if 1 not in dates_annotation and 2 in dates_annotation:
-        dates_annotation[1] = dates_annotation[2]
-    elif 2 not in dates_annotation and 1 in dates_annotation:
-        dates_annotation[2] = dates_annotation[1]
-    
-    # Tableau 2: Leçons 3-6 -> utiliser la première date disponible
-    for lecon in [3, 4, 5, 6]:
-        if lecon in dates_annotation:
-            dates_annotation[3] = dates_annotation[lecon]  # Le template utilise dates_annotation.3
-            break
-    
-    # Tableau 6: Règles de base -> chercher dans les compétences "regles"
-    for competence in competences:
-        if competence.description.startswith('Capacité à appliquer la nasalisation'):
-            evaluation = evaluations_dict.get(competence.id)
-            if evaluation:
-                dates_annotation['regles'] = evaluation.date_evaluation
-                break
     
-    # Créer un mapping des compétences statiques vers les vraies compétences
-    competences_mapping = {
-        # Leçon 1 et 2
-        '1_1': 'Capacité à reconnaître et lire les lettres fortes ;',
-        '1_2': 'Capacité à identifier la position des lettres dans un mot ;',
-        '1_3': 'Capacité à identifier et lire les lettres qui nécessitent de tirer le bout de la langue ;',
-        '1_4': 'Capacité à lire les lettres mises dans le désordre ;',
-        '1_5': 'Compétences générales en prononciation.',
-        # Leçon 3 à 6
-        '3_1': 'Capacité à reconnaître et lire les lettres fortes ;',
-        '3_2': 'Capacité à identifier la position des lettres dans un mot ;',
-        '3_3': 'Capacité à identifier et lire les lettres qui nécessitent de tirer le bout de la langue ;',
-        '3_4': 'Capacité à lire les lettres mises dans le désordre ;',
-        '3_5': 'Compétences générales en prononciation ;',
-        '3_6': 'Capacité à lire fluidement les mots des exercices 1 à 5 ;',
-        '3_7': 'Capacité à bien prononcer les 3 voyelles courtes.',
-        # Leçon 7
-        '7_1': 'Capacité à reconnaître et lire les lettres qui sortent avec l\'air ;',
-        '7_2': 'Capacité à reconnaître et lire les lettres qui sont appelées القَلْقَلَة ;',
-        '7_3': 'Capacité à reconnaître et lire les lettres qui sont appelées اللِّينِيَّة ;',
-        '7_4': 'Capacité à reconnaître et lire les lettres fortes ;',
-        '7_5': 'Compétences générales en prononciation ;',
-        '7_6': 'Capacité à lire fluidement les mots des exercices 6 et 7 ;',
-        '7_7': 'Capacité à identifier et lire les lettres qui nécessitent de tirer le bout de la langue.',
-        # Leçon 8
-        '8_1': 'Capacité à reconnaître les lettres de prolongement ;',
-        '8_2': 'Capacité à distinguer les voyelles courtes des voyelles longues ;',
-        '8_3': 'Capacité à distinguer les lettres de line des lettres de prolongement ;',
-        '8_4': 'Compétences générales en prononciation ;',
-        '8_5': 'Capacité à lire fluidement le texte, les exemples et l\'exercice 8.',
-        # Leçon 9
-        '9_1': 'Capacité à identifier les différents types de doubles voyelles ;',
-        '9_2': 'Capacité à maîtriser l\'arrêt sur les doubles voyelles ;',
-        '9_3': 'Compétences générales en prononciation ;',
-        '9_4': 'Capacité à lire fluidement le texte, les exemples et l\'exercice 9.',
-        '9_5': 'Capacité à distinguer la particularité des doubles voyelles fathatayn par rapport aux autres doubles voyelles.',
-        # Règles de base
-        'regles_1': 'Capacité à appliquer la nasalisation (الْغُنَّة) sur le noun ;',
-        'regles_2': 'Maîtrise des différentes déclinaisons de ن ;',
-        'regles_3': 'Capacité à distinguer les différents types de prolongement plus de 2 temps ;',
-        'regles_4': 'Maîtrise les types de الْقَلْقَلَة.'
-    }
-    
-    # Créer un mapping inverse pour retrouver les IDs réels
-    competences_statiques_status = {}
-    competences_id_mapping = {}  # Mapping static_id -> real_id
-    for static_id, description in competences_mapping.items():
-        for competence in competences:
-            if competence.description.strip() == description.strip():
-                competences_id_mapping[static_id] = competence.id
-                if str(competence.id) in competences_status:
-                    competences_statiques_status[static_id] = competences_status[str(competence.id)]
-                break
-    
-    context = {
-        'eleve': eleve,
-        'carnet': carnet,
-        'ecoutes': ecoutes,
-        'memorisations': memorisations,
-        'revisions': revisions,
-        'repetitions': repetitions,
-        'total_pages_memo': total_pages_memo,
-        'competences_par_lecon': competences_par_lecon,
-        'competences_status': competences_statiques_status,  # Utiliser le mapping statique
-        'competences_id_mapping': competences_id_mapping,  # Mapping pour JavaScript
-        'dates_annotation': dates_annotation,
-        'mois': mois,
-        'annee': annee,
+    # Séances du mois et bilan des compétences chargés en un seul lot
+    context = lire_carnet(eleve, mois, annee).contexte()
+    context.update({
         'mois_actuel': date_actuelle.month,  # Mois actuel pour le bouton "Mois courant"
         'annee_actuelle': date_actuelle.year,  # Année actuelle pour le bouton "Mois courant"
-    }
+    })
     return render(request, 'ecole_app/carnet/index.html', context)
 
 @login_required
@@ -3,6 +3,9 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Sum, Count, Q, F, ExpressionWrapper, DecimalField, Value, CharField, Case, When
 from django.db.models.functions import Concat, ExtractMonth, ExtractYear, TruncMonth
+from .grand_livre import get_grand_livre
+from .impayes import get_releve_impayes
+from .exports_excel import reponse_excel
 
 def recalculer_indemnisation_professeur(professeur):
     """
@@ -67,6 +70,78 @@ def paiements_manquants(request):
     }
     
     return render(request, 'ecole_app/paiements/paiements_manquants.html', context)
+
+
+def _releve_demande(request, composante_id):
+    """Relevé des impayés pour l'année et la date passées en GET (année active et jour même par défaut)"""
+    try:
+        date = datetime.date.fromisoformat(request.GET.get('date', ''))
+    except ValueError:
+        date = datetime.date.today()
+    annee_id = request.GET.get('annee')
+    return get_releve_impayes(composante_id, annee_id=int(annee_id) if annee_id and annee_id.isdigit() else None,
+                              date=date)
+
+
+@login_required
+def releve_impayes(request):
+    """
+    Vue du relevé des impayés : élèves dont le montant payé est inférieur au
+    montant dû à la date choisie, par tranche de retard, classe et créneau
+    """
+    composante_id = request.session.get('composante_id')
+    if not composante_id:
+        messages.warning(request, 'Veuillez sélectionner une composante pour continuer.')
+        return redirect('selection_composante')
+
+    releve = _releve_demande(request, composante_id)
+    tranche_choisie = request.GET.get('tranche')
+    eleves = releve['eleves']
+    if tranche_choisie and tranche_choisie.isdigit():
+        eleves = [ligne for ligne in eleves if ligne['tranche'] == int(tranche_choisie)]
+
+    context = {
+        'releve': releve,
+        'eleves': eleves,
+        'tranche_choisie': tranche_choisie,
+        'annees': AnneeScolaire.objects.all().order_by('-date_debut'),
+    }
+    return render(request, 'ecole_app/paiements/impayes.html', context)
+
+
+@login_required
+def export_releve_impayes(request):
+    """Export Excel (en streaming) des élèves en retard de paiement"""
+    composante_id = request.session.get('composante_id')
+    if not composante_id:
+        messages.warning(request, 'Veuillez sélectionner une composante pour continuer.')
+        return redirect('selection_composante')
+
+    releve = _releve_demande(request, composante_id)
+    lignes = (
+        [
+            ligne['nom'],
+            ligne['prenom'],
+            ", ".join(ligne['classes']),
+            ", ".join(ligne['creneaux']),
+            ligne['telephone'],
+            float(ligne['montant_total']),
+            float(ligne['du']),
+            float(ligne['paye']),
+            float(ligne['retard']),
+            ligne['echeances_retard'],
+            ligne['dernier_paiement'].strftime('%d/%m/%Y') if ligne['dernier_paiement'] else "",
+        ]
+        for ligne in releve['eleves']
+    )
+    return reponse_excel(
+        f'impayes-{releve["date"].strftime("%Y%m%d")}.xlsx',
+        "Impayés",
+        ['Nom', 'Prénom', 'Classes', 'Créneaux', 'Téléphone', 'Montant total', 'Montant dû', 'Montant payé',
+         'Retard', 'Échéances en retard', 'Dernier paiement'],
+        lignes,
+        largeurs=[20, 20, 25, 25, 16, 14, 14, 14, 12, 18, 16],
+    )
 from collections import defaultdict
 
 @login_required
@@ -74,15 +149,8 @@ def liste_charges(request):
     """Vue pour afficher la liste des charges"""
     charges = Charge.objects.exclude(categorie='indemnisation').order_by('-date')
     
-    # Statistiques
-    total_charges = charges.aggregate(total=Sum('montant')).get('total') or 0
-    
-    # Grouper les charges par mois
-    charges_par_mois = Charge.objects.exclude(categorie='indemnisation')\
-        .annotate(mois=TruncMonth('date'))\
-        .values('mois')\
-        .annotate(total=Sum('montant'))\
-        .order_by('-mois')
+    # Statistiques (toutes années confondues)
+    total_charges = get_grand_livre().total('charges')
     
     # Filtrage par année scolaire si spécifiée
     annee_id = request.GET.get('annee')
@@ -93,7 +161,6 @@ def liste_charges(request):
         try:
             annee_active = AnneeScolaire.objects.get(id=annee_id)
             charges = charges.filter(annee_scolaire=annee_active)
-            charges_par_mois = charges_par_mois.filter(annee_scolaire=annee_active)
         except AnneeScolaire.DoesNotExist:
             pass
     else:
@@ -101,10 +168,12 @@ def liste_charges(request):
         try:
             annee_active = AnneeScolaire.objects.get(active=True)
             charges = charges.filter(annee_scolaire=annee_active)
-            charges_par_mois = charges_par_mois.filter(annee_scolaire=annee_active)
         except AnneeScolaire.DoesNotExist:
             pass
     
+    # Charges par mois de l'année retenue, lues dans le grand livre
+    charges_par_mois = get_grand_livre(annee_id=annee_active.id if annee_active else None).par_mois('charges')
+    
     # Traitement du formulaire d'ajout de charge
     if request.method == 'POST':
         form = ChargeForm(request.POST)
@@ -174,8 +243,8 @@ def liste_indemnisations(request):
     professeurs = Professeur.objects.all().order_by('nom')
     professeur_selectionne = None
     
-    # Statistiques
-    total_indemnisations = indemnisations.aggregate(total=Sum('montant')).get('total') or 0
+    # Statistiques (toutes années confondues)
+    total_indemnisations = get_grand_livre().total('indemnisations')
     
     # Filtrage par professeur si spécifié
     professeur_id = request.GET.get('professeur')
@@ -186,19 +255,6 @@ def liste_indemnisations(request):
         except Professeur.DoesNotExist:
             pass
     
-    # Grouper les indemnisations par mois
-    indemnisations_par_mois_query = Charge.objects.filter(categorie='indemnisation')
-    
-    # Appliquer le filtre par professeur aux données mensuelles si nécessaire
-    if professeur_selectionne:
-        indemnisations_par_mois_query = indemnisations_par_mois_query.filter(professeur=professeur_selectionne)
-        
-    indemnisations_par_mois = indemnisations_par_mois_query\
-        .annotate(mois=TruncMonth('date'))\
-        .values('mois')\
-        .annotate(total=Sum('montant'))\
-        .order_by('-mois')
-    
     # Filtrage par année scolaire si spécifiée
     annee_id = request.GET.get('annee')
     annees = AnneeScolaire.objects.all().order_by('-date_debut')
@@ -208,7 +264,6 @@ def liste_indemnisations(request):
         try:
             annee_active = AnneeScolaire.objects.get(id=annee_id)
             indemnisations = indemnisations.filter(annee_scolaire=annee_active)
-            indemnisations_par_mois = indemnisations_par_mois.filter(annee_scolaire=annee_active)
         except AnneeScolaire.DoesNotExist:
             pass
     else:
@@ -216,10 +271,20 @@ def liste_indemnisations(request):
         try:
             annee_active = AnneeScolaire.objects.get(active=True)
             indemnisations = indemnisations.filter(annee_scolaire=annee_active)
-            indemnisations_par_mois = indemnisations_par_mois.filter(annee_scolaire=annee_active)
         except AnneeScolaire.DoesNotExist:
             pass
     
+    # Grouper les indemnisations par mois
+    if professeur_selectionne:
+        # Le grand livre ne distingue pas les professeurs : agrégation dédiée
+        indemnisations_par_mois = indemnisations\
+            .annotate(mois=TruncMonth('date'))\
+            .values('mois')\
+            .annotate(total=Sum('montant'))\
+            .order_by('-mois')
+    else:
+        indemnisations_par_mois = get_grand_livre(annee_id=annee_active.id if annee_active else None).par_mois('indemnisations')
+    
     # Formulaire d'ajout d'indemnisation
     if request.method == 'POST':
         # Assurons-nous que la catégorie est bien 'indemnisation'
@@ -316,20 +381,17 @@ def supprimer_indemnisation(request, indemnisation_id):
 def statistiques_paiements(request):
     """Vue pour afficher les statistiques des paiements"""
     paiements = Paiement.objects.all()
+    livre = get_grand_livre()
     
-    # Statistiques générales
-    total_paiements = paiements.aggregate(total=Sum('montant')).get('total') or 0
-    nombre_paiements = paiements.count()
+    # Statistiques générales, lues dans le grand livre
+    total_paiements = livre.total('entrees')
+    nombre_paiements = livre.nombre('entrees')
     
     # Calcul de la moyenne des paiements
     moyenne_paiement = total_paiements / nombre_paiements if nombre_paiements > 0 else 0
     
     # Grouper par mois
-    paiements_par_mois = paiements\
-        .annotate(mois=TruncMonth('date'))\
-        .values('mois')\
-        .annotate(total=Sum('montant'), count=Count('id'))\
-        .order_by('-mois')
+    paiements_par_mois = livre.par_mois('entrees')
     
     # Grouper par méthode de paiement
     paiements_par_methode = paiements\
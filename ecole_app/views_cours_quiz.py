@@ -1,16 +1,19 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import HttpResponse, FileResponse
+from django.conf import settings
+from django.http import Http404
 from django.utils import timezone
-from django.db import transaction
 from django.db.models import Count, Q
+import os
 
 from .models import (
     CoursPartage,
     Professeur, Eleve, Classe
 )
 from .models_pedagogie import Quiz, Question, TentativeQuiz, Reponse, Choix
+from .session_quiz import charger_etat, sauvegarder_etat, enregistrer_reponse, terminer_tentative
+from .fichiers import servir_fichier
 from .views_auth import is_professeur, is_eleve, is_admin
 
 # Fonction pour vérifier si l'utilisateur est un professeur ou un administrateur
@@ -196,36 +199,25 @@ def telecharger_cours(request, cours_id):
         messages.error(request, "Ce cours n'existe pas ou n'est pas disponible pour votre classe.")
         return redirect('liste_cours_eleve')
     
-    # Renvoyer le fichier pour téléchargement
-    if cours.fichier:
-        try:
-            # Vérifier si le fichier existe dans le système de fichiers
-            if cours.fichier.storage.exists(cours.fichier.name):
-                response = FileResponse(cours.fichier.open('rb'), content_type='application/force-download')
-                response['Content-Disposition'] = f'attachment; filename="{cours.fichier.name.split("/")[-1]}"'
-                return response
-            else:
-                # Si le fichier n'existe pas dans media/, essayer dans cours_partages/
-                import os
-                from django.conf import settings
-                
-                filename = cours.fichier.name.split("/")[-1]
-                alternative_path = os.path.join(settings.BASE_DIR, 'cours_partages', filename)
-                
-                if os.path.exists(alternative_path):
-                    with open(alternative_path, 'rb') as f:
-                        response = HttpResponse(f.read(), content_type='application/force-download')
-                        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-                        return response
-                else:
-                    messages.error(request, f'Le fichier "{filename}" est introuvable sur le serveur.')
-                    return redirect('liste_cours_eleve')
-        except Exception as e:
-            messages.error(request, f'Erreur lors du téléchargement du fichier: {str(e)}')
-            return redirect('liste_cours_eleve')
-    else:
+    if not cours.fichier:
         messages.error(request, 'Ce cours ne contient pas de fichier à télécharger.')
         return redirect('liste_cours_eleve')
+    
+    # Le fichier est normalement dans media/ ; les anciens cours sont dans cours_partages/
+    filename = cours.fichier.name.split("/")[-1]
+    chemin = cours.fichier.path
+    if not os.path.exists(chemin):
+        chemin = os.path.join(settings.BASE_DIR, 'cours_partages', filename)
+    if not os.path.exists(chemin):
+        messages.error(request, f'Le fichier "{filename}" est introuvable sur le serveur.')
+        return redirect('liste_cours_eleve')
+    
+    # Envoi en streaming avec reprise (Range) et requêtes conditionnelles (ETag)
+    try:
+        return servir_fichier(request, chemin, filename)
+    except OSError as e:
+        messages.error(request, f'Erreur lors du téléchargement du fichier: {str(e)}')
+        return redirect('liste_cours_eleve')
 
 # Vues pour les quiz
 
@@ -488,125 +480,90 @@ def demarrer_quiz(request, quiz_id):
     
     return redirect('repondre_quiz', tentative_id=tentative.id)
 
+def _afficher_erreur_question(request, tentative, question_id):
+    """Réaffiche une question après une saisie invalide"""
+    question = get_object_or_404(Question.objects.prefetch_related('choix'), id=question_id)
+    return render(request, 'ecole_app/cours_quiz/repondre_quiz.html', {
+        'tentative': tentative,
+        'question': question,
+        'choix': question.choix.all(),
+    })
+
 @login_required
 def repondre_quiz(request, tentative_id, question_id=None):
     """Permet à l'élève de répondre à une question du quiz"""
-    tentative = get_object_or_404(TentativeQuiz, id=tentative_id)
-    quiz = tentative.quiz
+    tentative = get_object_or_404(TentativeQuiz.objects.select_related('eleve'), id=tentative_id)
     
     # Vérifier que l'élève est bien celui qui a commencé la tentative
-    if request.user != tentative.eleve.user:
+    if request.user.pk != tentative.eleve.user_id:
         messages.error(request, "Vous n'êtes pas autorisé à répondre à ce quiz.")
         return redirect('dashboard_eleve')
     
+    if tentative.terminee:
+        return redirect('resultats_quiz', tentative_id=tentative_id)
+    
+    # État de la tentative (ordre des questions, réponses données, score) gardé en session
+    etat = charger_etat(request, tentative)
+    
     # Si aucune question n'est spécifiée, prendre la première non répondue
     if question_id is None:
-        # Récupérer toutes les questions du quiz
-        questions = quiz.questions.all().order_by('ordre')
-        
-        # Récupérer les questions déjà répondues
-        reponses = Reponse.objects.filter(tentative=tentative)
-        questions_repondues = [r.question.id for r in reponses]
-        
-        # Trouver la première question non répondue
-        for question in questions:
-            if question.id not in questions_repondues:
-                return redirect('repondre_quiz', tentative_id=tentative_id, question_id=question.id)
+        suivante = etat.prochaine_question()
+        sauvegarder_etat(request, etat)
+        if suivante is not None:
+            return redirect('repondre_quiz', tentative_id=tentative_id, question_id=suivante)
         
         # Si toutes les questions ont été répondues, rediriger vers les résultats
         return redirect('resultats_quiz', tentative_id=tentative_id)
     
-    # Récupérer la question courante
-    question_courante = get_object_or_404(Question, id=question_id, quiz=quiz)
+    question_id = int(question_id)
+    if etat.question(question_id) is None:
+        raise Http404("Question introuvable")
     
     # Vérifier si la question a déjà été répondue
-    if Reponse.objects.filter(tentative=tentative, question=question_courante).exists():
+    if question_id in etat.repondues:
         messages.warning(request, "Vous avez déjà répondu à cette question.")
         return redirect('repondre_quiz', tentative_id=tentative_id)
     
     if request.method == 'POST':
         # Traiter la réponse
-        if question_courante.type == 'texte_court':
+        if etat.question(question_id)['type'] == 'texte_court':
             texte_reponse = request.POST.get('texte_reponse', '').strip()
             if not texte_reponse:
                 messages.error(request, "Veuillez entrer une réponse.")
-                return render(request, 'ecole_app/cours_quiz/repondre_quiz.html', {
-                    'tentative': tentative,
-                    'question': question_courante,
-                    'choix': question_courante.choix.all(),
-                })
+                return _afficher_erreur_question(request, tentative, question_id)
             
-            # Créer la réponse
-            reponse = Reponse(
-                tentative=tentative,
-                question=question_courante,
-                texte_reponse=texte_reponse,
-                est_correcte=False  # À implémenter: vérification des réponses textuelles
-            )
-            reponse.save()
+            # Créer la réponse (vérification des réponses textuelles à implémenter)
+            enregistrer_reponse(etat, tentative, question_id, texte_reponse=texte_reponse)
         else:
             # Pour les questions à choix
             choix_ids = request.POST.getlist('choix')
             if not choix_ids:
                 messages.error(request, "Veuillez sélectionner au moins une réponse.")
-                return render(request, 'ecole_app/cours_quiz/repondre_quiz.html', {
-                    'tentative': tentative,
-                    'question': question_courante,
-                    'choix': question_courante.choix.all(),
-                })
+                return _afficher_erreur_question(request, tentative, question_id)
             
-            # Utiliser une transaction pour garantir la cohérence
-            with transaction.atomic():
-                try:
-                    # Créer et sauvegarder d'abord la réponse pour qu'elle ait un ID
-                    reponse = Reponse(
-                        tentative=tentative,
-                        question=question_courante,
-                        est_correcte=False
-                    )
-                    reponse.save()
-                    
-                    # Ajouter les choix un par un après avoir sauvegardé la réponse
-                    for choix_id in choix_ids:
-                        choix = get_object_or_404(Choix, id=choix_id, question=question_courante)
-                        reponse.choix_selectionnes.add(choix)
-                    
-                    # Rafraîchir l'objet depuis la base de données
-                    reponse.refresh_from_db()
-                    
-                    # Mettre à jour le statut de la réponse
-                    est_correcte = reponse.verifier_reponse()
-                    Reponse.objects.filter(pk=reponse.pk).update(est_correcte=est_correcte)
-                except Exception as e:
-                    # Journaliser l'erreur pour le débogage
-                    print(f"Erreur lors de la création de la réponse: {e}")
-                    messages.error(request, "Une erreur s'est produite lors de l'enregistrement de votre réponse. Veuillez réessayer.")
-                    return render(request, 'ecole_app/cours_quiz/repondre_quiz.html', {
-                        'tentative': tentative,
-                        'question': question_courante,
-                        'choix': question_courante.choix.all(),
-                    })
+            # La réponse est corrigée à partir des choix corrects déjà chargés dans l'état
+            try:
+                enregistrer_reponse(etat, tentative, question_id, choix_ids=choix_ids)
+            except ValueError:
+                messages.error(request, "Une erreur s'est produite lors de l'enregistrement de votre réponse. Veuillez réessayer.")
+                return _afficher_erreur_question(request, tentative, question_id)
         
         # Passer à la question suivante ou terminer le quiz
-        questions = quiz.questions.all().order_by('ordre')
-        questions_repondues = [r.question.id for r in Reponse.objects.filter(tentative=tentative)]
-        
-        for question in questions:
-            if question.id not in questions_repondues:
-                return redirect('repondre_quiz', tentative_id=tentative_id, question_id=question.id)
+        suivante = etat.prochaine_question()
+        sauvegarder_etat(request, etat)
+        if suivante is not None:
+            return redirect('repondre_quiz', tentative_id=tentative_id, question_id=suivante)
         
         # Toutes les questions ont été répondues
         return redirect('resultats_quiz', tentative_id=tentative_id)
     
-    # Récupérer les questions déjà répondues
-    questions = quiz.questions.all().order_by('ordre')
-    questions_repondues = [r.question.id for r in Reponse.objects.filter(tentative=tentative)]
-    total_questions = questions.count()
+    # Récupérer la question courante avec ses choix
+    question_courante = get_object_or_404(Question.objects.prefetch_related('choix'), id=question_id)
     
     # Calculer la progression en pourcentage
+    total_questions = etat.total_questions
+    questions_completees = len(etat.repondues)
     if total_questions > 0:
-        # Inclure la question courante dans le calcul de la progression
-        questions_completees = len(questions_repondues)
         progression_percent = (questions_completees * 100) // total_questions
     else:
         progression_percent = 0
@@ -614,8 +571,8 @@ def repondre_quiz(request, tentative_id, question_id=None):
     context = {
         'tentative': tentative,
         'question': question_courante,
-        'choix': question_courante.choix.all() if question_courante else None,
-        'progression': len(questions_repondues) + 1,  # Numéro de la question actuelle
+        'choix': question_courante.choix.all(),
+        'progression': questions_completees + 1,  # Numéro de la question actuelle
         'progression_percent': progression_percent,  # Pourcentage de progression
         'total_questions': total_questions,
     }
@@ -627,29 +584,9 @@ def terminer_quiz(request, tentative_id):
     eleve = request.user.eleve
     tentative = get_object_or_404(TentativeQuiz, id=tentative_id, eleve=eleve)
     
-    # Si la tentative est déjà terminée, rediriger vers les résultats
-    if tentative.terminee:
-        return redirect('resultats_quiz', tentative_id=tentative.id)
-    
-    # Calculer le score
-    total_points = sum(q.points for q in tentative.quiz.questions.all())
-    points_obtenus = 0
-    
-    for reponse_eleve in tentative.reponses.all():
-        if reponse_eleve.est_correcte:
-            points_obtenus += reponse_eleve.question.points
-    
-    # Calculer le score en pourcentage
-    if total_points > 0:
-        score = (points_obtenus / total_points) * 100
-    else:
-        score = 0
-    
-    # Mettre à jour la tentative
-    tentative.score = score
-    tentative.date_fin = timezone.now()
-    tentative.terminee = True
-    tentative.save()
+    # Si la tentative n'est pas déjà terminée, la terminer avec le score de l'état en session
+    if not tentative.terminee:
+        terminer_tentative(request, tentative)
     
     return redirect('resultats_quiz', tentative_id=tentative.id)
 
@@ -661,42 +598,24 @@ def resultats_quiz(request, tentative_id):
     
     # S'assurer que la tentative est marquée comme terminée
     if not tentative.terminee:
-        # Calculer le score
-        total_points = sum(q.points for q in tentative.quiz.questions.all())
-        points_obtenus = 0
-        
-        for reponse_eleve in tentative.reponses.all():
-            if reponse_eleve.est_correcte:
-                points_obtenus += reponse_eleve.question.points
-        
-        # Calculer le score en pourcentage
-        if total_points > 0:
-            score = (points_obtenus / total_points) * 100
-        else:
-            score = 0
-        
-        # Mettre à jour la tentative
-        tentative.score = score
-        tentative.date_fin = timezone.now()
-        tentative.terminee = True
-        tentative.save()
+        terminer_tentative(request, tentative)
     
-    # Récupérer les réponses de l'élève avec les questions et les réponses correctes
-    reponses_eleve = tentative.reponses.all().select_related('question')
+    # Récupérer les réponses avec leurs questions, choix sélectionnés et choix des questions
+    reponses_eleve = tentative.reponses.all().select_related('question').prefetch_related(
+        'choix_selectionnes', 'question__choix'
+    )
     
     # Préparer les données pour l'affichage
     resultats_detailles = []
     for reponse in reponses_eleve:
         question = reponse.question
-        choix_selectionnes = list(reponse.choix_selectionnes.all())
-        choix_corrects = list(question.choix.filter(est_correct=True))
         
         # Créer un dictionnaire avec toutes les informations nécessaires
         resultat = {
             'question': question,
             'reponse': reponse,
-            'choix_selectionnes': choix_selectionnes,
-            'choix_corrects': choix_corrects,
+            'choix_selectionnes': list(reponse.choix_selectionnes.all()),
+            'choix_corrects': [choix for choix in question.choix.all() if choix.est_correct],
         }
         resultats_detailles.append(resultat)
     
@@ -727,6 +646,7 @@ def resultats_quiz_classe(request, quiz_id):
     context = {
         'quiz': quiz,
         'tentatives': tentatives,
+        'classes': quiz.module.classes.order_by('nom'),
     }
     return render(request, 'ecole_app/cours_quiz/resultats_quiz_classe.html', context)
 
@@ -4,6 +4,7 @@ from django.contrib import messages
 from django.db.models import Prefetch
 from .models import Classe, Eleve, ObjectifMensuel, Composante
 from .decorators import professeur_required, admin_required
+from .pages_memorisees import couverture_eleves
 
 @login_required
 @professeur_required
@@ -28,12 +29,17 @@ def liste_eleves_objectifs(request, classe_id):
         Prefetch('objectifs', queryset=ObjectifMensuel.objects.order_by('-mois'))
     ).order_by('nom', 'prenom')
     
+    # Pages mémorisées de chaque élève et avancement de la classe par juz
+    eleves = list(eleves)
+    carte_juz = couverture_eleves(eleves)
+    
     # Récupérer les classes de la même composante pour le transfert
     classes_meme_composante = Classe.objects.filter(composante=classe.composante).exclude(id=classe.id).select_related('professeur')
     
     context = {
         'classe': classe,
         'eleves': eleves,
+        'carte_juz': carte_juz,
         'classes_meme_composante': classes_meme_composante,
     }
     
@@ -75,9 +81,14 @@ def admin_liste_eleves_objectifs(request, classe_id=None):
         Prefetch('objectifs', queryset=ObjectifMensuel.objects.order_by('-mois'))
     ).order_by('nom', 'prenom')
     
+    # Pages mémorisées de chaque élève et avancement de la classe par juz
+    eleves = list(eleves)
+    carte_juz = couverture_eleves(eleves)
+    
     context = {
         'classe': classe,
         'eleves': eleves,
+        'carte_juz': carte_juz,
         'is_admin': True,
     }
     
@@ -5,6 +5,7 @@ from django.db.models import Q, Avg, Count
 from django.http import JsonResponse
 from .models import NoteExamen, Eleve, Classe, Professeur, Composante
 from .forms import NoteExamenForm
+from .statistiques_notes import statistiques_classe, statistiques_eleve
 from datetime import date
 
 @login_required
@@ -222,44 +223,23 @@ def statistiques_notes_classe(request, classe_id):
         professeur = request.user.professeur
         classe = get_object_or_404(Classe, id=classe_id, professeur=professeur)
     
-    # Récupérer toutes les notes de la classe
-    notes = NoteExamen.objects.filter(classe=classe).select_related('eleve')
-    
-    # Calculer les statistiques
+    # Notes et statistiques de la classe, calculées en une passe
+    notes, analyse = statistiques_classe(classe)
     stats = {
-        'total_notes': notes.count(),
-        'moyenne_classe': notes.aggregate(Avg('note'))['note__avg'] or 0,
-        'notes_par_type': {},
-        'notes_par_eleve': {}
+        'total_notes': analyse['count'],
+        'moyenne_classe': analyse['moyenne'],
+        'mediane_classe': analyse['mediane'],
+        'premier_quartile': analyse['premier_quartile'],
+        'troisieme_quartile': analyse['troisieme_quartile'],
+        'distribution': analyse['distribution'],
+        'notes_par_type': analyse['notes_par_type'],
+        'notes_par_eleve': analyse['notes_par_eleve'],
     }
     
-    # Statistiques par type d'examen
-    for type_code, type_nom in NoteExamen.TYPE_EXAMEN_CHOICES:
-        notes_type = notes.filter(type_examen=type_code)
-        if notes_type.exists():
-            stats['notes_par_type'][type_nom] = {
-                'count': notes_type.count(),
-                'moyenne': notes_type.aggregate(Avg('note'))['note__avg'] or 0
-            }
-    
-    # Statistiques par élève (ForeignKey et ManyToMany)
-    eleves_fk = classe.eleves.filter(archive=False)
-    eleves_m2m = classe.eleves_multi.filter(archive=False)
-    eleves = (eleves_fk | eleves_m2m).distinct().order_by('nom', 'prenom')
-    for eleve in eleves:
-        notes_eleve = notes.filter(eleve=eleve)
-        if notes_eleve.exists():
-            stats['notes_par_eleve'][eleve.id] = {
-                'eleve': eleve,
-                'count': notes_eleve.count(),
-                'moyenne': notes_eleve.aggregate(Avg('note'))['note__avg'] or 0,
-                'derniere_note': notes_eleve.order_by('-date_examen').first()
-            }
-    
     context = {
         'classe': classe,
         'stats': stats,
-        'notes': notes.order_by('-date_examen')[:10]  # Les 10 dernières notes
+        'notes': notes[:10]  # Les 10 dernières notes
     }
     
     # Ajouter le statut admin au contexte
@@ -281,28 +261,16 @@ def mes_notes(request):
     
     eleve = request.user.eleve
     
-    # Récupérer toutes les notes de l'élève avec optimisation des requêtes
-    notes = NoteExamen.objects.filter(
-        eleve=eleve
-    ).select_related('professeur', 'classe').order_by('-date_examen', '-date_creation')
-    
-    # Calculer les statistiques
+    # Notes de l'élève et statistiques, calculées en une passe
+    notes, analyse = statistiques_eleve(eleve)
     stats = {
-        'total_notes': notes.count(),
-        'moyenne_generale': notes.aggregate(Avg('note'))['note__avg'] or 0,
-        'notes_par_type': {},
-        'derniere_note': notes.first() if notes.exists() else None
+        'total_notes': analyse['count'],
+        'moyenne_generale': analyse['moyenne'],
+        'mediane': analyse['mediane'],
+        'notes_par_type': analyse['notes_par_type'],
+        'derniere_note': analyse['derniere_note'],
     }
     
-    # Statistiques par type d'examen
-    for type_code, type_nom in NoteExamen.TYPE_EXAMEN_CHOICES:
-        notes_type = notes.filter(type_examen=type_code)
-        if notes_type.exists():
-            stats['notes_par_type'][type_nom] = {
-                'count': notes_type.count(),
-                'moyenne': notes_type.aggregate(Avg('note'))['note__avg'] or 0
-            }
-    
     context = {
         'eleve': eleve,
         'notes': notes[:10],  # Les 10 dernières notes
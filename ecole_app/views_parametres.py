@@ -3,6 +3,8 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.http import HttpResponseRedirect
 from django.urls import reverse
+from .dashboard_stats import invalider_dashboard_stats
+from .impayes import invalider_releve_impayes
 from .models import ParametreSite, Eleve
 from django import forms
 
@@ -42,7 +44,12 @@ def parametres_site(request):
             # Vérifier si la case pour mettre à jour les élèves est cochée
             if form.cleaned_data.get('mettre_a_jour_eleves'):
                 # Mettre à jour tous les élèves non archivés
-                nb_eleves = Eleve.objects.filter(archive=False).update(montant_total=nouveau_montant)
+                eleves = Eleve.objects.filter(archive=False)
+                composante_ids = list(eleves.order_by().values_list('composante_id', flat=True).distinct())
+                nb_eleves = eleves.update(montant_total=nouveau_montant)
+                # update() ne déclenche pas les signaux : les montants dus en cache sont invalidés ici
+                invalider_dashboard_stats(*composante_ids)
+                invalider_releve_impayes(*composante_ids)
                 messages.success(
                     request, 
                     f"Les paramètres du site ont été mis à jour avec succès. "
@@ -1,9 +1,17 @@
+import tempfile
+
 from django.shortcuts import get_object_or_404, redirect
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.utils import timezone
+from django.http import FileResponse
+
+from .cache_pdf import generer_pdf
+from .models import Classe
+from .models_pedagogie import Quiz
+from .fichiers import servir_fichier
+from .resultats_quiz_pdf import (TEMPLATE_RESULTATS_QUIZ, contexte_resultats_quiz, generer_bundle_resultats_classe,
+                                 nom_fichier_resultats_quiz, tentatives_avec_details)
 
-from .models_pedagogie import TentativeQuiz
-from .utils import render_to_pdf
 
 @login_required
 def telecharger_resultats_quiz_pdf(request, tentative_id):
@@ -11,51 +19,44 @@ def telecharger_resultats_quiz_pdf(request, tentative_id):
     # Récupérer la tentative
     if hasattr(request.user, 'eleve'):
         # Si c'est un élève, il ne peut voir que ses propres résultats
-        tentative = get_object_or_404(TentativeQuiz, id=tentative_id, eleve=request.user.eleve)
+        tentative = get_object_or_404(tentatives_avec_details(), id=tentative_id, eleve=request.user.eleve)
     elif hasattr(request.user, 'professeur'):
         # Si c'est un professeur, il peut voir les résultats de ses élèves
-        tentative = get_object_or_404(TentativeQuiz, id=tentative_id, quiz__module__professeur=request.user.professeur)
+        tentative = get_object_or_404(tentatives_avec_details(), id=tentative_id, quiz__module__professeur=request.user.professeur)
     else:
         # Si c'est un admin, il peut voir tous les résultats
-        tentative = get_object_or_404(TentativeQuiz, id=tentative_id)
-    
-    # Récupérer les réponses avec les questions et les réponses correctes
-    reponses_eleve = tentative.reponses.all().select_related('question')
-    
-    # Préparer les données pour l'affichage
-    resultats = []
-    for reponse in reponses_eleve:
-        question = reponse.question
-        choix_selectionnes = list(reponse.choix_selectionnes.all())
-        choix_corrects = list(question.choix.filter(est_correct=True))
-        
-        # Créer un dictionnaire avec toutes les informations nécessaires
-        resultat = {
-            'question': question,
-            'reponse': reponse,
-            'choix_selectionnes': choix_selectionnes,
-            'choix_corrects': choix_corrects,
-        }
-        resultats.append(resultat)
-    
-    # Générer le nom du fichier PDF
-    filename = f"quiz_{tentative.quiz.titre.replace(' ', '_')}_{tentative.eleve.nom}_{tentative.eleve.prenom}_{timezone.now().strftime('%Y%m%d')}.pdf"
-    
-    # Préparer le contexte pour le template PDF
-    context = {
-        'tentative': tentative,
-        'resultats': resultats,
-        'date_generation': timezone.now(),
-    }
-    
-    # Générer le PDF
-    pdf = render_to_pdf('ecole_app/cours_quiz/pdf_resultats_quiz.html', context)
-    
-    # Configurer la réponse HTTP pour le téléchargement
-    if pdf:
-        response = pdf
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
-    
+        tentative = get_object_or_404(tentatives_avec_details(), id=tentative_id)
+
+    # Générer le PDF (servi depuis le cache s'il a déjà été produit)
+    chemin = generer_pdf(TEMPLATE_RESULTATS_QUIZ, contexte_resultats_quiz(tentative))
+
+    # Envoyer le fichier du cache (ETag, reprise et X-Sendfile pris en charge)
+    if chemin:
+        return servir_fichier(request, chemin, nom_fichier_resultats_quiz(tentative))
+
     # En cas d'erreur, rediriger vers la page des résultats
     return redirect('resultats_quiz', tentative_id=tentative_id)
+
+
+@login_required
+def telecharger_resultats_classe_pdf(request, quiz_id, classe_id):
+    """Télécharge une archive ZIP des PDF de résultats d'un quiz pour une classe"""
+    if hasattr(request.user, 'professeur'):
+        quiz = get_object_or_404(Quiz, id=quiz_id, module__professeur=request.user.professeur)
+    elif request.user.is_superuser or request.user.is_staff:
+        quiz = get_object_or_404(Quiz, id=quiz_id)
+    else:
+        messages.error(request, "Vous n'avez pas accès à cette page.")
+        return redirect('dashboard')
+    classe = get_object_or_404(Classe, id=classe_id)
+
+    # Archive construite dans un fichier temporaire pour ne pas la garder en mémoire
+    archive = tempfile.TemporaryFile()
+    nombre = generer_bundle_resultats_classe(quiz, classe, archive)
+    if not nombre:
+        archive.close()
+        messages.warning(request, "Aucune tentative terminée pour cette classe.")
+        return redirect('resultats_quiz_classe', quiz_id=quiz.id)
+    archive.seek(0)
+    nom = f"resultats_{quiz.titre.replace(' ', '_')}_{classe.nom.replace(' ', '_')}.zip"
+    return FileResponse(archive, as_attachment=True, filename=nom, content_type='application/zip')
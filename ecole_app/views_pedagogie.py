@@ -526,11 +526,8 @@ def repondre_quiz(request, tentative_id):
         else:
             score = 0
         
-        # Marquer la tentative comme terminée
-        tentative.terminee = True
-        tentative.date_fin = timezone.now()
-        tentative.score = score
-        tentative.save()
+        # Marquer la tentative comme terminée et mettre à jour les compteurs du quiz
+        tentative.terminer(score)
         
         return redirect('resultat_quiz', tentative_id=tentative.id)
     
@@ -591,39 +588,32 @@ def statistiques_quiz(request, quiz_id):
         messages.error(request, "Vous n'avez pas accès à ce quiz.")
         return redirect('liste_modules')
     
-    # Récupérer les tentatives terminées
-    tentatives = TentativeQuiz.objects.filter(quiz=quiz, terminee=True)
+    # Récupérer les tentatives terminées avec leurs élèves
+    tentatives = TentativeQuiz.objects.filter(quiz=quiz, terminee=True).select_related('eleve')
     
-    # Calculer les statistiques
-    nb_tentatives = tentatives.count()
-    score_moyen = tentatives.aggregate(Avg('score'))['score__avg'] or 0
+    # Statistiques globales et par question lues dans les compteurs matérialisés
+    nb_tentatives = quiz.nb_tentatives_terminees
+    score_moyen = quiz.score_moyen
     
-    # Statistiques par question
-    questions = quiz.questions.all()
-    stats_questions = []
-    
-    for question in questions:
-        reponses = Reponse.objects.filter(question=question, tentative__in=tentatives)
-        nb_reponses = reponses.count()
-        nb_correctes = reponses.filter(est_correcte=True).count()
-        taux_reussite = (nb_correctes / nb_reponses * 100) if nb_reponses > 0 else 0
-        
-        stats_questions.append({
+    stats_questions = [
+        {
             'question': question,
-            'nb_reponses': nb_reponses,
-            'nb_correctes': nb_correctes,
-            'taux_reussite': taux_reussite,
-        })
+            'nb_reponses': question.nb_reponses,
+            'nb_correctes': question.nb_correctes,
+            'taux_reussite': question.taux_reussite,
+        }
+        for question in quiz.questions.all()
+    ]
     
     # Statistiques par élève
-    stats_eleves = []
-    
-    for tentative in tentatives:
-        stats_eleves.append({
+    stats_eleves = [
+        {
             'eleve': tentative.eleve,
             'date': tentative.date_fin,
             'score': tentative.score,
-        })
+        }
+        for tentative in tentatives
+    ]
     
     context = {
         'quiz': quiz,
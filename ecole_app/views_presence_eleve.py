@@ -2,46 +2,28 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.http import HttpResponse, JsonResponse
-from django.db.models import Count, Q
 from .models import Eleve, PresenceEleve, Creneau, AnneeScolaire, Classe
+from .presences import (charger_presences, enregistrer_presences, statistiques_presences,
+                        statistiques_presences_par, cumuls_presences, statistiques_cumuls,
+                        statistiques_cumuls_par, REGROUPEMENTS, STATS_VIDES)
+from .exports_excel import reponse_excel, TAILLE_CHUNK, STYLE_EN_TETE_COLORE, STYLE_CELLULE_BORDEE
 import datetime
 from django.utils import timezone
 from .utils import render_to_pdf
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
-from io import BytesIO
 
 # Fonction pour calculer les statistiques de présence
 def calculate_attendance_stats(date, classe, composante_id):
     # Récupérer les élèves de la classe qui ne sont pas archivés
     eleves = Eleve.objects.filter(classes=classe, composante_id=composante_id, archive=False)
     
-    # Récupérer les présences pour la date et la classe
-    presences = PresenceEleve.objects.filter(
-        date=date,
-        classe=classe,
-        composante_id=composante_id
-    )
-    
-    # Initialiser les statistiques
-    stats = {
+    # Lire le cumul du jour pour la classe
+    totaux = statistiques_cumuls(cumuls_presences(composante_id, date, date, classes=[classe]))
+    return {
         'total_eleves': eleves.count(),
-        'presents': 0,
-        'absents_justifies': 0,
-        'absents_non_justifies': 0
+        'presents': totaux['presents'],
+        'absents_justifies': totaux['absents_justifies'],
+        'absents_non_justifies': totaux['absents'],
     }
-    
-    # Compter les présences
-    for presence in presences:
-        if presence.present:
-            stats['presents'] += 1
-        elif presence.justifie:
-            stats['absents_justifies'] += 1
-        else:
-            stats['absents_non_justifies'] += 1
-    
-    return stats
 
 @login_required
 def gestion_presence_eleve(request):
@@ -165,27 +147,12 @@ def gestion_presence_eleve(request):
                 
                 date_obj = datetime.datetime.strptime(date, '%Y-%m-%d').date()
                 
-                # Vérifier si une présence existe déjà pour cet élève, cette date et cette classe
-                presence, created = PresenceEleve.objects.get_or_create(
-                    eleve=eleve,
-                    date=date_obj,
-                    classe=classe,
-                    defaults={
-                        'present': present,
-                        'justifie': justifie,
-                        'commentaire': commentaire,
-                        'composante_id': composante_id
-                    }
+                # Enregistrer la présence via le service de saisie groupée
+                resultat = enregistrer_presences(
+                    classe, date_obj, {eleve.id: (present, justifie, commentaire)}, composante_id
                 )
                 
-                # Si la présence existait déjà, mettre à jour ses valeurs
-                if not created:
-                    presence.present = present
-                    presence.justifie = justifie
-                    presence.commentaire = commentaire
-                    presence.save()
-                
-                if created:
+                if resultat['crees']:
                     message = f'Présence ajoutée pour {eleve}.'
                 else:
                     message = f'Présence mise à jour pour {eleve}.'
@@ -228,13 +195,11 @@ def gestion_presence_eleve(request):
     # Récupérer les présences existantes pour la date et la classe sélectionnées
     presences_existantes = {}
     if selected_classe:
-        presences = PresenceEleve.objects.filter(
-            date=selected_date,
-            classe=selected_classe,
-            composante_id=composante_id
-        )
-        for presence in presences:
-            presences_existantes[presence.eleve.id] = presence
+        presences_existantes = {
+            eleve_id: presence
+            for eleve_id, presence in charger_presences(selected_classe, selected_date).items()
+            if presence.composante_id == int(composante_id)
+        }
     
     # Construire une liste de tuples (eleve, presence)
     eleves_with_presence = [(eleve, presences_existantes.get(eleve.id, None)) for eleve in tous_les_eleves]
@@ -378,21 +343,36 @@ def rapport_presence_eleve(request):
     if selected_classe and not selected_eleve:
         presences_query = presences_query.filter(classe=selected_classe)
     
-    # Trier les résultats
-    presences = presences_query.order_by('date', 'classe__nom')
+    # Sans filtre par élève, les statistiques sont lues dans les cumuls journaliers
+    # (une ligne par classe et par jour) plutôt que dans les présences individuelles
+    cumuls = None
+    if not selected_eleve:
+        cumuls = cumuls_presences(
+            composante_id, date_debut, date_fin,
+            classes=[selected_classe] if selected_classe else (classes if is_professeur else None),
+        )
     
-    # Statistiques
-    stats = {
-        'total': presences.count(),
-        'presents': presences.filter(present=True).count(),
-        'absents': presences.filter(present=False, justifie=False).count(),
-        'absents_justifies': presences.filter(present=False, justifie=True).count(),
-    }
+    # Statistiques en une seule requête d'agrégation
+    stats = statistiques_cumuls(cumuls) if cumuls is not None else statistiques_presences(presences_query)
     
-    if stats['total'] > 0:
-        stats['taux_presence'] = round((stats['presents'] / stats['total']) * 100, 1)
-    else:
-        stats['taux_presence'] = 0
+    # Si c'est une requête AJAX, renvoyer uniquement les statistiques au format JSON,
+    # sans charger la liste des présences (utile pour les rapports sur un mois ou une année)
+    if request.GET.get('ajax') == '1':
+        donnees = {'stats': stats}
+        par = request.GET.get('par')
+        if par in REGROUPEMENTS:
+            if cumuls is not None and par != 'eleve':
+                groupes = statistiques_cumuls_par(cumuls, par)
+            else:
+                groupes = statistiques_presences_par(presences_query, par)
+            donnees['groupes'] = [
+                dict(stats_groupe, cle=cle.isoformat() if par == 'date' else cle)
+                for cle, stats_groupe in groupes.items()
+            ]
+        return JsonResponse(donnees)
+    
+    # Trier les résultats
+    presences = presences_query.select_related('eleve', 'classe').order_by('date', 'classe__nom')
     
     context = {
         'eleves': eleves,
@@ -405,10 +385,6 @@ def rapport_presence_eleve(request):
         'stats': stats,
     }
     
-    # Si c'est une requête AJAX, renvoyer les statistiques au format JSON
-    if request.GET.get('ajax') == '1':
-        return JsonResponse({'stats': stats})
-    
     return render(request, 'ecole_app/eleves/rapport_presence.html', context)
 
 @login_required
@@ -527,135 +503,52 @@ def export_rapport_presence_excel(request):
         presences_query = presences_query.filter(classe=selected_classe)
         eleves = eleves.filter(classes=selected_classe)
     
-    # Trier les résultats
-    presences = presences_query.order_by('date', 'classe__nom')
-    
-    # Statistiques globales
-    stats = {
-        'total': presences.count(),
-        'presents': presences.filter(present=True).count(),
-        'absents': presences.filter(present=False, justifie=False).count(),
-        'absents_justifies': presences.filter(present=False, justifie=True).count(),
-    }
-    
-    if stats['total'] > 0:
-        stats['taux_presence'] = round((stats['presents'] / stats['total']) * 100, 1)
-    else:
-        stats['taux_presence'] = 0
-    
-    # Préparer les statistiques par élève pour le format Excel
-    eleves_stats = {}
-    
-    for eleve in eleves:
-        # Filtrer les présences pour cet élève
-        eleve_presences = presences_query.filter(eleve=eleve)
-        
-        # Calculer les statistiques pour cet élève
-        eleve_stats = {
-            'presents': eleve_presences.filter(present=True).count(),
-            'absents': eleve_presences.filter(present=False, justifie=False).count(),
-            'absents_justifies': eleve_presences.filter(present=False, justifie=True).count(),
-            'total': eleve_presences.count(),
-            'commentaires': []
-        }
-        
-        # Ajouter les commentaires pour l'historique
-        for presence in eleve_presences.exclude(commentaire='').exclude(commentaire__isnull=True).order_by('-date'):
-            eleve_stats['commentaires'].append(presence)
-        
-        # Calculer le taux de présence
-        if eleve_stats['total'] > 0:
-            eleve_stats['taux_presence'] = round((eleve_stats['presents'] / eleve_stats['total']) * 100, 1)
-        else:
-            eleve_stats['taux_presence'] = 0
-        
-        eleves_stats[eleve] = eleve_stats
-    
-    # Création du classeur Excel
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"Présence {selected_classe.nom if selected_classe else 'Toutes les classes'}"
-    
-    # Styles
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    center_alignment = Alignment(horizontal="center", vertical="center")
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-    
-    # En-têtes
-    headers = [
-        'Nom',
-        'Prénom',
-        'Classe actuelle',
-        'Présences',
-        'Absences justifiées',
-        'Absences non justifiées',
-        'Taux de présence',
-        'Historique des commentaires'
-    ]
-    
-    # Ajout des en-têtes
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = center_alignment
-        cell.border = border
-    
-    # Ajout des données
-    row_num = 2
-    for eleve, stats in eleves_stats.items():
-        # Historique des commentaires formaté
-        historique = ""
-        if stats['commentaires']:
-            historique = "\n".join([f"{c.date.strftime('%d/%m/%Y')}: {c.commentaire}" for c in stats['commentaires']])
-        
-        data_row = [
-            eleve.nom,
-            eleve.prenom,
-            eleve.classes.first().nom if eleve.classes.first() else '',
-            stats['presents'],
-            stats['absents_justifies'],
-            stats['absents'],
-            f"{stats['taux_presence']:.1f}%",
-            historique
-        ]
-        
-        for col, value in enumerate(data_row, 1):
-            cell = ws.cell(row=row_num, column=col, value=value)
-            cell.alignment = Alignment(horizontal="left", vertical="top")
-            cell.border = border
-            
-            # Ajustement de la hauteur de ligne pour les commentaires
-            if col == 8 and historique:
-                ws.row_dimensions[row_num].height = len(historique.split('\n')) * 15
-        
-        row_num += 1
-    
-    # Ajustement des largeurs de colonnes
-    column_widths = [15, 15, 12, 10, 15, 18, 12, 50]
-    for col, width in enumerate(column_widths, 1):
-        ws.column_dimensions[get_column_letter(col)].width = width
-    
-    # Création de la réponse HTTP
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    
-    mois_fr = [
-        '', 'Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin',
-        'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre'
-    ]
-    
-    response = HttpResponse(
-        buffer.getvalue(),
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    # Statistiques par élève en une seule requête groupée
+    eleves_stats = statistiques_presences_par(presences_query, 'eleve')
+    
+    # Historique des commentaires de tous les élèves en une seule requête
+    commentaires = {}
+    for eleve_id, date_presence, commentaire in (
+        presences_query.exclude(commentaire='').exclude(commentaire__isnull=True)
+        .order_by('eleve_id', '-date').values_list('eleve_id', 'date', 'commentaire')
+        .iterator(chunk_size=TAILLE_CHUNK)
+    ):
+        commentaires.setdefault(eleve_id, []).append(f"{date_presence.strftime('%d/%m/%Y')}: {commentaire}")
+    
+    if not isinstance(eleves, list):
+        eleves = eleves.prefetch_related('classes').iterator(chunk_size=TAILLE_CHUNK)
+    
+    def lignes():
+        for eleve in eleves:
+            stats = eleves_stats.get(eleve.id, STATS_VIDES)
+            classes = list(eleve.classes.all())
+            yield [
+                eleve.nom,
+                eleve.prenom,
+                classes[0].nom if classes else '',
+                stats['presents'],
+                stats['absents_justifies'],
+                stats['absents'],
+                f"{stats['taux_presence']:.1f}%",
+                "\n".join(commentaires.get(eleve.id, []))
+            ]
+    
+    nom_fichier = f'rapport_presence_{selected_classe.nom if selected_classe else "toutes_les_classes"}_{date_debut.strftime("%Y%m%d")}_au_{date_fin.strftime("%Y%m%d")}.xlsx'
+    return reponse_excel(
+        nom_fichier,
+        f"Présence {selected_classe.nom if selected_classe else 'Toutes les classes'}",
+        [
+            'Nom',
+            'Prénom',
+            'Classe actuelle',
+            'Présences',
+            'Absences justifiées',
+            'Absences non justifiées',
+            'Taux de présence',
+            'Historique des commentaires'
+        ],
+        lignes(),
+        largeurs=[15, 15, 12, 10, 15, 18, 12, 50],
+        style_en_tetes=STYLE_EN_TETE_COLORE,
+        style_cellules=STYLE_CELLULE_BORDEE,
     )
-    response['Content-Disposition'] = f'attachment; filename="rapport_presence_{selected_classe.nom if selected_classe else "toutes_les_classes"}_{date_debut.strftime("%Y%m%d")}_au_{date_fin.strftime("%Y%m%d")}.xlsx"'
-    
-    return response
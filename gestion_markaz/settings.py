@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
+import sys
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -104,6 +106,33 @@ if os.getenv('USE_CLOUDFLARE_D1', 'False').lower() == 'true':
     })
 
 
+# Cache partagé entre les processus (workers gunicorn, worker d'envoi des
+# identifiants) : les statistiques du dashboard, le grand livre et le relevé
+# des impayés y sont conservés et invalidés par les signaux. Un cache mémoire
+# local ne verrait pas les invalidations faites par un autre processus.
+# Redis si REDIS_URL est défini (paquet redis de requirements.txt), sinon
+# un cache fichier sur le serveur, y compris si le paquet n'est pas installé.
+if os.getenv('REDIS_URL') and importlib.util.find_spec('redis'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Les tests utilisent un cache mémoire, vidé à chaque lancement
+if sys.argv[1:2] == ['test']:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
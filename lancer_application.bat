@@ -18,6 +18,11 @@ REM Vérifier si les dépendances sont installées
 echo Verification des dependances...
 python -m pip install -r requirements.txt
 
+REM Lancer le traitement des envois groupés d'identifiants dans une fenêtre séparée
+echo.
+echo Demarrage du traitement des envois d'identifiants...
+start "Envois identifiants - Gestion Markaz" python manage.py traiter_envois_identifiants --boucle
+
 REM Lancer le serveur Django
 echo.
 echo Demarrage du serveur...
@@ -1,11 +1,17 @@
 #!/usr/bin/env python
 """
 Script pour importer les données vers Cloudflare D1
+
+Le schéma est créé en premier ; une erreur arrête l'import. Les données sont
+ensuite envoyées par lots d'INSERT multi-lignes. Si un lot échoue (ligne déjà
+présente, donnée invalide), D1 l'annule entièrement : ses lignes sont alors
+renvoyées une par une, les lignes en erreur sont signalées et ignorées, et
+l'import continue avec les suivantes. Relancer l'import sur une base déjà
+remplie ajoute donc seulement les lignes manquantes.
 """
 import os
 import sys
 import json
-import requests
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -13,52 +19,60 @@ sys.path.append(str(BASE_DIR))
 
 # Charger la configuration D1
 import env_config
+from cloudflare_d1 import CloudflareD1Client, CloudflareD1Error
+
+# Limite D1 du nombre de paramètres liés par requête
+PARAMS_MAX = 100
+# Nombre de requêtes envoyées par appel au point d'accès batch
+REQUETES_PAR_LOT = 50
+
+
+def decouper(elements, taille):
+    """Découpe une liste en tranches de `taille` éléments"""
+    for debut in range(0, len(elements), taille):
+        yield elements[debut:debut + taille]
+
+
+def inserts_multi_lignes(table_name, columns, rows, params_max=PARAMS_MAX):
+    """
+    Construit les INSERT multi-lignes (sql, params) d'une table, chacun
+    limité à `params_max` paramètres liés.
+    """
+    lignes_par_insert = max(1, params_max // len(columns))
+    columns_str = ', '.join(columns)
+    placeholders = '(' + ', '.join(['?'] * len(columns)) + ')'
+    for tranche in decouper(rows, lignes_par_insert):
+        sql = f"INSERT INTO {table_name} ({columns_str}) VALUES {', '.join([placeholders] * len(tranche))}"
+        yield sql, [value for row in tranche for value in row]
+
 
 class CloudflareD1Importer:
-    def __init__(self):
-        self.account_id = os.getenv('CLOUDFLARE_ACCOUNT_ID')
-        self.database_id = os.getenv('CLOUDFLARE_DATABASE_ID')
-        self.api_token = os.getenv('CLOUDFLARE_API_TOKEN')
-        
-        if not all([self.account_id, self.database_id, self.api_token]):
-            raise ValueError("Configuration Cloudflare D1 manquante dans .env")
-        
-        self.base_url = f"https://api.cloudflare.com/client/v4/accounts/{self.account_id}/d1/database/{self.database_id}"
-        self.headers = {
-            'Authorization': f'Bearer {self.api_token}',
-            'Content-Type': 'application/json'
-        }
+    def __init__(self, client=None):
+        if client is None:
+            account_id = os.getenv('CLOUDFLARE_ACCOUNT_ID')
+            database_id = os.getenv('CLOUDFLARE_DATABASE_ID')
+            api_token = os.getenv('CLOUDFLARE_API_TOKEN')
+
+            if not all([account_id, database_id, api_token]):
+                raise ValueError("Configuration Cloudflare D1 manquante dans .env")
+
+            client = CloudflareD1Client(account_id, database_id, api_token)
+        self.client = client
     
     def execute_sql(self, sql_statements):
-        """Exécute des requêtes SQL sur D1"""
-        if isinstance(sql_statements, str):
+        """Exécute des requêtes SQL sur D1, par lots transactionnels"""
+        if isinstance(sql_statements, (str, tuple)):
             sql_statements = [sql_statements]
         
-        for sql in sql_statements:
-            if not sql.strip():
-                continue
-                
-            data = {'sql': sql}
-            
-            response = requests.post(
-                f"{self.base_url}/query",
-                headers=self.headers,
-                json=data
-            )
-            
-            # Afficher la requête et la réponse complète pour debug
-            print("\n=== SQL ===\n", sql)
-            print("--- Réponse Cloudflare D1 ---")
-            print(response.text)
-            
-            if response.status_code != 200:
-                print(f"Erreur SQL: {sql[:100]}...")
-                print(f"Réponse: {response.text}")
-                return False
-            
-            result = response.json()
-            if not result.get('success', False):
-                print(f"Erreur D1: {result}")
+        requetes = [sql for sql in sql_statements if (sql if isinstance(sql, str) else sql[0]).strip()]
+        
+        for lot in decouper(requetes, REQUETES_PAR_LOT):
+            try:
+                self.client.execute_batch(lot)
+            except CloudflareD1Error as e:
+                premiere = lot[0] if isinstance(lot[0], str) else lot[0][0]
+                print(f"Erreur SQL dans le lot commençant par: {premiere[:100]}...")
+                print(f"Réponse: {e}")
                 return False
         
         return True
@@ -118,10 +132,10 @@ class CloudflareD1Importer:
             # Extraire le nom de la table
             table_name = model_name.split('.')[-1]
             
+            # Regrouper les enregistrements ayant les mêmes colonnes
+            par_colonnes = {}
             for record in records:
                 fields = record['fields']
-                
-                # Construire la requête INSERT
                 columns = list(fields.keys())
                 values = list(fields.values())
                 
@@ -130,29 +144,37 @@ class CloudflareD1Importer:
                     columns.insert(0, 'id')
                     values.insert(0, record['pk'])
                 
-                placeholders = ', '.join(['?' for _ in values])
-                columns_str = ', '.join(columns)
-                
-                sql = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
-                
-                # Exécuter avec les paramètres
-                data = {
-                    'sql': sql,
-                    'params': values
-                }
-                
-                response = requests.post(
-                    f"{self.base_url}/query",
-                    headers=self.headers,
-                    json=data
-                )
-                
-                if response.status_code != 200:
-                    print(f"Erreur insertion dans {table_name}: {response.text}")
-                    continue
+                par_colonnes.setdefault(tuple(columns), []).append(values)
+            
+            erreurs = sum(self.inserer_lignes(table_name, list(columns), rows)
+                          for columns, rows in par_colonnes.items())
+            if erreurs:
+                print(f"{erreurs} ligne(s) ignorée(s) dans {table_name}")
         
         return True
     
+    def inserer_lignes(self, table_name, columns, rows):
+        """
+        Insère les lignes d'une table par lots d'INSERT multi-lignes. Un lot en
+        erreur, annulé par D1, est renvoyé ligne par ligne : les lignes
+        refusées sont signalées et ignorées. Retourne leur nombre.
+        """
+        lignes_par_lot = max(1, PARAMS_MAX // len(columns)) * REQUETES_PAR_LOT
+        erreurs = 0
+        for tranche in decouper(rows, lignes_par_lot):
+            try:
+                self.client.execute_batch(list(inserts_multi_lignes(table_name, columns, tranche)))
+                continue
+            except CloudflareD1Error as e:
+                print(f"Lot refusé dans {table_name} ({e}), insertion ligne par ligne")
+            for sql, params in inserts_multi_lignes(table_name, columns, tranche, params_max=len(columns)):
+                try:
+                    self.client.execute_query(sql, params)
+                except CloudflareD1Error as e:
+                    print(f"Erreur insertion dans {table_name}: {e}")
+                    erreurs += 1
+        return erreurs
+    
     def test_connection(self):
         """Test la connexion à D1"""
         print("Test de connexion à Cloudflare D1...")
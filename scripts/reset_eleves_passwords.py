@@ -9,24 +9,14 @@ def main():
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gestion_markaz.settings')
     django.setup()
     from ecole_app.models import Eleve
-    from django.contrib.auth.models import User
-    import random, string
+    from ecole_app.regeneration_identifiants import regenerer_mots_de_passe
 
-    def generer_mot_de_passe():
-        return ''.join(random.choices(string.ascii_letters + string.digits, k=8))
-
-    count = 0
-    for eleve in Eleve.objects.all():
-        if not eleve.user:
-            continue
-        new_password = generer_mot_de_passe()
-        eleve.user.set_password(new_password)
-        eleve.user.save()
-        eleve.mot_de_passe_en_clair = new_password
-        eleve.save()
-        print(f"[RESET] Mot de passe réinitialisé pour {eleve.nom} (id={eleve.id}) : {new_password}")
-        count += 1
-    print(f"Réinitialisation terminée. {count} élèves traités.")
+    # Mots de passe hachés en parallèle et enregistrés en une fois
+    # (voir aussi la commande : python manage.py regenerer_identifiants eleves)
+    lignes = regenerer_mots_de_passe(Eleve.objects.all().select_related('user').prefetch_related('classes'))
+    for ligne in lignes:
+        print(f"[RESET] Mot de passe réinitialisé pour {ligne['nom']} ({ligne['identifiant']}) : {ligne['mot_de_passe']}")
+    print(f"Réinitialisation terminée. {len(lignes)} élèves traités.")
 
 if __name__ == '__main__':
     main()